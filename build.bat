@@ -33,7 +33,7 @@ poetry run mypy src || (
 
 echo.
 echo =^> Running tests
-poetry run pytest tests -v || (
+poetry run pytest tests -v -p no:cacheprovider || (
     echo Tests failed!
     exit /b 1
 )
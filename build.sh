@@ -57,7 +57,8 @@ poetry run mypy src || {
 
 # Run tests with Pytest
 section "Running tests"
-poetry run pytest tests -v || {
+# Release builds run the suite once from a clean tree, so skip the cache
+poetry run pytest tests -v -p no:cacheprovider || {
     echo -e "${RED}Tests failed!${RESET}"
     exit 1
 }
@@ -16,6 +16,7 @@ if __name__ == "__main__":
         name = "TeamsChatGrabber"
         onefile = True
         console = False
+        backend = "pyinstaller"
         
         # Parse command-line arguments if provided
         if len(sys.argv) > 1:
@@ -23,9 +24,14 @@ if __name__ == "__main__":
                 console = True
             if "--multifile" in sys.argv:
                 onefile = False
+            for arg in sys.argv[1:]:
+                if arg.startswith("--backend="):
+                    backend = arg.split("=", 1)[1]
         
         # Build the executable
-        exe_path = build_exe(name=name, onefile=onefile, console=console)
+        exe_path = build_exe(
+            name=name, onefile=onefile, console=console, backend=backend
+        )
         print(f"Successfully built executable: {exe_path}")
         sys.exit(0)
     except Exception as e:
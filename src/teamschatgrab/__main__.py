@@ -5,22 +5,65 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-import argparse
 import sys
+from types import SimpleNamespace
 from typing import Optional, List
 
 from .app import create_app
 
 
-def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+def _parse_known_flags(args: List[str]) -> Optional[SimpleNamespace]:
+    """Parse the supported flags without loading argparse.
+
+    Args:
+        args: Command-line arguments
+
+    Returns:
+        Optional[SimpleNamespace]: Parsed arguments, or None if the arguments
+            need argparse (help, unknown flags or malformed values)
+    """
+    parsed = SimpleNamespace(output_dir=None, no_rich=False, debug=False)
+    remaining = iter(args)
+
+    for arg in remaining:
+        if arg in ("-o", "--output-dir"):
+            value = next(remaining, None)
+            if value is None or value.startswith("-"):
+                return None
+            parsed.output_dir = value
+        elif arg.startswith("--output-dir="):
+            parsed.output_dir = arg.split("=", 1)[1]
+        elif arg == "--no-rich":
+            parsed.no_rich = True
+        elif arg == "--debug":
+            parsed.debug = True
+        else:
+            return None
+
+    return parsed
+
+
+def parse_args(args: Optional[List[str]] = None) -> SimpleNamespace:
     """Parse command-line arguments.
 
+    The common flags are handled directly; argparse is only imported for
+    --help and to report usage errors.
+
     Args:
         args: Command-line arguments (defaults to sys.argv[1:])
 
     Returns:
-        argparse.Namespace: Parsed arguments
+        SimpleNamespace: Parsed arguments
     """
+    if args is None:
+        args = sys.argv[1:]
+
+    parsed = _parse_known_flags(args)
+    if parsed is not None:
+        return parsed
+
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Download chat history from Microsoft Teams"
     )
@@ -38,7 +81,7 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
 
     parser.add_argument("--debug", help="Enable debug output", action="store_true")
 
-    return parser.parse_args(args)
+    return SimpleNamespace(**vars(parser.parse_args(args)))
 
 
 def main(args: Optional[List[str]] = None) -> int:
@@ -6,14 +6,30 @@ MIT License
 """
 
 import datetime
+import email.utils
+import logging
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Dict, Optional, Any, Iterator
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, Union
 
 import requests
 
 from .auth import TeamsAuthError
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
 
 class ChatType(str, Enum):
     """Types of chats available in Teams."""
@@ -29,11 +45,224 @@ class TeamsApiError(Exception):
     pass
 
 
+class TeamsRateLimitError(TeamsApiError):
+    """Exception raised when the Teams API throttles requests (HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        """Initialize the rate limit error.
+
+        Args:
+            message: Error message
+            retry_after: Seconds the server asked us to wait, if provided
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header value.
+
+    Args:
+        value: Header value, either delay-seconds or an HTTP-date
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if missing or unparseable
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+def _to_utc(value: datetime.datetime) -> datetime.datetime:
+    """Normalize a datetime to UTC, treating naive values as UTC.
+
+    Args:
+        value: Datetime to normalize
+
+    Returns:
+        datetime.datetime: Timezone-aware UTC datetime
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def _parse_timestamp(value: str) -> datetime.datetime:
+    """Parse an ISO-8601 timestamp as returned by the Teams API.
+
+    Args:
+        value: Timestamp string, optionally with a trailing "Z"
+
+    Returns:
+        datetime.datetime: Timezone-aware UTC datetime
+    """
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return _to_utc(datetime.datetime.fromisoformat(value))
+
+
+def _utc_iso_bound(value: datetime.datetime) -> str:
+    """Format a datetime as a UTC ISO-8601 string for lexicographic comparison.
+
+    Seconds precision without a suffix sorts correctly against API timestamps
+    such as "2023-01-01T12:00:00Z" or "2023-01-01T12:00:00.123Z".
+
+    Args:
+        value: Datetime to format
+
+    Returns:
+        str: Formatted timestamp
+    """
+    return _to_utc(value).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _is_older(timestamp: str, bound: str) -> bool:
+    """Check whether an API timestamp is earlier than a formatted bound.
+
+    Args:
+        timestamp: Timestamp from the API
+        bound: Bound produced by _utc_iso_bound
+
+    Returns:
+        bool: True if timestamp is earlier than bound
+    """
+    if timestamp.endswith("Z"):
+        # Canonical UTC timestamps compare correctly as strings
+        return timestamp < bound
+    return _parse_timestamp(timestamp) < _parse_timestamp(bound)
+
+
+def _decode_json(response: requests.Response) -> Any:
+    """Decode a JSON response body, using orjson when it is installed.
+
+    Args:
+        response: HTTP response
+
+    Returns:
+        Any: Decoded body, or None if the body is empty
+
+    Raises:
+        TeamsApiError: If the body is not valid JSON
+    """
+    if not ORJSON_AVAILABLE:
+        return response.json()
+    if not response.content:
+        return None
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as e:
+        raise TeamsApiError(f"Invalid JSON in API response: {e}") from e
+
+
+def _find_list_key(response: Dict[str, Any]) -> Optional[str]:
+    """Find the key holding the item list in a wrapped API response.
+
+    Graph-style responses use "value", which is checked before scanning
+    the remaining fields.
+
+    Args:
+        response: API response dict
+
+    Returns:
+        Optional[str]: Key of the first list-valued field, or None
+    """
+    if isinstance(response.get("value"), list):
+        return "value"
+    for key, value in response.items():
+        if isinstance(value, list):
+            return key
+    return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to pace outgoing API calls.
+
+    The refill rate adapts AIMD-style: it is halved whenever the server
+    throttles us and recovers additively on each successful call.
+    """
+
+    MIN_RATE = 1.0
+
+    def __init__(self, rate_per_s: float, burst: int):
+        """Initialize the token bucket.
+
+        Args:
+            rate_per_s: Sustained number of calls allowed per second
+            burst: Maximum number of calls allowed back-to-back
+        """
+        self.max_rate = rate_per_s
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._last
+                self._last = now
+                self._tokens = min(
+                    float(self.burst), self._tokens + elapsed * self.rate_per_s
+                )
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate_per_s
+            time.sleep(wait)
+
+    def decrease_rate(self) -> None:
+        """Multiplicatively reduce the rate after being throttled."""
+        with self._lock:
+            self.rate_per_s = max(self.MIN_RATE, self.rate_per_s / 2)
+
+    def increase_rate(self) -> None:
+        """Additively restore the rate after a successful call."""
+        with self._lock:
+            self.rate_per_s = min(self.max_rate, self.rate_per_s + 1)
+
+
 class TeamsApi:
     """Client for interacting with Microsoft Teams API."""
 
     BASE_URL = "https://teams.microsoft.com/api/csa/api"
 
+    # Backoff policy for throttled (HTTP 429) responses
+    MAX_RETRIES = 10
+    MAX_BACKOFF = 64
+
+    # Upper bound on concurrent calls when fanning out across teams
+    MAX_CONCURRENCY = 8
+
+    # Maximum number of sub-requests per JSON batch call
+    BATCH_SIZE = 20
+
+    # Messages requested per page
+    PAGE_SIZE = 100
+
+    # Seconds to wait for the server before giving up on a call
+    REQUEST_TIMEOUT = 30
+
+    # Client-side pacing, kept below the Teams per-app limit of 50 RPS
+    RATE_LIMIT_PER_SECOND = 40.0
+    RATE_LIMIT_BURST = 10
+
     def __init__(self, token: str):
         """Initialize the Teams API client.
 
@@ -41,7 +270,18 @@ class TeamsApi:
             token: Authentication token for Teams API
         """
         self.token = token
+        # Response key holding the item list, discovered once per endpoint
+        self._list_key_cache: Dict[str, str] = {}
+        self.rate_limiter = TokenBucket(
+            rate_per_s=self.RATE_LIMIT_PER_SECOND, burst=self.RATE_LIMIT_BURST
+        )
         self.session = requests.Session()
+        # Keep one warm keep-alive connection per concurrent caller; the
+        # default pool of 10 would otherwise churn connections under fan-out
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.MAX_CONCURRENCY
+        )
+        self.session.mount("https://", adapter)
         self.session.headers.update(
             {
                 "Authorization": f"Bearer {token}",
@@ -69,18 +309,33 @@ class TeamsApi:
             Dict[str, Any]: Response data
 
         Raises:
+            TeamsRateLimitError: If the server throttles the request
             TeamsApiError: If the request fails
         """
         url = f"{self.BASE_URL}/{endpoint}"
         response = None
 
+        self.rate_limiter.acquire()
+
         try:
             response = self.session.request(
-                method=method, url=url, params=params, json=data
+                method=method,
+                url=url,
+                params=params,
+                json=data,
+                timeout=self.REQUEST_TIMEOUT,
             )
 
+            if response.status_code == 429:
+                self.rate_limiter.decrease_rate()
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                raise TeamsRateLimitError(
+                    "API rate limit exceeded", retry_after=retry_after
+                )
+
             response.raise_for_status()
-            json_data = response.json()
+            self.rate_limiter.increase_rate()
+            json_data = _decode_json(response)
             return dict(json_data) if json_data else {}
 
         except requests.RequestException as e:
@@ -98,6 +353,16 @@ class TeamsApi:
         # by reverse engineering the Teams client
         return self._make_request("GET", "chats")
 
+    def get_teams(self) -> Dict[str, Any]:
+        """Get list of teams the user is a member of.
+
+        Returns:
+            Dict[str, Any]: Team data response
+        """
+        # This is a placeholder - actual endpoint would be determined
+        # by reverse engineering the Teams client
+        return self._make_request("GET", "teams")
+
     def get_channels(self, team_id: str) -> Dict[str, Any]:
         """Get list of channels in a team.
 
@@ -111,12 +376,100 @@ class TeamsApi:
         # by reverse engineering the Teams client
         return self._make_request("GET", f"teams/{team_id}/channels")
 
+    def _get_channels_batch(self, team_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get channels for up to BATCH_SIZE teams in one batched request.
+
+        Args:
+            team_ids: Team IDs
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Channel data response keyed by team ID
+
+        Raises:
+            TeamsRateLimitError: If the batch or any part of it is throttled
+            TeamsApiError: If fetching channels for any team fails
+        """
+        batch = {
+            "requests": [
+                {"id": str(i), "method": "GET", "url": f"/teams/{team_id}/channels"}
+                for i, team_id in enumerate(team_ids)
+            ]
+        }
+        response = self._make_request("POST", "$batch", data=batch)
+
+        # Responses may arrive in any order, so match them up by ID
+        results: Dict[str, Dict[str, Any]] = {}
+        for item in response.get("responses", []):
+            try:
+                team_id = team_ids[int(item.get("id"))]
+            except (TypeError, ValueError, IndexError):
+                continue
+
+            status = item.get("status", 200)
+            if status == 429:
+                headers = item.get("headers") or {}
+                raise TeamsRateLimitError(
+                    "API rate limit exceeded",
+                    retry_after=_parse_retry_after(headers.get("Retry-After")),
+                )
+            if status >= 400:
+                raise TeamsApiError(
+                    f"Failed to get channels for team {team_id}: HTTP {status}"
+                )
+
+            results[team_id] = item.get("body") or {}
+
+        # A sub-request missing from the response would otherwise silently
+        # drop that team's channels, so fetch those teams one at a time
+        for team_id in team_ids:
+            if team_id not in results:
+                logger.debug(f"No batch response for team {team_id}, refetching")
+                results[team_id] = self.get_channels(team_id)
+
+        return results
+
+    def batch_get_channels(self, team_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get channel lists for many teams using batched calls.
+
+        Teams are grouped BATCH_SIZE at a time, so N teams take
+        ceil(N / BATCH_SIZE) round trips. When there is more than one
+        batch they are sent concurrently, bounded by MAX_CONCURRENCY.
+
+        Args:
+            team_ids: Team IDs
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Channel data response keyed by team ID
+
+        Raises:
+            TeamsApiError: If fetching channels for any team fails
+        """
+        if not team_ids:
+            return {}
+
+        chunks = [
+            team_ids[i : i + self.BATCH_SIZE]
+            for i in range(0, len(team_ids), self.BATCH_SIZE)
+        ]
+
+        results: Dict[str, Dict[str, Any]] = {}
+        workers = min(self.MAX_CONCURRENCY, len(chunks))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk_results in executor.map(
+                lambda chunk: self._call_with_backoff(self._get_channels_batch, chunk),
+                chunks,
+            ):
+                results.update(chunk_results)
+
+        return results
+
     def get_messages(
         self,
         chat_id: str,
         chat_type: ChatType,
         limit: Optional[int] = None,
-        before_date: Optional[datetime.datetime] = None,
+        before_date: Optional[Union[datetime.datetime, str]] = None,
+        after_date: Optional[datetime.datetime] = None,
     ) -> Dict[str, Any]:
         """Get messages from a chat.
 
@@ -124,7 +477,9 @@ class TeamsApi:
             chat_id: Chat or channel ID
             chat_type: Type of chat (direct, group, or channel)
             limit: Maximum number of messages to fetch
-            before_date: Only fetch messages before this date
+            before_date: Only fetch messages before this date (a datetime or
+                an ISO-8601 timestamp as returned by the API)
+            after_date: Only fetch messages after this date
 
         Returns:
             Dict[str, Any]: Message data response
@@ -144,43 +499,149 @@ class TeamsApi:
             params["limit"] = str(limit)
         if before_date:
             # Convert to string to avoid type error
-            params["before"] = before_date.isoformat()
+            params["before"] = (
+                before_date if isinstance(before_date, str) else before_date.isoformat()
+            )
+        if after_date:
+            params["after"] = after_date.isoformat()
 
         return self._make_request("GET", endpoint, params=params)
 
+    def _extract_list(
+        self, endpoint: str, response: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Extract the item list from a wrapped response.
+
+        The list key is looked up once per endpoint; later pages reuse it
+        instead of scanning every field.
+
+        Args:
+            endpoint: Name used to cache the list key
+            response: API response dict
+
+        Returns:
+            List[Dict[str, Any]]: Items, or an empty list if none found
+        """
+        key = self._list_key_cache.get(endpoint)
+        if key is None:
+            key = _find_list_key(response)
+            if key is None:
+                return []
+            self._list_key_cache[endpoint] = key
+        items = response.get(key)
+        return items if isinstance(items, list) else []
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Compute how long to wait before retrying a throttled call.
+
+        Args:
+            attempt: Number of consecutive throttled attempts so far
+            retry_after: Server-provided delay in seconds, if any
+
+        Returns:
+            float: Delay in seconds
+        """
+        if retry_after is not None:
+            return retry_after
+
+        delay = max(1, min(self.MAX_BACKOFF, 2**attempt))
+        # Jitter to avoid synchronized retries
+        return float(delay * (0.5 + random.random()))
+
+    def _call_with_backoff(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        stop: Optional[threading.Event] = None,
+        **kwargs: Any,
+    ) -> T:
+        """Call an API method, retrying with backoff when throttled.
+
+        Args:
+            func: API method to call
+            *args: Positional arguments for func
+            stop: Event that cuts a backoff sleep short when set
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            T: Result of func
+
+        Raises:
+            TeamsRateLimitError: If still throttled after MAX_RETRIES attempts,
+                if the server asks to wait longer than MAX_BACKOFF, or if stop
+                is set while waiting to retry
+        """
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except TeamsRateLimitError as e:
+                attempt += 1
+                if attempt >= self.MAX_RETRIES:
+                    raise
+                if e.retry_after is not None and e.retry_after > self.MAX_BACKOFF:
+                    # Fail fast so the caller can checkpoint instead of stalling
+                    raise TeamsRateLimitError(
+                        "API rate limit exceeded, retry after "
+                        f"{e.retry_after:.0f} seconds",
+                        retry_after=e.retry_after,
+                    ) from e
+                delay = self._backoff_delay(attempt, e.retry_after)
+                if stop is None:
+                    time.sleep(delay)
+                elif stop.wait(delay):
+                    raise
+
     def get_all_messages(
-        self, chat_id: str, chat_type: ChatType, limit: Optional[int] = None
+        self,
+        chat_id: str,
+        chat_type: ChatType,
+        limit: Optional[int] = None,
+        before_date: Optional[Union[datetime.datetime, str]] = None,
+        after_date: Optional[datetime.datetime] = None,
+        stop: Optional[threading.Event] = None,
     ) -> Iterator[Dict[str, Any]]:
         """Get all messages from a chat with pagination.
 
+        Pages are fetched newest first, so pagination stops as soon as a
+        message older than after_date is seen.
+
         Args:
             chat_id: Chat or channel ID
             chat_type: Type of chat
             limit: Total maximum number of messages to fetch
+            before_date: Only fetch messages before this date (a datetime or
+                an API timestamp string)
+            after_date: Only fetch messages after this date
+            stop: Event that ends pagination early when set, checked between
+                pages and during backoff sleeps
 
         Yields:
             Dict[str, Any]: Individual message objects
         """
         # Placeholder for pagination logic
         messages_fetched = 0
-        last_date = None
+        last_date: Optional[Union[datetime.datetime, str]] = before_date
+        earliest = _utc_iso_bound(after_date) if after_date else None
 
         while True:
-            response = self.get_messages(
+            if stop is not None and stop.is_set():
+                return
+
+            response = self._call_with_backoff(
+                self.get_messages,
+                stop=stop,
                 chat_id=chat_id,
                 chat_type=chat_type,
-                limit=100,  # Fetch in batches of 100
+                limit=self.PAGE_SIZE,
                 before_date=last_date,
+                after_date=after_date,
             )
 
             # Extract messages from the response
             messages = []
             if isinstance(response, dict):
-                # Try to find messages in response
-                for key, value in response.items():
-                    if isinstance(value, list):
-                        messages = value
-                        break
+                messages = self._extract_list("messages", response)
                 # If no list found, check if the response itself is a message
                 if not messages and "id" in response:
                     messages = [response]
@@ -191,18 +652,25 @@ class TeamsApi:
                 break
 
             for message in messages:
+                if earliest:
+                    created = message.get("createdDateTime", "")
+                    if created and _is_older(created, earliest):
+                        return
+
                 yield message
                 messages_fetched += 1
 
                 if limit and messages_fetched >= limit:
                     return
 
+            # A short page means the server has no older messages
+            if len(messages) < self.PAGE_SIZE:
+                return
+
             # Update pagination cursor
-            if messages and len(messages) > 0:
-                last_message = messages[-1]
-                created_date = last_message.get("createdDateTime", "")
-                if created_date:
-                    last_date = datetime.datetime.fromisoformat(created_date)
-
-            # Avoid rate limiting
-            time.sleep(0.5)
+            created_date = messages[-1].get("createdDateTime", "")
+            if not created_date:
+                # Without a timestamp the same page would be fetched forever
+                return
+            # Pass the server's timestamp straight back as the cursor
+            last_date = created_date
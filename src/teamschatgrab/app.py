@@ -7,15 +7,114 @@ MIT License
 
 import datetime
 import os
+import queue
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple, TypedDict
-
-from .api import TeamsApi, TeamsApiError, ChatType
-from .auth import TeamsAuthError, get_current_user_info, validate_token
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Any,
+    Iterator,
+    Tuple,
+    TypedDict,
+    TypeVar,
+    Union,
+)
+
+from .api import TeamsApi, TeamsApiError, ChatType, _find_list_key
+from .auth import (
+    TeamsAuthError,
+    clear_cached_session,
+    get_current_user_info,
+    refresh_token,
+    save_cached_session,
+    validate_token,
+)
 from .platform_detection import get_platform_info, PlatformType
 from .storage import TeamsStorage, StorageFormat, StorageError
 from .ui import TerminalUI
 
+T = TypeVar("T")
+
+_DONE = object()
+
+# Seconds to wait for the prefetch producer to notice it was stopped; it is a
+# daemon thread, so one stuck in a slow HTTP call is simply left behind
+_PRODUCER_JOIN_TIMEOUT = 1.0
+
+# Seconds between buffer polls in _prefetch. A blocking Queue.get() cannot be
+# interrupted by Ctrl-C on Windows, so both ends wait in short timed slices
+_POLL_INTERVAL = 0.1
+
+
+class _ProducerError:
+    """Wraps an exception raised on the producer thread of _prefetch."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _prefetch(
+    source: Iterator[T], maxsize: int, stop: Optional[threading.Event] = None
+) -> Iterator[T]:
+    """Consume an iterator on a background thread, yielding its items.
+
+    Lets the producer (e.g. HTTP pagination) run ahead of the consumer
+    (e.g. disk writes) by up to maxsize items. Exceptions raised by the
+    producer are re-raised to the consumer.
+
+    Args:
+        source: Iterator to consume
+        maxsize: Maximum number of items buffered ahead of the consumer
+        stop: Event set when the consumer stops early; pass the same event
+            to the source so it can give up between pages and backoff sleeps
+
+    Yields:
+        T: Items from source, in order
+    """
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+    stopped = stop if stop is not None else threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in source:
+                if not put(item):
+                    break
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            put(_DONE)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            try:
+                item = buffer.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        # Unblock the producer if the consumer stops early
+        stopped.set()
+        producer.join(timeout=_PRODUCER_JOIN_TIMEOUT)
+
 
 class DownloadConfig(TypedDict, total=False):
     """Configuration for download options."""
@@ -24,11 +123,20 @@ class DownloadConfig(TypedDict, total=False):
     limit: Optional[int]
     date_from: Optional[datetime.datetime]
     date_to: Optional[datetime.datetime]
+    pretty: bool
 
 
 class TeamsChatGrabber:
     """Main application for downloading Teams chat history."""
 
+    # Messages fetched ahead of the disk writer while downloading
+    PREFETCH_MESSAGES = 256
+
+    # Redraw the progress bar at most every PROGRESS_INTERVAL seconds or
+    # PROGRESS_BATCH messages, whichever comes first
+    PROGRESS_INTERVAL = 0.05
+    PROGRESS_BATCH = 256
+
     def __init__(self, output_dir: Optional[str] = None, use_rich_ui: bool = True):
         """Initialize the Teams chat grabber.
 
@@ -93,11 +201,16 @@ class TeamsChatGrabber:
 
             # Validate the token
             is_valid, error = validate_token(self.user_info["token"])
+            if not is_valid:
+                is_valid, error = self._recover_token()
             if not is_valid:
                 self.ui.error(f"Invalid authentication token: {error}")
                 self.ui.info("Please log in to Microsoft Teams application again")
                 return False
 
+            # Only cache a session whose token has been validated
+            save_cached_session(self.user_info)
+
             # Create API client
             self.api = TeamsApi(token=self.user_info["token"])
 
@@ -107,6 +220,50 @@ class TeamsChatGrabber:
             self.ui.error(f"Authentication error: {str(e)}")
             return False
 
+    def _recover_token(self) -> Tuple[bool, Optional[str]]:
+        """Recover from an invalid token, which may come from a stale cache.
+
+        Tries refreshing the token first, then falls back to rediscovering
+        the logged-in user from Teams storage.
+
+        Returns:
+            Tuple[bool, Optional[str]]: (is_valid, error_message)
+        """
+        if self.user_info:
+            new_token = refresh_token(self.user_info["token"])
+            if new_token and validate_token(new_token)[0]:
+                self.user_info["token"] = new_token
+                return True, None
+
+        clear_cached_session()
+        self.user_info = get_current_user_info(use_cache=False)
+        if not self.user_info:
+            return False, "No logged-in Teams user found"
+
+        return validate_token(self.user_info["token"])
+
+    def _extract_items(self, data: Any) -> List[Dict[str, Any]]:
+        """Extract a list of items from an API response.
+
+        Args:
+            data: API response (list, or dict wrapping a list)
+
+        Returns:
+            List[Dict[str, Any]]: Extracted items
+        """
+        items: List[Dict[str, Any]] = []
+        if isinstance(data, dict):
+            key = _find_list_key(data)
+            if key is not None:
+                # An empty list is an empty result, not a single item
+                items = data[key]
+            elif data:
+                # Single item as dict
+                items = [data]
+        elif isinstance(data, list):
+            items = data
+        return items
+
     def list_chats(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """List available chats and channels.
 
@@ -125,22 +282,20 @@ class TeamsChatGrabber:
             chats_data = self.api.get_chats()
 
             # Extract list of chats from response
-            chats: List[Dict[str, Any]] = []
-            if isinstance(chats_data, dict):
-                for key, value in chats_data.items():
-                    if isinstance(value, list):
-                        chats = value
-                        break
-                if not chats and chats_data:
-                    # Single chat as dict
-                    chats = [chats_data]
-            elif isinstance(chats_data, list):
-                chats = chats_data
-
-            # Get teams and their channels
+            chats = self._extract_items(chats_data)
+
+            # Get teams, then fetch channels for all teams in batches
+            teams = self._extract_items(self.api.get_teams())
+            team_ids = [team["id"] for team in teams if team.get("id")]
+            channels_by_team = self.api.batch_get_channels(team_ids)
+
             channels: List[Dict[str, Any]] = []
-            # This would need to be implemented to get teams and then channels
-            # for each team
+            for team in teams:
+                team_channels = channels_by_team.get(team.get("id", ""), {})
+                for channel in self._extract_items(team_channels):
+                    # select_chat shows the owning team next to each channel
+                    channel.setdefault("team", team)
+                    channels.append(channel)
 
             self.ui.success(f"Found {len(chats)} chats and {len(channels)} channels")
             return chats, channels
@@ -220,6 +375,11 @@ class TeamsChatGrabber:
         selected_storage_format = StorageFormat(selected_format)
         config["format"] = selected_storage_format  # This is a StorageFormat enum
 
+        if selected_storage_format == StorageFormat.JSON:
+            config["pretty"] = self.ui.confirm(
+                "Pretty-print JSON (slower, larger files)?", False
+            )
+
         # Message limit
         limit_str = self.ui.prompt(
             "Maximum messages to download (leave empty for all):", ""
@@ -251,10 +411,12 @@ class TeamsChatGrabber:
                     )
                 config["date_from"] = date_from_value  # This is an Optional[datetime]
 
-                date_to_value: datetime.datetime = datetime.datetime.now()
+                # No upper bound means up to now; leaving it unset keeps the
+                # settings of an interrupted download comparable across runs
+                date_to_value: Optional[datetime.datetime] = None
                 if date_to_str:
                     date_to_value = datetime.datetime.strptime(date_to_str, "%Y-%m-%d")
-                config["date_to"] = date_to_value  # This is a datetime
+                config["date_to"] = date_to_value
             except ValueError:
                 self.ui.warning("Invalid date format, ignoring date range")
                 # Handle the error case properly
@@ -296,14 +458,52 @@ class TeamsChatGrabber:
                 chat_name=chat_name, chat_id=chat_id, chat_type=chat_type
             )
 
+            format_value = config.get("format", StorageFormat.JSON)
+
             # Get messages
             self.ui.info("Fetching messages...")
 
-            messages = []
-            total_fetched = 0
+            message_count = 0
             limit = config.get("limit")
             date_from = config.get("date_from")
             date_to = config.get("date_to")
+            before: Optional[Union[datetime.datetime, str]] = date_to
+
+            # Stored with each checkpoint; a checkpoint only applies to a run
+            # with the same settings
+            settings: Dict[str, Any] = {
+                "format": format_value.value,
+                "date_from": date_from.isoformat() if date_from else None,
+                "date_to": date_to.isoformat() if date_to else None,
+            }
+
+            # Pick up where an interrupted download of this chat stopped
+            resumed = 0
+            earlier_files: List[str] = []
+            cursor = self.storage.load_cursor(chat_dir)
+            if cursor and any(cursor.get(k) != v for k, v in settings.items()):
+                self.ui.warning(
+                    "Ignoring an interrupted download with a different format "
+                    "or date range"
+                )
+                cursor = None
+            if cursor and not self.ui.confirm(
+                f"Resume the interrupted download after {cursor.get('count', 0)} "
+                "messages?",
+                True,
+            ):
+                cursor = None
+            if cursor:
+                resumed = int(cursor.get("count", 0))
+                before = cursor["before"]
+                earlier_files = list(cursor.get("files", []))
+                self.ui.info(f"Resuming after {resumed} downloaded messages")
+                if limit:
+                    limit = max(limit - resumed, 0)
+                    if not limit:
+                        self.storage.clear_cursor(chat_dir)
+                        self.ui.success("Download already complete")
+                        return chat_dir
 
             # Create progress bar
             progress = self.ui.progress(
@@ -311,49 +511,94 @@ class TeamsChatGrabber:
                 description="Fetching messages",
             )
             self.ui.start_progress(progress)
+            last_ui_update = time.monotonic()
+            pending_updates = 0
 
+            # Stream messages to disk as they arrive rather than buffering them
             try:
-                for message in self.api.get_all_messages(
-                    chat_id=chat_id, chat_type=chat_type, limit=limit
-                ):
-                    # Apply date filtering if configured
-                    if date_from or date_to:
-                        msg_date = datetime.datetime.fromisoformat(
-                            message.get("createdDateTime", "")
-                        )
-
-                        if date_from and msg_date < date_from:
-                            continue
-
-                        if date_to and msg_date > date_to:
-                            continue
-
-                    messages.append(message)
-                    total_fetched += 1
-
-                    self.ui.update_progress(progress)
-
-                    # Check if we reached the limit
-                    if limit and total_fetched >= limit:
-                        break
+                with self.storage.open_message_writer(
+                    chat_dir=chat_dir,
+                    format=format_value,
+                    pretty=config.get("pretty", False),
+                ) as writer:
+                    oldest = ""
+
+                    def checkpoint() -> None:
+                        # Only record progress that is already on disk
+                        if oldest:
+                            writer.flush()
+                            self.storage.save_cursor(
+                                chat_dir,
+                                before=oldest,
+                                count=resumed + message_count,
+                                settings={
+                                    **settings,
+                                    "files": earlier_files + [writer.path.name],
+                                },
+                            )
+
+                    # Date range is applied by the API rather than filtered here
+                    stop = threading.Event()
+                    messages = self.api.get_all_messages(
+                        chat_id=chat_id,
+                        chat_type=chat_type,
+                        limit=limit,
+                        before_date=before,
+                        after_date=date_from,
+                        stop=stop,
+                    )
+                    try:
+                        # Fetch on a background thread so HTTP and disk I/O overlap
+                        for message in _prefetch(
+                            iter(messages), maxsize=self.PREFETCH_MESSAGES, stop=stop
+                        ):
+                            writer.write(message)
+                            message_count += 1
+                            pending_updates += 1
+                            oldest = message.get("createdDateTime") or oldest
+
+                            if message_count % TeamsApi.PAGE_SIZE == 0:
+                                checkpoint()
+
+                            if pending_updates >= self.PROGRESS_BATCH or (
+                                time.monotonic() - last_ui_update
+                                > self.PROGRESS_INTERVAL
+                            ):
+                                self.ui.update_progress(
+                                    progress, advance=pending_updates
+                                )
+                                pending_updates = 0
+                                last_ui_update = time.monotonic()
+
+                            # Check if we reached the limit
+                            if limit and message_count >= limit:
+                                break
+                    except (TeamsApiError, KeyboardInterrupt):
+                        # Let the next run resume instead of starting over
+                        checkpoint()
+                        raise
+
+                self.storage.clear_cursor(chat_dir)
             finally:
+                if pending_updates:
+                    self.ui.update_progress(progress, advance=pending_updates)
                 self.ui.stop_progress(progress)
 
-            if not messages:
+            if message_count == 0 and not resumed:
                 self.ui.warning("No messages found")
                 return chat_dir
 
-            self.ui.success(f"Downloaded {len(messages)} messages")
-
-            # Save messages
-            format_value = config.get("format", StorageFormat.JSON)
-
-            self.ui.info(f"Saving messages in {format_value.value} format...")
-            saved_path = self.storage.save_messages(
-                messages=messages, chat_dir=chat_dir, format=format_value
+            self.ui.success(f"Downloaded {message_count} messages")
+            self.ui.success(
+                f"Saved messages in {format_value.value} format to: {writer.path}"
             )
-
-            self.ui.success(f"Saved messages to: {saved_path}")
+            if earlier_files:
+                # Each run writes its own file, so a resumed export is split
+                self.ui.info(
+                    f"The {resumed} messages downloaded before the interruption "
+                    f"are in: {', '.join(earlier_files)} ({resumed + message_count} "
+                    "in total)"
+                )
 
             # TODO: Handle attachments
 
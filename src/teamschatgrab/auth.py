@@ -5,11 +5,37 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
+import base64
+import json
+import logging
 import os
+import time
+from pathlib import Path
 from typing import Optional, Dict, Any, Tuple
 
+from platformdirs import user_cache_dir
+
 from .platform_detection import PlatformType, detect_platform, get_teams_data_path
 
+try:
+    import plyvel  # type: ignore
+
+    PLYVEL_AVAILABLE = True
+except ImportError:
+    PLYVEL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Chromium localStorage keys for the Teams origin start with this prefix
+TEAMS_STORAGE_PREFIX = b"_https://teams.microsoft.com\x00\x01"
+# Substrings identifying localStorage keys that hold an auth token
+TOKEN_KEY_MARKERS = (b"skypetoken", b".cache.token")
+
+# Cached sessions are reused until this many seconds before they expire
+SESSION_EXPIRY_MARGIN = 60
+# Lifetime assumed for tokens whose expiry cannot be determined
+SESSION_DEFAULT_TTL = 3600
+
 
 class TeamsAuthError(Exception):
     """Exception raised for Teams authentication errors."""
@@ -17,6 +43,89 @@ class TeamsAuthError(Exception):
     pass
 
 
+def get_session_cache_path() -> Path:
+    """Get the path of the cached session file."""
+    return Path(user_cache_dir("teamschatgrab")) / "session.json"
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """Read the expiry timestamp from a JWT token, if it is one.
+
+    Returns:
+        Optional[float]: Expiry as a Unix timestamp, or None if unknown
+    """
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+
+    payload = parts[1] + "=" * (-len(parts[1]) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except ValueError:
+        return None
+
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def load_cached_session() -> Optional[Dict[str, Any]]:
+    """Load cached user info if it has not expired.
+
+    Returns:
+        Optional[Dict[str, Any]]: Cached user info, or None if unavailable
+    """
+    cache_path = get_session_cache_path()
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        info = cached["info"]
+        exp_ts = float(cached["exp_ts"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.debug(f"Ignoring unreadable session cache {cache_path}: {e}")
+        return None
+
+    if exp_ts <= time.time() + SESSION_EXPIRY_MARGIN:
+        return None
+
+    return dict(info)
+
+
+def save_cached_session(info: Dict[str, Any], exp_ts: Optional[float] = None) -> None:
+    """Cache user info so later runs can skip Teams storage discovery.
+
+    Args:
+        info: User info including the token
+        exp_ts: Expiry as a Unix timestamp (defaults to the token's expiry)
+    """
+    if exp_ts is None:
+        exp_ts = _token_expiry(info.get("token", ""))
+    if exp_ts is None:
+        exp_ts = time.time() + SESSION_DEFAULT_TTL
+
+    cache_path = get_session_cache_path()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # The cache holds a bearer token, so keep it private to the user
+        fd = os.open(cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"info": info, "exp_ts": exp_ts}, f)
+        os.chmod(cache_path, 0o600)
+    except OSError as e:
+        logger.debug(f"Failed to write session cache {cache_path}: {e}")
+
+
+def clear_cached_session() -> None:
+    """Remove the cached session, if any."""
+    try:
+        get_session_cache_path().unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.debug(f"Failed to remove session cache: {e}")
+
+
 def find_token_db_path() -> Optional[str]:
     """Find the path to the Teams token database."""
     teams_data_path = get_teams_data_path()
@@ -42,27 +151,97 @@ def find_token_db_path() -> Optional[str]:
     return None
 
 
-def get_current_user_info() -> Optional[Dict[str, Any]]:
-    """Get information about the currently logged-in Teams user."""
+def _decode_local_storage_value(value: bytes) -> str:
+    """Decode a Chromium localStorage value.
+
+    Values carry a leading flag byte: 0x00 for UTF-16-LE, 0x01 for Latin-1.
+    """
+    if value[:1] == b"\x00":
+        return value[1:].decode("utf-16-le", errors="replace")
+    if value[:1] == b"\x01":
+        return value[1:].decode("latin-1")
+    return value.decode("utf-8", errors="replace")
+
+
+def find_stored_token(token_db_path: str) -> Optional[str]:
+    """Look up the Teams auth token in the LevelDB store by key prefix.
+
+    Only keys under the Teams origin are visited, so the cost is a handful
+    of index lookups rather than reading every .ldb/.log file.
+
+    Args:
+        token_db_path: Path to the LevelDB directory
+
+    Returns:
+        Optional[str]: Token if found, None if not found or plyvel is missing
+    """
+    if not PLYVEL_AVAILABLE:
+        return None
+
+    try:
+        db = plyvel.DB(token_db_path, create_if_missing=False)
+    except Exception as e:
+        # Teams holds the database lock while it is running
+        logger.debug(f"Could not open token database {token_db_path}: {e}")
+        return None
+
+    try:
+        for key, value in db.iterator(prefix=TEAMS_STORAGE_PREFIX):
+            name = key[len(TEAMS_STORAGE_PREFIX) :]
+            if not any(marker in name for marker in TOKEN_KEY_MARKERS):
+                continue
+
+            token = _decode_local_storage_value(value)
+            try:
+                # Some entries wrap the token in a JSON object
+                data = json.loads(token)
+            except ValueError:
+                return token
+            if isinstance(data, dict):
+                return data.get("skypeToken") or data.get("token") or token
+            return token
+    finally:
+        db.close()
+
+    return None
+
+
+def get_current_user_info(use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """Get information about the currently logged-in Teams user.
+
+    Discovered user info is not cached here; callers cache it with
+    save_cached_session() once the token has been validated.
+
+    Args:
+        use_cache: Whether to reuse a previously cached session
+    """
     try:
+        if use_cache:
+            cached_info = load_cached_session()
+            if cached_info:
+                return cached_info
+
         token_db_path = find_token_db_path()
         if not token_db_path:
             return None
 
+        token = find_stored_token(token_db_path)
+
         # This is a placeholder - actual implementation would:
-        # 1. Parse the IndexedDB/LevelDB to extract user tokens
-        # 2. Decode the JWT or other token format
-        # 3. Extract user details
+        # 1. Decode the JWT or other token format
+        # 2. Extract user details
 
         # Simulate finding user info for testing purposes
         # In a real implementation, this would extract data from Teams storage
-        return {
+        user_info = {
             "user_id": "placeholder_user_id",
             "email": "user@example.com",
             "name": "Test User",
-            "token": "placeholder_token",
+            "token": token or "placeholder_token",
         }
 
+        return user_info
+
     except Exception as e:
         raise TeamsAuthError(f"Failed to get user info: {str(e)}") from e
 
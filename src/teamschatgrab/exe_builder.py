@@ -5,14 +5,19 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-from typing import Optional
+from typing import List, Optional
+import importlib.util
 import os
+import subprocess
 import sys
 import logging
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Supported packaging tools; Nuitka compiles to C for a faster cold start
+BUILD_BACKENDS = ("pyinstaller", "nuitka")
+
 
 class ExeBuilder:
     """Handles building standalone executable versions of the application."""
@@ -33,6 +38,7 @@ class ExeBuilder:
         name: str = "TeamsChatGrabber",
         onefile: bool = True,
         console: bool = False,
+        backend: str = "pyinstaller",
     ) -> Path:
         """Build a Windows executable.
 
@@ -40,14 +46,24 @@ class ExeBuilder:
             name: Name of the executable
             onefile: Whether to package as a single file
             console: Whether to show a console window
+            backend: Packaging tool, one of BUILD_BACKENDS
 
         Returns:
             Path to the created executable
 
         Raises:
-            ImportError: If PyInstaller is not installed
+            ImportError: If the packaging tool is not installed
+            ValueError: If the backend is not supported
             RuntimeError: If the build fails
         """
+        if backend == "nuitka":
+            return self._build_with_nuitka(name, onefile, console)
+        if backend != "pyinstaller":
+            raise ValueError(
+                f"Unsupported build backend: {backend} "
+                f"(expected one of {', '.join(BUILD_BACKENDS)})"
+            )
+
         try:
             import PyInstaller.__main__  # type: ignore
         except ImportError:
@@ -62,11 +78,19 @@ class ExeBuilder:
 
         logger.info(f"Building Windows executable: {name}")
 
+        # Reuse the analysis cache in build/ between runs; set
+        # TEAMSGRAB_CLEAN_BUILD to force a full rebuild
         args = [
             str(main_script),
             f"--name={name}",
+            "--noconfirm",
+            f"--workpath={self.base_path / 'build'}",
+            f"--distpath={self.dist_path}",
         ]
 
+        if os.environ.get("TEAMSGRAB_CLEAN_BUILD"):
+            args.append("--clean")
+
         if onefile:
             args.append("--onefile")
 
@@ -96,9 +120,82 @@ class ExeBuilder:
             logger.error(f"Failed to build executable: {e}")
             raise RuntimeError(f"Failed to build executable: {e}")
 
+    def _build_with_nuitka(self, name: str, onefile: bool, console: bool) -> Path:
+        """Build a Windows executable by compiling with Nuitka.
+
+        Args:
+            name: Name of the executable
+            onefile: Whether to package as a single file
+            console: Whether to show a console window
+
+        Returns:
+            Path to the created executable
+
+        Raises:
+            ImportError: If Nuitka is not installed
+            RuntimeError: If the build fails
+        """
+        if importlib.util.find_spec("nuitka") is None:
+            raise ImportError(
+                "Nuitka is required to build with the nuitka backend. "
+                "Install it with 'pip install nuitka'"
+            )
+
+        main_script = self.base_path / "main.py"
+        if not main_script.exists():
+            raise FileNotFoundError(f"Entry point not found: {main_script}")
+
+        logger.info(f"Building Windows executable with Nuitka: {name}")
+
+        args: List[str] = [
+            sys.executable,
+            "-m",
+            "nuitka",
+            "--standalone",
+            "--enable-plugin=anti-bloat",
+            "--include-package=teamschatgrab",
+            f"--output-dir={self.dist_path}",
+            f"--output-filename={name}.exe",
+        ]
+
+        if onefile:
+            args.append("--onefile")
+
+        if not console:
+            args.append("--windows-console-mode=disable")
+
+        license_path = self.base_path / "LICENSE"
+        if license_path.exists():
+            args.append(f"--include-data-files={license_path}=LICENSE")
+
+        args.append(str(main_script))
+
+        # Standalone builds land in <script>.dist next to the onefile output
+        if onefile:
+            exe_path = self.dist_path / f"{name}.exe"
+        else:
+            exe_path = self.dist_path / f"{main_script.stem}.dist" / f"{name}.exe"
+
+        try:
+            logger.debug(f"Running Nuitka with args: {args}")
+            subprocess.run(args, check=True)
+
+            if not exe_path.exists():
+                raise RuntimeError(f"Expected executable not found: {exe_path}")
+
+            logger.info(f"Successfully built executable: {exe_path}")
+            return exe_path
+
+        except Exception as e:
+            logger.error(f"Failed to build executable: {e}")
+            raise RuntimeError(f"Failed to build executable: {e}")
+
 
 def build_exe(
-    name: str = "TeamsChatGrabber", onefile: bool = True, console: bool = False
+    name: str = "TeamsChatGrabber",
+    onefile: bool = True,
+    console: bool = False,
+    backend: str = "pyinstaller",
 ) -> Path:
     """Build a platform-specific executable.
 
@@ -106,19 +203,21 @@ def build_exe(
         name: Name of the executable
         onefile: Whether to package as a single file
         console: Whether to show a console window
+        backend: Packaging tool, one of BUILD_BACKENDS
 
     Returns:
         Path to the created executable
 
     Raises:
-        ImportError: If PyInstaller is not installed
+        ImportError: If the packaging tool is not installed
+        ValueError: If the backend is not supported
         RuntimeError: If the build fails
         NotImplementedError: If platform is not supported
     """
     builder = ExeBuilder()
 
     if sys.platform.startswith("win"):
-        return builder.build_windows_exe(name, onefile, console)
+        return builder.build_windows_exe(name, onefile, console, backend)
     else:
         raise NotImplementedError(
             f"Building executables on {sys.platform} is not yet supported"
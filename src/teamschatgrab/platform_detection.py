@@ -6,6 +6,7 @@ MIT License
 """
 
 from enum import Enum
+import functools
 import os
 import platform
 import sys
@@ -22,8 +23,12 @@ class PlatformType(str, Enum):
     UNKNOWN = "unknown"
 
 
+@functools.lru_cache(maxsize=1)
 def detect_platform() -> PlatformType:
-    """Detect the current platform."""
+    """Detect the current platform.
+
+    The result is cached; call detect_platform.cache_clear() to re-probe.
+    """
     system = platform.system().lower()
 
     if system == "darwin":
@@ -39,8 +44,12 @@ def detect_platform() -> PlatformType:
     return PlatformType.UNKNOWN
 
 
+@functools.lru_cache(maxsize=1)
 def get_teams_data_path() -> Optional[str]:
-    """Get the platform-specific Teams data path."""
+    """Get the platform-specific Teams data path.
+
+    The result is cached; call get_teams_data_path.cache_clear() to re-probe.
+    """
     platform_type = detect_platform()
 
     if platform_type == PlatformType.WINDOWS:
@@ -59,8 +68,24 @@ def get_teams_data_path() -> Optional[str]:
     return None
 
 
+@functools.lru_cache(maxsize=1)
+def supports_unicode() -> bool:
+    """Check whether the terminal can display unicode symbols.
+
+    Legacy Windows consoles cannot; Windows Terminal (which sets WT_SESSION)
+    and other platforms can. The result is cached; call
+    clear_platform_cache() to re-probe.
+    """
+    return detect_platform() != PlatformType.WINDOWS or "WT_SESSION" in os.environ
+
+
+@functools.lru_cache(maxsize=1)
 def get_platform_info() -> Dict[str, Any]:
-    """Get detailed platform information."""
+    """Get detailed platform information.
+
+    The result is computed once per process and shared, so callers must not
+    modify it. Use clear_platform_cache() to re-probe.
+    """
     return {
         "platform": detect_platform(),
         "system": platform.system(),
@@ -69,3 +94,11 @@ def get_platform_info() -> Dict[str, Any]:
         "python_version": sys.version,
         "teams_data_path": get_teams_data_path(),
     }
+
+
+def clear_platform_cache() -> None:
+    """Clear cached platform probes so the next call re-detects them."""
+    detect_platform.cache_clear()
+    get_teams_data_path.cache_clear()
+    get_platform_info.cache_clear()
+    supports_unicode.cache_clear()
@@ -5,15 +5,24 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-import datetime
+import contextlib
+import html
 import json
-import re
+import os
+import time
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Iterator, Set, TextIO, Tuple
 
 from .api import ChatType
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 
 class StorageFormat(str, Enum):
     """Supported output formats for saving messages."""
@@ -30,6 +39,265 @@ class StorageError(Exception):
     pass
 
 
+_FILE_EXTENSIONS = {
+    StorageFormat.JSON: "json",
+    StorageFormat.TEXT: "txt",
+    StorageFormat.HTML: "html",
+    StorageFormat.MARKDOWN: "md",
+}
+
+# Pagination checkpoint kept in each chat directory while a download runs
+_CURSOR_FILENAME = ".cursor.json"
+
+# Buffer size for message files, so large exports hit the disk in big chunks
+_WRITE_BUFFER_SIZE = 1 << 20
+
+_TEXT_SEPARATOR = "-" * 50
+
+# Text written before the first and after the last message of each format
+_HEADERS = {
+    StorageFormat.JSON: "[",
+    StorageFormat.HTML: (
+        "<html><head><title>Teams Chat</title></head><body>\n"
+        "<div class='messages'>\n"
+    ),
+    StorageFormat.MARKDOWN: "# Teams Chat Export\n\n",
+}
+_FOOTERS = {StorageFormat.HTML: "</div></body></html>\n"}
+
+# Characters not allowed in filenames on Windows, mapped to underscores
+_SANITIZE_TABLE = str.maketrans({c: "_" for c in '<>:"/\\|?*'})
+
+# json.dumps builds a new encoder per call when given options, so keep them
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_PRETTY_JSON_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+
+def _message_fields(msg: Dict[str, Any]) -> Tuple[str, str, str]:
+    """Extract the sender, timestamp and content of a message.
+
+    Args:
+        msg: Message object
+
+    Returns:
+        Tuple[str, str, str]: (sender, timestamp, content)
+    """
+    # Indexing is faster than chained .get() calls for the complete messages
+    # that make up almost every export; gaps (or nulls) fall back below.
+    try:
+        sender = msg["sender"]["user"]["displayName"]
+    except (KeyError, TypeError):
+        sender = "Unknown"
+    try:
+        content = msg["body"]["content"]
+    except (KeyError, TypeError):
+        content = ""
+    return sender, msg.get("createdDateTime", ""), content
+
+
+class MessageWriter:
+    """Writes messages one at a time to an open file in a given format.
+
+    Serialized messages are coalesced in memory and handed to the file in
+    large chunks, bounded by FLUSH_BYTES and FLUSH_SECONDS.
+    """
+
+    FLUSH_BYTES = 4 << 20
+    FLUSH_SECONDS = 5.0
+
+    def __init__(
+        self, file: TextIO, format: StorageFormat, path: Path, pretty: bool = False
+    ):
+        """Initialize the writer and queue the format header.
+
+        Args:
+            file: Open text file to write to
+            format: Output format
+            path: Path of the file being written
+            pretty: Indent JSON output instead of one compact message per line
+        """
+        self.file = file
+        self.format = format
+        self.path = path
+        self.pretty = pretty
+        self.count = 0
+        self._closed = False
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._last_drain = time.monotonic()
+        # Escaped display names; chats are dominated by a handful of senders
+        self._html_senders: Dict[str, str] = {}
+
+        formatter = self._FORMATTERS.get(format)
+        if formatter is None:
+            raise StorageError(f"Unsupported output format: {format}")
+        self._format_message: Callable[[Dict[str, Any]], str] = getattr(self, formatter)
+
+        # The header goes out with the first batch of messages
+        header = _HEADERS.get(format)
+        if header:
+            self._emit(header)
+
+    def write(self, msg: Dict[str, Any]) -> None:
+        """Write a single message.
+
+        Args:
+            msg: Message object
+
+        Raises:
+            StorageError: If the message cannot be written
+        """
+        try:
+            self._emit(self._format_message(msg))
+        except Exception as e:
+            raise StorageError(f"Failed to save messages to {self.path}: {e}") from e
+
+        self.count += 1
+
+    def _format_json(self, msg: Dict[str, Any]) -> str:
+        """Serialize a message as the next JSON array element.
+
+        Args:
+            msg: Message object
+
+        Returns:
+            str: Separator and encoded message
+        """
+        record = self._encode_json(msg)
+        if self.pretty:
+            # Matches json.dump(messages, f, indent=2) one element at a time
+            separator = ",\n  " if self.count else "\n  "
+            return separator + record.replace("\n", "\n  ")
+        return (",\n" if self.count else "\n") + record
+
+    def _format_text(self, msg: Dict[str, Any]) -> str:
+        """Serialize a message as a plain text block.
+
+        Args:
+            msg: Message object
+
+        Returns:
+            str: Formatted message
+        """
+        sender, timestamp, content = _message_fields(msg)
+        return (
+            f"From: {sender}\n"
+            f"Time: {timestamp}\n"
+            f"Message: {content}\n"
+            f"{_TEXT_SEPARATOR}\n\n"
+        )
+
+    def _format_html(self, msg: Dict[str, Any]) -> str:
+        """Serialize a message as an HTML block.
+
+        Args:
+            msg: Message object
+
+        Returns:
+            str: Formatted message
+        """
+        sender, timestamp, content = _message_fields(msg)
+        # Bodies are already HTML; only the sender name needs escaping
+        name = self._html_senders.get(sender)
+        if name is None:
+            name = self._html_senders[sender] = html.escape(sender)
+        return (
+            "<div class='message'>\n"
+            f"  <div class='sender'>{name}</div>\n"
+            f"  <div class='time'>{timestamp}</div>\n"
+            f"  <div class='content'>{content}</div>\n"
+            "</div>\n"
+        )
+
+    def _format_markdown(self, msg: Dict[str, Any]) -> str:
+        """Serialize a message as a Markdown section.
+
+        Args:
+            msg: Message object
+
+        Returns:
+            str: Formatted message
+        """
+        sender, timestamp, content = _message_fields(msg)
+        return f"## {sender} - {timestamp}\n\n{content}\n\n---\n\n"
+
+    # Formatter method per output format, bound once per writer
+    _FORMATTERS = {
+        StorageFormat.JSON: "_format_json",
+        StorageFormat.TEXT: "_format_text",
+        StorageFormat.HTML: "_format_html",
+        StorageFormat.MARKDOWN: "_format_markdown",
+    }
+
+    def _encode_json(self, msg: Dict[str, Any]) -> str:
+        """Encode a single message as JSON.
+
+        Args:
+            msg: Message object
+
+        Returns:
+            str: Encoded message
+        """
+        if ORJSON_AVAILABLE:
+            option = orjson.OPT_INDENT_2 if self.pretty else 0
+            return orjson.dumps(msg, option=option).decode()
+        encoder = _PRETTY_JSON_ENCODER if self.pretty else _JSON_ENCODER
+        return encoder.encode(msg)
+
+    def _emit(self, text: str) -> None:
+        """Queue serialized output, draining it once enough has built up.
+
+        Args:
+            text: Serialized message
+        """
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if (
+            self._pending_size >= self.FLUSH_BYTES
+            or time.monotonic() - self._last_drain >= self.FLUSH_SECONDS
+        ):
+            self._drain()
+
+    def _drain(self) -> None:
+        """Hand queued output to the file in a single write."""
+        if self._pending:
+            self.file.write("".join(self._pending))
+            self._pending.clear()
+            self._pending_size = 0
+        self._last_drain = time.monotonic()
+
+    def flush(self) -> None:
+        """Flush written messages to disk.
+
+        Raises:
+            StorageError: If the file cannot be flushed
+        """
+        try:
+            self._drain()
+            self.file.flush()
+        except Exception as e:
+            raise StorageError(f"Failed to save messages to {self.path}: {e}") from e
+
+    def close(self) -> None:
+        """Emit the format footer. Safe to call more than once.
+
+        Raises:
+            StorageError: If the footer cannot be written
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            if self.format == StorageFormat.JSON:
+                self._pending.append("\n]" if self.count else "]")
+            elif self.format in _FOOTERS:
+                self._pending.append(_FOOTERS[self.format])
+            self._drain()
+        except Exception as e:
+            raise StorageError(f"Failed to save messages to {self.path}: {e}") from e
+
+
 class TeamsStorage:
     """Storage handler for Teams messages and attachments."""
 
@@ -45,6 +313,11 @@ class TeamsStorage:
             # Default to user's home directory
             self.base_path = Path.home() / "TeamsDownloads"
 
+        # Directories already created by this instance
+        self._dirs_created: Set[Path] = set()
+        # Attachment directory per chat, as a string for cheap path joins
+        self._attachment_dirs: Dict[Path, str] = {}
+
         # Ensure base directory exists
         self._ensure_dir(self.base_path)
 
@@ -57,10 +330,13 @@ class TeamsStorage:
         Raises:
             StorageError: If directory creation fails
         """
+        if path in self._dirs_created:
+            return
         try:
             path.mkdir(parents=True, exist_ok=True)
         except Exception as e:
             raise StorageError(f"Failed to create directory {path}: {e}") from e
+        self._dirs_created.add(path)
 
     def _sanitize_filename(self, name: str) -> str:
         """Sanitize a string for use as a filename.
@@ -72,7 +348,7 @@ class TeamsStorage:
             str: Sanitized filename
         """
         # Replace invalid characters with underscores
-        sanitized = re.sub(r'[<>:"/\\|?*]', "_", name)
+        sanitized = name.translate(_SANITIZE_TABLE)
         # Limit length
         if len(sanitized) > 200:
             sanitized = sanitized[:197] + "..."
@@ -99,16 +375,164 @@ class TeamsStorage:
         type_dir = self.base_path / chat_type.value
         chat_dir = type_dir / dir_name
 
+        attachments_dir = chat_dir / "attachments"
         self._ensure_dir(chat_dir)
-        self._ensure_dir(chat_dir / "attachments")
+        self._ensure_dir(attachments_dir)
+        self._attachment_dirs[chat_dir] = str(attachments_dir)
 
         return chat_dir
 
+    def _attachments_dir(self, chat_dir: Path) -> str:
+        """Get the attachments directory of a chat as a string.
+
+        Args:
+            chat_dir: Chat directory
+
+        Returns:
+            str: Attachments directory path
+        """
+        attachments_dir = self._attachment_dirs.get(chat_dir)
+        if attachments_dir is None:
+            attachments_dir = os.path.join(chat_dir, "attachments")
+            self._attachment_dirs[chat_dir] = attachments_dir
+        return attachments_dir
+
+    def _message_file_path(
+        self, chat_dir: Path, format: StorageFormat, timestamp: Optional[str] = None
+    ) -> Path:
+        """Build a timestamped path for a messages file.
+
+        Args:
+            chat_dir: Directory to save messages in
+            format: Output format
+            timestamp: Filename timestamp; defaults to the current local time
+
+        Returns:
+            Path: Path for the messages file
+
+        Raises:
+            StorageError: If the format is not supported
+        """
+        extension = _FILE_EXTENSIONS.get(format)
+        if extension is None:
+            raise StorageError(f"Unsupported output format: {format}")
+
+        timestamp = timestamp or time.strftime("%Y%m%d_%H%M%S")
+        return chat_dir / f"messages_{timestamp}.{extension}"
+
+    @contextlib.contextmanager
+    def open_message_writer(
+        self,
+        chat_dir: Path,
+        format: StorageFormat = StorageFormat.JSON,
+        pretty: bool = False,
+        timestamp: Optional[str] = None,
+    ) -> Iterator["MessageWriter"]:
+        """Open a writer that streams messages to a file as they arrive.
+
+        The file is finalized (e.g. the JSON array is closed) even if the
+        caller fails part-way, so partial downloads remain readable.
+
+        Args:
+            chat_dir: Directory to save messages in
+            format: Output format
+            pretty: Indent JSON output (slower and larger)
+            timestamp: Filename timestamp, so exports of the same chat in
+                several formats share one name; defaults to the current time
+
+        Yields:
+            MessageWriter: Writer accepting one message at a time
+
+        Raises:
+            StorageError: If the file cannot be opened or written
+        """
+        file_path = self._message_file_path(chat_dir, format, timestamp)
+
+        try:
+            f = open(file_path, "w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE)
+        except Exception as e:
+            raise StorageError(f"Failed to save messages to {file_path}: {e}") from e
+
+        with f:
+            writer = MessageWriter(f, format, file_path, pretty=pretty)
+            try:
+                yield writer
+            finally:
+                writer.close()
+
+    def load_cursor(self, chat_dir: Path) -> Optional[Dict[str, Any]]:
+        """Load the pagination checkpoint left by an interrupted download.
+
+        Args:
+            chat_dir: Chat directory
+
+        Returns:
+            Optional[Dict[str, Any]]: Checkpoint with "before", "count" and
+                any saved settings, or None if there is no usable checkpoint
+        """
+        try:
+            with open(chat_dir / _CURSOR_FILENAME, encoding="utf-8") as f:
+                cursor = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(cursor, dict) or not cursor.get("before"):
+            return None
+        return cursor
+
+    def save_cursor(
+        self,
+        chat_dir: Path,
+        before: str,
+        count: int,
+        settings: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Atomically record how far a download has progressed.
+
+        Args:
+            chat_dir: Chat directory
+            before: Timestamp of the oldest message written so far
+            count: Number of messages written so far
+            settings: Download settings and output files to store alongside
+                the position, so a later run can tell whether it matches
+
+        Raises:
+            StorageError: If the checkpoint cannot be written
+        """
+        path = chat_dir / _CURSOR_FILENAME
+        temp_path = path.with_suffix(".tmp")
+
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({**(settings or {}), "before": before, "count": count}, f)
+            os.replace(temp_path, path)
+        except Exception as e:
+            raise StorageError(f"Failed to save checkpoint to {path}: {e}") from e
+
+    def clear_cursor(self, chat_dir: Path) -> None:
+        """Remove the pagination checkpoint after a completed download.
+
+        Args:
+            chat_dir: Chat directory
+
+        Raises:
+            StorageError: If the checkpoint cannot be removed
+        """
+        path = chat_dir / _CURSOR_FILENAME
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            raise StorageError(f"Failed to remove checkpoint {path}: {e}") from e
+
     def save_messages(
         self,
         messages: List[Dict[str, Any]],
         chat_dir: Path,
         format: StorageFormat = StorageFormat.JSON,
+        pretty: bool = False,
+        timestamp: Optional[str] = None,
     ) -> Path:
         """Save messages to a file.
 
@@ -116,97 +540,27 @@ class TeamsStorage:
             messages: List of message objects
             chat_dir: Directory to save messages in
             format: Output format
+            pretty: Indent JSON output (slower and larger)
+            timestamp: Filename timestamp, so exports of the same chat in
+                several formats share one name; defaults to the current time
 
         Returns:
             Path: Path to the saved file
         """
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = self._message_file_path(chat_dir, format, timestamp)
 
-        if format == StorageFormat.JSON:
-            file_path = chat_dir / f"messages_{timestamp}.json"
-            try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(messages, f, indent=2, ensure_ascii=False)
-            except Exception as e:
-                raise StorageError(
-                    f"Failed to save messages to {file_path}: {e}"
-                ) from e
-
-        elif format == StorageFormat.TEXT:
-            file_path = chat_dir / f"messages_{timestamp}.txt"
-            try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    for msg in messages:
-                        sender = (
-                            msg.get("sender", {})
-                            .get("user", {})
-                            .get("displayName", "Unknown")
-                        )
-                        timestamp = msg.get("createdDateTime", "")
-                        content = msg.get("body", {}).get("content", "")
-
-                        f.write(f"From: {sender}\n")
-                        f.write(f"Time: {timestamp}\n")
-                        f.write(f"Message: {content}\n")
-                        f.write("-" * 50 + "\n\n")
-            except Exception as e:
-                raise StorageError(
-                    f"Failed to save messages to {file_path}: {e}"
-                ) from e
-
-        elif format == StorageFormat.HTML:
-            file_path = chat_dir / f"messages_{timestamp}.html"
-            try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write("<html><head><title>Teams Chat</title></head><body>\n")
-                    f.write("<div class='messages'>\n")
-
-                    for msg in messages:
-                        sender = (
-                            msg.get("sender", {})
-                            .get("user", {})
-                            .get("displayName", "Unknown")
-                        )
-                        timestamp = msg.get("createdDateTime", "")
-                        content = msg.get("body", {}).get("content", "")
-
-                        f.write("<div class='message'>\n")
-                        f.write(f"  <div class='sender'>{sender}</div>\n")
-                        f.write(f"  <div class='time'>{timestamp}</div>\n")
-                        f.write(f"  <div class='content'>{content}</div>\n")
-                        f.write("</div>\n")
-
-                    f.write("</div></body></html>\n")
-            except Exception as e:
-                raise StorageError(
-                    f"Failed to save messages to {file_path}: {e}"
-                ) from e
-
-        elif format == StorageFormat.MARKDOWN:
-            file_path = chat_dir / f"messages_{timestamp}.md"
-            try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write("# Teams Chat Export\n\n")
-
-                    for msg in messages:
-                        sender = (
-                            msg.get("sender", {})
-                            .get("user", {})
-                            .get("displayName", "Unknown")
-                        )
-                        timestamp = msg.get("createdDateTime", "")
-                        content = msg.get("body", {}).get("content", "")
-
-                        f.write(f"## {sender} - {timestamp}\n\n")
-                        f.write(f"{content}\n\n")
-                        f.write("---\n\n")
-            except Exception as e:
-                raise StorageError(
-                    f"Failed to save messages to {file_path}: {e}"
-                ) from e
-
-        else:
-            raise StorageError(f"Unsupported output format: {format}")
+        try:
+            with open(
+                file_path, "w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE
+            ) as f:
+                writer = MessageWriter(f, format, file_path, pretty=pretty)
+                for msg in messages:
+                    writer.write(msg)
+                writer.close()
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(f"Failed to save messages to {file_path}: {e}") from e
 
         return file_path
 
@@ -223,8 +577,9 @@ class TeamsStorage:
         Returns:
             Path: Path to the saved attachment
         """
-        sanitized_name = self._sanitize_filename(filename)
-        file_path = chat_dir / "attachments" / sanitized_name
+        file_path = os.path.join(
+            self._attachments_dir(chat_dir), self._sanitize_filename(filename)
+        )
 
         try:
             with open(file_path, "wb") as f:
@@ -232,4 +587,4 @@ class TeamsStorage:
         except Exception as e:
             raise StorageError(f"Failed to save attachment {filename}: {e}") from e
 
-        return file_path
+        return Path(file_path)
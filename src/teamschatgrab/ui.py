@@ -5,21 +5,61 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-import os
-import platform
+import importlib.util
 import sys
 from enum import Enum
-from typing import List, Any, Optional
+from types import MappingProxyType
+from typing import TYPE_CHECKING, List, Any, Mapping, Optional, TextIO
 
-try:
+if TYPE_CHECKING:
     from rich.console import Console
     from rich.progress import Progress, TextColumn, BarColumn, TaskProgressColumn
     from rich.prompt import Prompt, Confirm
     from rich.table import Table
 
-    RICH_AVAILABLE = True
-except ImportError:
-    RICH_AVAILABLE = False
+from .platform_detection import PlatformType, detect_platform, supports_unicode
+
+# rich is slow to import, so only check that it is installed here and load it
+# when a rich UI is actually created
+RICH_AVAILABLE = importlib.util.find_spec("rich") is not None
+
+_RICH_NAMES = (
+    "Console",
+    "Progress",
+    "TextColumn",
+    "BarColumn",
+    "TaskProgressColumn",
+    "Prompt",
+    "Confirm",
+    "Table",
+)
+
+
+def _load_rich() -> None:
+    """Import rich and publish the classes used here as module globals."""
+    from rich.console import Console
+    from rich.progress import Progress, TextColumn, BarColumn, TaskProgressColumn
+    from rich.prompt import Prompt, Confirm
+    from rich.table import Table
+
+    globals().update(
+        Console=Console,
+        Progress=Progress,
+        TextColumn=TextColumn,
+        BarColumn=BarColumn,
+        TaskProgressColumn=TaskProgressColumn,
+        Prompt=Prompt,
+        Confirm=Confirm,
+        Table=Table,
+    )
+
+
+def __getattr__(name: str) -> Any:
+    """Load rich on first access to one of its classes through this module."""
+    if name in _RICH_NAMES and RICH_AVAILABLE:
+        _load_rich()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class LogLevel(str, Enum):
@@ -35,40 +75,63 @@ class LogLevel(str, Enum):
 class TerminalUI:
     """Terminal-based user interface."""
 
-    def __init__(self, use_rich: bool = True):
+    # Shared, read-only lookup tables so log() allocates nothing per call
+    _SYMBOLS_UNICODE: Mapping[LogLevel, str] = MappingProxyType(
+        {
+            LogLevel.DEBUG: "🔍",
+            LogLevel.INFO: "ℹ️",
+            LogLevel.WARNING: "⚠️",
+            LogLevel.ERROR: "❌",
+            LogLevel.SUCCESS: "✅",
+        }
+    )
+    _SYMBOLS_ASCII: Mapping[LogLevel, str] = MappingProxyType(
+        {
+            LogLevel.DEBUG: "[D]",
+            LogLevel.INFO: "[I]",
+            LogLevel.WARNING: "[W]",
+            LogLevel.ERROR: "[E]",
+            LogLevel.SUCCESS: "[S]",
+        }
+    )
+    _STYLE_MAP: Mapping[LogLevel, str] = MappingProxyType(
+        {
+            LogLevel.DEBUG: "dim",
+            LogLevel.INFO: "blue",
+            LogLevel.WARNING: "yellow",
+            LogLevel.ERROR: "bold red",
+            LogLevel.SUCCESS: "green",
+        }
+    )
+
+    def __init__(self, use_rich: bool = True, out: Optional[TextIO] = None):
         """Initialize the terminal UI.
 
         Args:
             use_rich: Whether to use rich formatting (if available)
+            out: Stream to write output to; defaults to whatever sys.stdout
+                is at the time of each write
         """
         self.use_rich = use_rich and RICH_AVAILABLE
+        self.out = out
+
+        # Redirected output gets plain lines: no symbols, styling or repaints.
+        # sys.stdout is None in windowed builds, which have no terminal at all.
+        stream = out or sys.stdout
+        self._tty = bool(stream and stream.isatty())
 
         if self.use_rich:
-            self.console = Console()
+            _load_rich()
+            self.console = Console(file=out)
 
         # Detect terminal capabilities
-        self.is_windows = platform.system().lower() == "windows"
-        self.supports_unicode = (
-            not self.is_windows or os.environ.get("WT_SESSION") is not None
-        )
+        self.is_windows = detect_platform() == PlatformType.WINDOWS
+        self.supports_unicode = supports_unicode()
 
         # Set appropriate symbols based on terminal capabilities
-        if self.supports_unicode:
-            self.symbols = {
-                LogLevel.DEBUG: "🔍",
-                LogLevel.INFO: "ℹ️",
-                LogLevel.WARNING: "⚠️",
-                LogLevel.ERROR: "❌",
-                LogLevel.SUCCESS: "✅",
-            }
-        else:
-            self.symbols = {
-                LogLevel.DEBUG: "[D]",
-                LogLevel.INFO: "[I]",
-                LogLevel.WARNING: "[W]",
-                LogLevel.ERROR: "[E]",
-                LogLevel.SUCCESS: "[S]",
-            }
+        self.symbols = (
+            self._SYMBOLS_UNICODE if self.supports_unicode else self._SYMBOLS_ASCII
+        )
 
     def log(self, message: str, level: LogLevel = LogLevel.INFO) -> None:
         """Log a message to the console.
@@ -77,21 +140,18 @@ class TerminalUI:
             message: Message to log
             level: Log level
         """
+        if not self._tty:
+            print(f"{level.value.upper()}: {message}", file=self.out)
+            return
+
         symbol = self.symbols.get(level, "")
 
         if self.use_rich:
-            style_map = {
-                LogLevel.DEBUG: "dim",
-                LogLevel.INFO: "blue",
-                LogLevel.WARNING: "yellow",
-                LogLevel.ERROR: "bold red",
-                LogLevel.SUCCESS: "green",
-            }
-            style = style_map.get(level, "")
+            style = self._STYLE_MAP.get(level, "")
             self.console.print(f"{symbol} {message}", style=style)
         else:
             # Fallback to plain text
-            print(f"{symbol} {message}")
+            print(f"{symbol} {message}", file=self.out)
 
     def debug(self, message: str) -> None:
         """Log a debug message.
@@ -224,9 +284,9 @@ class TerminalUI:
             # Fallback to basic output
             for i, option in enumerate(options):
                 if descriptions and i < len(descriptions):
-                    print(f"{i+1}. {option} - {descriptions[i]}")
+                    print(f"{i+1}. {option} - {descriptions[i]}", file=self.out)
                 else:
-                    print(f"{i+1}. {option}")
+                    print(f"{i+1}. {option}", file=self.out)
 
             # Get selection
             selection = None
@@ -236,9 +296,12 @@ class TerminalUI:
                     if 1 <= value <= len(options):
                         selection = value - 1
                     else:
-                        print(f"Please enter a number between 1 and {len(options)}")
+                        print(
+                            f"Please enter a number between 1 and {len(options)}",
+                            file=self.out,
+                        )
                 except ValueError:
-                    print("Please enter a valid number")
+                    print("Please enter a valid number", file=self.out)
 
             return selection
 
@@ -283,21 +346,41 @@ class TerminalUI:
             progress_obj["current"] += advance
             current = progress_obj["current"]
             total = progress_obj["total"]
+            percent = current / total * 100
+            finished = current >= total
+
+            if not self._tty:
+                # No carriage-return redraws; report completion once
+                if finished and not progress_obj.get("_finished"):
+                    progress_obj["_finished"] = True
+                    print(
+                        f"{progress_obj['description']}: {current}/{total}",
+                        file=self.out,
+                    )
+                return
+
+            # Repaint only when the whole percentage changes or on completion
+            if int(percent) == progress_obj.get("_last_percent") and (
+                not finished or progress_obj.get("_finished")
+            ):
+                return
+            progress_obj["_last_percent"] = int(percent)
 
             # Display basic progress bar
             width = 40
             filled = int(width * current / total)
-            percent = current / total * 100
 
             bar = (
                 f"[{'=' * filled}{' ' * (width - filled)}] {percent:.1f}% "
                 f"({current}/{total})"
             )
-            sys.stdout.write(f"\r{progress_obj['description']}: {bar}")
-            sys.stdout.flush()
+            out = self.out or sys.stdout
+            out.write(f"\r{progress_obj['description']}: {bar}")
+            out.flush()
 
-            if current >= total:
-                print()  # Add a newline at the end
+            if finished and not progress_obj.get("_finished"):
+                progress_obj["_finished"] = True
+                print(file=self.out)  # Add a newline at the end
 
     def start_progress(self, progress_obj: Any) -> None:
         """Start a progress bar context.
@@ -324,6 +407,17 @@ class TerminalUI:
             and "progress" in progress_obj
         ):
             progress_obj["progress"].stop()
+        elif not progress_obj.get("_finished"):
+            # Stopped short of the estimated total, so report where it ended
+            progress_obj["_finished"] = True
+            if not self._tty:
+                print(
+                    f"{progress_obj['description']}: "
+                    f"{progress_obj['current']}/{progress_obj['total']}",
+                    file=self.out,
+                )
+            elif "_last_percent" in progress_obj:
+                print(file=self.out)  # End the partially drawn bar's line
 
     def display_table(
         self, headers: List[str], rows: List[List[str]], title: Optional[str] = None
@@ -348,7 +442,7 @@ class TerminalUI:
         else:
             # Fallback to basic table display
             if title:
-                print(f"\n{title}")
+                print(f"\n{title}", file=self.out)
 
             # Calculate column widths
             col_widths = [len(h) for h in headers]
@@ -358,9 +452,12 @@ class TerminalUI:
 
             # Print headers
             header_row = " | ".join(f"{h:<{w}}" for h, w in zip(headers, col_widths))
-            print(header_row)
-            print("-" * len(header_row))
+            print(header_row, file=self.out)
+            print("-" * len(header_row), file=self.out)
 
             # Print rows
             for row in rows:
-                print(" | ".join(f"{cell:<{w}}" for cell, w in zip(row, col_widths)))
+                print(
+                    " | ".join(f"{cell:<{w}}" for cell, w in zip(row, col_widths)),
+                    file=self.out,
+                )
@@ -0,0 +1,80 @@
+"""Shared fixtures for the architecture tests.
+
+Copyright (C) 2025 Eric C. Mumford (@heymumford)
+MIT License
+"""
+
+import ast
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from .introspection import module_source, parse_module
+
+# Modules are parsed from source, never imported, so collection stays cheap
+INSPECTED_MODULES = ("app", "api", "ui", "storage", "exe_builder", "platform_detection")
+
+
+def _load_ast(name: str, cache_dir: Path) -> ast.Module:
+    """Parse a module, reusing the tree pickled by an earlier run if unchanged.
+
+    Args:
+        name: Dotted module name
+        cache_dir: Directory holding pickled trees
+
+    Returns:
+        ast.Module: Parsed module
+    """
+    source = module_source(name)
+    # AST node classes differ between interpreter versions
+    key = hashlib.sha256(
+        f"{sys.version_info[:3]}\0{source}".encode("utf-8")
+    ).hexdigest()
+    path = cache_dir / f"{key}.pkl"
+
+    try:
+        with open(path, "rb") as f:
+            tree = pickle.load(f)
+        if isinstance(tree, ast.Module):
+            return tree
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    tree = ast.parse(source)
+    # xdist workers share the cache, so publish each pickle atomically
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        # The cache is only an optimization
+        pass
+    return tree
+
+
+@pytest.fixture(scope="session")
+def module_ast(pytestconfig: pytest.Config) -> Dict[str, ast.Module]:
+    """Parse each inspected teamschatgrab module once per test session.
+
+    Trees are keyed by the module's short name (e.g. "app") and are also
+    pickled in the pytest cache keyed by source hash, so warm runs skip
+    parsing entirely until a module changes.
+    """
+    cache = getattr(pytestconfig, "cache", None)
+    if cache is None:
+        # Running with -p no:cacheprovider
+        return {
+            name: parse_module(f"teamschatgrab.{name}") for name in INSPECTED_MODULES
+        }
+
+    cache_dir = Path(cache.makedir("arch_ast"))
+    return {
+        name: _load_ast(f"teamschatgrab.{name}", cache_dir)
+        for name in INSPECTED_MODULES
+    }
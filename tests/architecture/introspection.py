@@ -0,0 +1,233 @@
+"""Cached introspection helpers shared by the architecture tests.
+
+Copyright (C) 2025 Eric C. Mumford (@heymumford)
+MIT License
+"""
+
+import ast
+import functools
+import importlib.util
+import inspect
+import types
+from typing import Any, Callable, FrozenSet, List, Optional, Set, Tuple
+
+# The inspected code does not change during a test run, so each object's
+# source and signature only need to be looked up once.
+getsource: Callable[[Any], str] = functools.lru_cache(maxsize=None)(inspect.getsource)
+signature: Callable[[Callable[..., Any]], inspect.Signature] = functools.lru_cache(
+    maxsize=None
+)(inspect.signature)
+
+
+@functools.lru_cache(maxsize=None)
+def functions(cls: type) -> Tuple[Tuple[str, Callable[..., Any]], ...]:
+    """List the functions defined directly on a class.
+
+    Reads the class namespace instead of inspect.getmembers, which resolves
+    every inherited attribute through getattr. The inspected classes have no
+    base classes of their own, so the result is the same.
+
+    Args:
+        cls: Class to inspect
+
+    Returns:
+        Tuple[Tuple[str, Callable[..., Any]], ...]: (name, function) pairs
+    """
+    return tuple(
+        (name, value)
+        for name, value in vars(cls).items()
+        if isinstance(value, types.FunctionType)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def module_source(name: str) -> str:
+    """Read a module's source without importing it.
+
+    Args:
+        name: Dotted module name
+
+    Returns:
+        str: Module source
+
+    Raises:
+        ModuleNotFoundError: If the module has no source file
+    """
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.origin:
+        raise ModuleNotFoundError(f"No source for {name}")
+    with open(spec.origin, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@functools.lru_cache(maxsize=None)
+def parse_module(name: str) -> ast.Module:
+    """Parse a module's source without importing it.
+
+    Args:
+        name: Dotted module name
+
+    Returns:
+        ast.Module: Parsed module
+    """
+    return ast.parse(module_source(name))
+
+
+def find_def(tree: ast.AST, qualname: str) -> ast.AST:
+    """Find a class or function definition by its dotted name.
+
+    Args:
+        tree: Parsed module
+        qualname: Name such as "TeamsApi" or "TeamsApi.get_chats"
+
+    Returns:
+        ast.AST: The matching definition node
+
+    Raises:
+        LookupError: If no definition has that name
+    """
+    node = tree
+    for part in qualname.split("."):
+        for child in ast.iter_child_nodes(node):
+            if (
+                isinstance(child, (ast.ClassDef, ast.FunctionDef))
+                and child.name == part
+            ):
+                node = child
+                break
+        else:
+            raise LookupError(f"{qualname} is not defined")
+    return node
+
+
+def public_methods(tree: ast.AST, class_name: str) -> List[ast.FunctionDef]:
+    """List the public methods defined directly on a class.
+
+    Args:
+        tree: Parsed module
+        class_name: Name of the class
+
+    Returns:
+        List[ast.FunctionDef]: Method definitions not starting with "_"
+    """
+    return [
+        node
+        for node in ast.iter_child_nodes(find_def(tree, class_name))
+        if isinstance(node, ast.FunctionDef) and not node.name.startswith("_")
+    ]
+
+
+def method_names(tree: ast.AST, class_name: str) -> FrozenSet[str]:
+    """Collect the names of all methods defined directly on a class.
+
+    Args:
+        tree: Parsed module
+        class_name: Name of the class
+
+    Returns:
+        FrozenSet[str]: Method names, private ones included
+    """
+    return frozenset(
+        node.name
+        for node in ast.iter_child_nodes(find_def(tree, class_name))
+        if isinstance(node, ast.FunctionDef)
+    )
+
+
+def dotted_name(node: ast.AST) -> Optional[str]:
+    """Render a name or attribute chain such as self.ui.info.
+
+    Args:
+        node: Expression node
+
+    Returns:
+        Optional[str]: Dotted name, or None for other expressions
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = dotted_name(node.value)
+        return f"{base}.{node.attr}" if base else None
+    return None
+
+
+class MethodProbe(ast.NodeVisitor):
+    """Collect everything the architecture tests ask about a node in one walk.
+
+    Attributes:
+        calls: Dotted names of called functions, e.g. "self.ui.info"
+        attributes: Dotted attribute chains that are referenced
+        raises: Names of raised exceptions
+        excepts: Names of caught exceptions ("" for a bare except)
+        imports: Imported module names
+    """
+
+    def __init__(self) -> None:
+        self.calls: Set[str] = set()
+        self.attributes: Set[str] = set()
+        self.raises: Set[str] = set()
+        self.excepts: Set[str] = set()
+        self.imports: Set[str] = set()
+
+    def visit_Call(self, node: ast.Call) -> None:
+        name = dotted_name(node.func)
+        if name:
+            self.calls.add(name)
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        name = dotted_name(node)
+        if name:
+            self.attributes.add(name)
+        self.generic_visit(node)
+
+    def visit_Raise(self, node: ast.Raise) -> None:
+        exc = node.exc.func if isinstance(node.exc, ast.Call) else node.exc
+        name = dotted_name(exc) if exc is not None else None
+        if name:
+            self.raises.add(name)
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.type is None:
+            self.excepts.add("")
+        else:
+            caught = node.type.elts if isinstance(node.type, ast.Tuple) else [node.type]
+            self.excepts.update(filter(None, map(dotted_name, caught)))
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        self.imports.update(alias.name for alias in node.names)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module:
+            self.imports.add(node.module)
+
+
+@functools.lru_cache(maxsize=None)
+def probe(node: ast.AST) -> MethodProbe:
+    """Walk a node once and remember what it calls, raises, catches and imports.
+
+    Args:
+        node: Definition or module node
+
+    Returns:
+        MethodProbe: Collected facts about the node
+    """
+    result = MethodProbe()
+    result.visit(node)
+    return result
+
+
+def calls(node: ast.AST, target: str) -> bool:
+    """Check whether a node calls a name or anything under it.
+
+    Args:
+        node: Definition or module node
+        target: Name such as "open" or "self.ui"
+
+    Returns:
+        bool: True if target, or an attribute of it, is called
+    """
+    prefix = target + "."
+    return any(name == target or name.startswith(prefix) for name in probe(node).calls)
@@ -4,7 +4,12 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-import inspect
+import re
+
+from .introspection import functions, getsource, signature
+
+# Imports of frameworks the use cases must not touch, matched in a single pass
+_FRAMEWORK_IMPORT = re.compile(r"(?:import|from) (?:requests|rich)\b")
 
 
 def test_domain_entities_have_no_external_dependencies():
@@ -14,14 +19,14 @@ def test_domain_entities_have_no_external_dependencies():
     from teamschatgrab.storage import StorageFormat
 
     # Get the ChatType source code
-    chat_type_source = inspect.getsource(ChatType)
+    chat_type_source = getsource(ChatType)
 
     # Core entities should not reference adapter modules or external frameworks
     assert "teamschatgrab.ui" not in chat_type_source
     assert "teamschatgrab.app" not in chat_type_source
 
     # Get the StorageFormat source code
-    storage_format_source = inspect.getsource(StorageFormat)
+    storage_format_source = getsource(StorageFormat)
 
     # Core entities should only depend on standard library
     assert "teamschatgrab.ui" not in storage_format_source
@@ -34,14 +39,11 @@ def test_use_cases_dont_depend_on_frameworks():
     from teamschatgrab.app import TeamsChatGrabber
 
     # Get the source code of the TeamsChatGrabber class
-    app_source = inspect.getsource(TeamsChatGrabber)
+    app_source = getsource(TeamsChatGrabber)
 
-    # Use cases should not directly import external frameworks
-    assert "import requests" not in app_source
-    assert "from requests import" not in app_source
-    # Rich is a UI framework and should be isolated in UI layer
-    assert "import rich" not in app_source
-    assert "from rich import" not in app_source
+    # Use cases should not directly import external frameworks; rich is a UI
+    # framework and should be isolated in the UI layer
+    assert not _FRAMEWORK_IMPORT.search(app_source)
 
 
 def test_interface_adapters_dont_depend_on_frameworks_directly():
@@ -53,15 +55,15 @@ def test_interface_adapters_dont_depend_on_frameworks_directly():
     from teamschatgrab.api import TeamsApi
 
     # Check TerminalUI interface
-    terminal_ui_methods = inspect.getmembers(TerminalUI, predicate=inspect.isfunction)
+    terminal_ui_methods = functions(TerminalUI)
     for name, method in terminal_ui_methods:
         # Public methods should not return framework-specific types
         if not name.startswith("_"):
-            signature = inspect.signature(method)
+            sig = signature(method)
             for param in (
-                signature.return_annotation.__args__
-                if hasattr(signature.return_annotation, "__args__")
-                else [signature.return_annotation]
+                sig.return_annotation.__args__
+                if hasattr(sig.return_annotation, "__args__")
+                else [sig.return_annotation]
             ):
                 param_str = str(param)
                 assert (
@@ -69,15 +71,15 @@ def test_interface_adapters_dont_depend_on_frameworks_directly():
                 ), f"UI adapter method {name} returns framework type: {param}"
 
     # Check TeamsApi interface
-    api_methods = inspect.getmembers(TeamsApi, predicate=inspect.isfunction)
+    api_methods = functions(TeamsApi)
     for name, method in api_methods:
         # Public methods should not return framework-specific types
         if not name.startswith("_"):
-            signature = inspect.signature(method)
+            sig = signature(method)
             for param in (
-                signature.return_annotation.__args__
-                if hasattr(signature.return_annotation, "__args__")
-                else [signature.return_annotation]
+                sig.return_annotation.__args__
+                if hasattr(sig.return_annotation, "__args__")
+                else [sig.return_annotation]
             ):
                 param_str = str(param)
                 assert (
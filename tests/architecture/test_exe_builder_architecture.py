@@ -6,13 +6,22 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-import inspect
+import re
 from pathlib import Path
 
 import pytest
 
 from teamschatgrab.exe_builder import ExeBuilder, build_exe
 
+from .introspection import getsource, signature
+
+# Imports of the application layers, matched in a single pass
+_APP_MODULE_IMPORT = re.compile(r"from teamschatgrab\.(?:app|api|auth|ui) import")
+
+# Signatures inspected by the interface tests, computed once at import
+_BUILD_EXE_SIG = signature(build_exe)
+_BUILD_METHOD_SIG = signature(ExeBuilder.build_windows_exe)
+
 
 class TestExeBuilderArchitecture:
     """Tests for exe_builder module architecture."""
@@ -27,24 +36,21 @@ class TestExeBuilderArchitecture:
         assert "build_exe" in globals()
         
         # ExeBuilder method should not contain platform detection logic
-        exe_builder_source = inspect.getsource(ExeBuilder.build_windows_exe)
+        exe_builder_source = getsource(ExeBuilder.build_windows_exe)
         assert "sys.platform" not in exe_builder_source
         
         # build_exe function should contain platform detection
-        build_exe_source = inspect.getsource(build_exe)
+        build_exe_source = getsource(build_exe)
         assert "sys.platform" in build_exe_source
 
     def test_dependency_direction(self):
         """Test that dependencies flow in the correct direction."""
         # ExeBuilder should not depend on the main application
         # It should be a standalone utility that the application depends on
-        exe_builder_source = inspect.getsource(ExeBuilder)
+        exe_builder_source = getsource(ExeBuilder)
         
         # Should not import from other teamschatgrab modules
-        assert "from teamschatgrab.app import" not in exe_builder_source
-        assert "from teamschatgrab.api import" not in exe_builder_source
-        assert "from teamschatgrab.auth import" not in exe_builder_source
-        assert "from teamschatgrab.ui import" not in exe_builder_source
+        assert not _APP_MODULE_IMPORT.search(exe_builder_source)
         
         # Should have minimal dependencies
         assert exe_builder_source.count("import ") < 5
@@ -56,10 +62,9 @@ class TestExeBuilderArchitecture:
         assert hasattr(ExeBuilder, "build_windows_exe")
         
         # The public function should have clear parameters
-        signature = inspect.signature(build_exe)
-        assert "name" in signature.parameters
-        assert "onefile" in signature.parameters
-        assert "console" in signature.parameters
+        assert "name" in _BUILD_EXE_SIG.parameters
+        assert "onefile" in _BUILD_EXE_SIG.parameters
+        assert "console" in _BUILD_EXE_SIG.parameters
         
         # All public methods should have docstrings
         assert ExeBuilder.__init__.__doc__ is not None
@@ -76,15 +81,12 @@ class TestExeBuilderArchitecture:
         assert builder.base_path == custom_path
         assert builder.dist_path == custom_path / "dist"
         
-        # Methods should support parameter customization
-        method = ExeBuilder.build_windows_exe
-        signature = inspect.signature(method)
-        
         # Default parameters should exist but be overridable
-        assert signature.parameters["name"].default == "TeamsChatGrabber"
-        assert signature.parameters["onefile"].default is True
-        assert signature.parameters["console"].default is False
+        params = _BUILD_METHOD_SIG.parameters
+        assert params["name"].default == "TeamsChatGrabber"
+        assert params["onefile"].default is True
+        assert params["console"].default is False
         
         # Return value should be well-defined and documented
-        assert "Returns:" in method.__doc__
-        assert "Path" in method.__doc__
\ No newline at end of file
+        assert "Returns:" in ExeBuilder.build_windows_exe.__doc__
+        assert "Path" in ExeBuilder.build_windows_exe.__doc__
\ No newline at end of file
@@ -4,118 +4,95 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-import inspect
+import pytest
 
-from teamschatgrab.app import TeamsChatGrabber
-from teamschatgrab.api import TeamsApi
-from teamschatgrab.storage import TeamsStorage
+from .introspection import (
+    calls,
+    find_def,
+    method_names,
+    parse_module,
+    public_methods,
+)
 
+# Read from source rather than by importing the app, so collection stays cheap
+APP_METHODS = [
+    method.name
+    for method in public_methods(parse_module("teamschatgrab.app"), "TeamsChatGrabber")
+]
 
-def test_app_interacts_through_interfaces_only():
-    """Test that app layer interacts with outer layers through well-defined interfaces."""
-    # Analyze the TeamsChatGrabber constructor and methods
-    app_class = TeamsChatGrabber
-
-    # Check constructor
-    app_init = app_class.__init__
-    app_init_source = inspect.getsource(app_init)
 
+def test_app_initializes_collaborators_through_interfaces(module_ast):
+    """Test that app layer interacts with outer layers through well-defined interfaces."""
     # App should initialize UI, storage through proper abstraction
-    assert "TerminalUI(" in app_init_source
-    assert "TeamsStorage(" in app_init_source
-
-    # App methods should use self.ui, self.api, self.storage, not direct imports
-    app_methods = [
-        method
-        for name, method in inspect.getmembers(app_class, predicate=inspect.isfunction)
-        if not name.startswith("_")
-    ]
+    app_init = find_def(module_ast["app"], "TeamsChatGrabber.__init__")
+    assert calls(app_init, "TerminalUI")
+    assert calls(app_init, "TeamsStorage")
+
 
-    for method in app_methods:
-        source = inspect.getsource(method)
+@pytest.mark.parametrize("name", APP_METHODS)
+def test_app_method_uses_interfaces_only(name, module_ast):
+    """Test that app methods use self.ui, self.api, self.storage, not direct access."""
+    method = find_def(module_ast["app"], f"TeamsChatGrabber.{name}")
 
-        # For UI operations, app should use self.ui, not direct terminal output
-        if "ui" in source:
-            assert "self.ui." in source
-            assert "print(" not in source
+    # For UI operations, app should use self.ui, not direct terminal output
+    if calls(method, "self.ui"):
+        assert not calls(method, "print")
 
-        # For API operations, app should use self.api, not direct API calls
-        if "api" in source and "self.api =" not in source:
-            assert "self.api." in source
-            assert "requests." not in source
+    # For API operations, app should use self.api, not direct API calls
+    if calls(method, "self.api"):
+        assert not calls(method, "requests")
 
-        # For storage operations, app should use self.storage, not direct file operations
-        if (
-            "storage" in source
-            and "self.storage =" not in source
-            and method.__name__ != "configure_download"
-        ):
-            assert "self.storage." in source
-            assert "open(" not in source
-            assert "Path(" not in source
+    # For storage operations, app should use self.storage, not direct file operations
+    if calls(method, "self.storage") and name != "configure_download":
+        assert not calls(method, "open")
+        assert not calls(method, "Path")
 
 
-def test_api_provides_clean_interface():
+def test_api_provides_clean_interface(module_ast):
     """Test that API adapter provides clean interface to use cases."""
-    api_class = TeamsApi
+    tree = module_ast["api"]
 
     # API should provide domain-specific methods, not generic HTTP methods
-    api_public_methods = [
-        name
-        for name, method in inspect.getmembers(api_class, predicate=inspect.isfunction)
-        if not name.startswith("_")
-    ]
+    api_public_methods = {
+        method.name: method for method in public_methods(tree, "TeamsApi")
+    }
 
     # API should have domain-specific methods
-    assert "get_chats" in api_public_methods
-    assert "get_channels" in api_public_methods
-    assert "get_messages" in api_public_methods
+    missing = {"get_chats", "get_channels", "get_messages"} - api_public_methods.keys()
+    assert not missing, f"API is missing {sorted(missing)}"
 
     # API should hide HTTP details in private methods
     api_private_methods = [
-        name
-        for name, method in inspect.getmembers(api_class, predicate=inspect.isfunction)
-        if name.startswith("_")
+        name for name in method_names(tree, "TeamsApi") if name.startswith("_")
     ]
 
     # Should have private method for HTTP details
     assert any("request" in name.lower() for name in api_private_methods)
 
-    # Check that public methods use private methods for HTTP details
-    for method_name in api_public_methods:
-        method = getattr(api_class, method_name)
-        source = inspect.getsource(method)
+    # Public methods go through the private request helper, never HTTP directly
+    for name, method in api_public_methods.items():
+        assert not calls(method, "requests"), name
+        assert not calls(method, "self.session"), name
 
-        if "request" in source:
-            assert "self._make_request" in source
+    for name in ("get_chats", "get_channels", "get_messages"):
+        assert calls(api_public_methods[name], "self._make_request"), name
 
 
-def test_storage_provides_clean_interface():
+def test_storage_provides_clean_interface(module_ast):
     """Test that storage adapter provides clean interface to use cases."""
-    storage_class = TeamsStorage
+    storage_methods = method_names(module_ast["storage"], "TeamsStorage")
 
     # Storage should provide domain-specific methods, not generic file methods
-    storage_public_methods = [
-        name
-        for name, method in inspect.getmembers(
-            storage_class, predicate=inspect.isfunction
-        )
-        if not name.startswith("_")
-    ]
+    storage_private_methods = {name for name in storage_methods if name.startswith("_")}
+    storage_public_methods = storage_methods - storage_private_methods
 
     # Storage should have domain-specific methods
-    assert "create_chat_directory" in storage_public_methods
-    assert "save_messages" in storage_public_methods
-    assert "save_attachment" in storage_public_methods
+    missing = {
+        "create_chat_directory",
+        "save_messages",
+        "save_attachment",
+    } - storage_public_methods
+    assert not missing, f"Storage is missing {sorted(missing)}"
 
     # Storage should hide file system details in private methods
-    storage_private_methods = [
-        name
-        for name, method in inspect.getmembers(
-            storage_class, predicate=inspect.isfunction
-        )
-        if name.startswith("_")
-    ]
-
-    # Should have private methods for file system details
     assert any("dir" in name.lower() for name in storage_private_methods)
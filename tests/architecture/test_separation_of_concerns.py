@@ -4,74 +4,107 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-import inspect
-
-from teamschatgrab.app import TeamsChatGrabber
-from teamschatgrab.api import TeamsApi
-from teamschatgrab.ui import TerminalUI
-from teamschatgrab.storage import TeamsStorage
-from teamschatgrab.platform_detection import get_teams_data_path
+import functools
+from types import SimpleNamespace
+
+import pytest
+
+from .introspection import (
+    calls,
+    find_def,
+    getsource,
+    method_names,
+    probe,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _teamschatgrab() -> SimpleNamespace:
+    """Import the inspected classes on first use rather than at collection."""
+    from teamschatgrab.api import TeamsApi
+    from teamschatgrab.app import TeamsChatGrabber
+    from teamschatgrab.platform_detection import get_teams_data_path
+    from teamschatgrab.storage import TeamsStorage
+
+    return SimpleNamespace(
+        TeamsApi=TeamsApi,
+        TeamsChatGrabber=TeamsChatGrabber,
+        TeamsStorage=TeamsStorage,
+        get_teams_data_path=get_teams_data_path,
+    )
 
 
-def test_ui_logic_separated_from_business_logic():
+# Builtins that talk to the terminal directly instead of through the UI layer
+TERMINAL_IO_CALLS = frozenset({"print", "input"})
+
+
+# UI methods belong in the UI class, not the app class
+UI_SPECIFIC_METHODS = [
+    "log",
+    "info",
+    "error",
+    "warning",
+    "success",
+    "prompt",
+    "select_option",
+    "confirm",
+    "progress",
+    "display_table",
+]
+
+# Business logic methods belong in the app class, not the UI class
+BUSINESS_METHODS = [
+    "check_environment",
+    "authenticate",
+    "list_chats",
+    "select_chat",
+    "configure_download",
+    "download_chat",
+]
+
+
+@pytest.fixture(scope="module")
+def class_method_names(module_ast):
+    """Method names of the app and UI classes, collected once for this module."""
+    return {
+        "app": method_names(module_ast["app"], "TeamsChatGrabber"),
+        "ui": method_names(module_ast["ui"], "TerminalUI"),
+    }
+
+
+@pytest.mark.parametrize("method", UI_SPECIFIC_METHODS)
+def test_ui_method_lives_in_ui_layer(method, class_method_names):
     """Test that UI logic is separated from business logic."""
-    # Analyze app and UI classes
-    app_methods = inspect.getmembers(TeamsChatGrabber, predicate=inspect.isfunction)
-    ui_methods = inspect.getmembers(TerminalUI, predicate=inspect.isfunction)
-
-    app_method_names = [name for name, _ in app_methods]
-    ui_method_names = [name for name, _ in ui_methods]
-
-    # UI methods should be in UI class, not in app class
-    ui_specific_methods = [
-        "log",
-        "info",
-        "error",
-        "warning",
-        "success",
-        "prompt",
-        "select_option",
-        "confirm",
-        "progress",
-        "display_table",
-    ]
-
-    for method in ui_specific_methods:
-        assert method in ui_method_names, f"UI method {method} not found in UI class"
-        assert method not in app_method_names, f"UI method {method} found in app class"
-
-    # Business logic methods should be in app class, not in UI class
-    business_methods = [
-        "check_environment",
-        "authenticate",
-        "list_chats",
-        "select_chat",
-        "configure_download",
-        "download_chat",
-    ]
-
-    for method in business_methods:
-        assert (
-            method in app_method_names
-        ), f"Business method {method} not found in app class"
-        assert (
-            method not in ui_method_names
-        ), f"Business method {method} found in UI class"
+    assert (
+        method in class_method_names["ui"]
+    ), f"UI method {method} not found in UI class"
+    assert (
+        method not in class_method_names["app"]
+    ), f"UI method {method} found in app class"
+
+
+@pytest.mark.parametrize("method", BUSINESS_METHODS)
+def test_business_method_lives_in_app_layer(method, class_method_names, module_ast):
+    """Test that business logic stays in the app and does no terminal I/O."""
+    assert (
+        method in class_method_names["app"]
+    ), f"Business method {method} not found in app class"
+    assert (
+        method not in class_method_names["ui"]
+    ), f"Business method {method} found in UI class"
 
     # App methods should not contain UI rendering code
-    for name, method in app_methods:
-        if name in business_methods:
-            source = inspect.getsource(method)
-            assert (
-                "print(" not in source
-            ), f"Direct print statement found in business method {name}"
-            assert (
-                "input(" not in source
-            ), f"Direct input statement found in business method {name}"
+    node = find_def(module_ast["app"], f"TeamsChatGrabber.{method}")
+    terminal_io = probe(node).calls & TERMINAL_IO_CALLS
+    assert (
+        not terminal_io
+    ), f"Direct {sorted(terminal_io)} found in business method {method}"
 
 
 def test_platform_detection_responsibilities():
     """Test that platform detection has proper responsibility allocation."""
+    T = _teamschatgrab()
+
     # Platform detection should be responsible for determining platform-specific paths
     # Other modules should delegate this responsibility to platform_detection
 
@@ -79,7 +112,7 @@ def test_platform_detection_responsibilities():
     # but should not have platform-specific path logic
 
     # Check that app class uses platform_detection module
-    app_source = inspect.getsource(TeamsChatGrabber)
+    app_source = getsource(T.TeamsChatGrabber)
     assert "platform_info = get_platform_info()" in app_source
 
     # The app should not implement its own platform detection
@@ -87,7 +120,7 @@ def test_platform_detection_responsibilities():
     assert "os.name" not in app_source
 
     # Platform-specific paths should be determined in platform_detection module
-    platform_detection_source = inspect.getsource(get_teams_data_path)
+    platform_detection_source = getsource(T.get_teams_data_path)
 
     # Platform detection module should handle different paths per platform
     assert (
@@ -102,33 +135,42 @@ def test_platform_detection_responsibilities():
     )
 
 
-def test_data_persistence_responsibilities():
+def test_data_persistence_responsibilities(module_ast):
     """Test that data persistence has proper responsibility allocation."""
     # Check that app class delegates file operations to storage module
-    app_download_chat = inspect.getsource(TeamsChatGrabber.download_chat)
+    app_download_chat = find_def(module_ast["app"], "TeamsChatGrabber.download_chat")
 
     # App should use storage for file operations
-    assert "self.storage.create_chat_directory" in app_download_chat
-    assert "self.storage.save_messages" in app_download_chat
+    assert calls(app_download_chat, "self.storage.create_chat_directory")
+    assert calls(app_download_chat, "self.storage.open_message_writer")
 
     # App should not perform direct file operations
-    assert "open(" not in app_download_chat
-    assert "with open" not in app_download_chat
+    assert not calls(app_download_chat, "open")
 
     # Storage module should be responsible for file operations
-    storage_save_messages = inspect.getsource(TeamsStorage.save_messages)
+    storage_save_messages = find_def(
+        module_ast["storage"], "TeamsStorage.save_messages"
+    )
 
     # Storage should handle different file formats
-    assert "open(" in storage_save_messages or "with open" in storage_save_messages
-    assert "json.dump" in storage_save_messages or "write(" in storage_save_messages
+    assert calls(storage_save_messages, "open")
+    assert calls(storage_save_messages, "json.dump") or any(
+        name.endswith(".write") for name in probe(storage_save_messages).calls
+    )
+
+    # Streaming writes should also be owned by storage
+    storage_open_writer = find_def(
+        module_ast["storage"], "TeamsStorage.open_message_writer"
+    )
+    assert calls(storage_open_writer, "open")
 
     # Check that API doesn't do file operations
-    api_source = inspect.getsource(TeamsApi)
-    assert "open(" not in api_source
-    assert "Path(" not in api_source
+    api_class = find_def(module_ast["api"], "TeamsApi")
+    assert not calls(api_class, "open")
+    assert not calls(api_class, "Path")
 
 
-def test_error_handling_pattern():
+def test_error_handling_pattern(module_ast):
     """Test that error handling follows clean architecture principles."""
     # Verify each layer defines its own exceptions
     from teamschatgrab.api import TeamsApiError
@@ -141,26 +183,21 @@ def test_error_handling_pattern():
     assert issubclass(StorageError, Exception)
 
     # App should catch and handle errors from lower layers in its public interface
-    download_chat_method = TeamsChatGrabber.download_chat
-    download_chat_source = inspect.getsource(download_chat_method)
+    download_chat = probe(find_def(module_ast["app"], "TeamsChatGrabber.download_chat"))
 
     # App should protect its public interface with error handling
-    assert "try:" in download_chat_source
-    assert "except" in download_chat_source
+    assert download_chat.excepts
 
     # API should handle network errors and translate them to domain exceptions
-    api_request_method = TeamsApi._make_request
-    api_request_source = inspect.getsource(api_request_method)
+    api_request = probe(find_def(module_ast["api"], "TeamsApi._make_request"))
 
     # API should catch external exceptions and throw domain-specific ones
-    assert "except requests.RequestException" in api_request_source
-    assert "raise TeamsApiError" in api_request_source
+    assert "requests.RequestException" in api_request.excepts
+    assert "TeamsApiError" in api_request.raises
 
     # Storage should handle file system errors
-    storage_save = TeamsStorage.save_messages
-    storage_save_source = inspect.getsource(storage_save)
+    storage_save = probe(find_def(module_ast["storage"], "TeamsStorage.save_messages"))
 
     # Storage should protect against file system errors
-    assert "try:" in storage_save_source
-    assert "except" in storage_save_source
-    assert "raise StorageError" in storage_save_source
+    assert storage_save.excepts
+    assert "StorageError" in storage_save.raises
@@ -4,13 +4,31 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
+import contextlib
 from unittest import mock
 from pathlib import Path
 
+import pytest
+
 from teamschatgrab.app import TeamsChatGrabber
 from teamschatgrab.api import ChatType
+from teamschatgrab.platform_detection import PlatformType
 from teamschatgrab.storage import StorageFormat
 
+# Build the module-scoped patched app once rather than once per worker
+pytestmark = pytest.mark.xdist_group("patched_app")
+
+
+class _Progress:
+    """Progress state handed out by MockUI."""
+
+    __slots__ = ("total", "current", "description")
+
+    def __init__(self, total, current=0, description=""):
+        self.total = total
+        self.current = current
+        self.description = description
+
 
 class MockUI:
     """Mock UI implementation to substitute for TerminalUI."""
@@ -20,6 +38,14 @@ class MockUI:
         self.prompts = []
         self.selections = []
         self.confirmations = []
+        self.reset()
+
+    def reset(self):
+        """Forget recorded calls so one instance can serve many tests."""
+        self.log_messages.clear()
+        self.prompts.clear()
+        self.selections.clear()
+        self.confirmations.clear()
         self.next_input = "mock input"
         self.next_selection = 0
         self.next_confirmation = True
@@ -52,13 +78,13 @@ class MockUI:
         return self.next_confirmation
 
     def progress(self, total, description):
-        return {"total": total, "current": 0, "description": description}
+        return _Progress(total, 0, description)
 
     def start_progress(self, progress):
         pass
 
     def update_progress(self, progress, advance=1):
-        progress["current"] += advance
+        progress.current += advance
 
     def stop_progress(self, progress):
         pass
@@ -70,27 +96,35 @@ class MockUI:
 class MockTeamsApi:
     """Mock API implementation to substitute for TeamsApi."""
 
+    # Canned responses, shared by every instance and restored by reset()
+    CHATS = [
+        {
+            "id": "chat123",
+            "displayName": "Test Chat",
+            "isGroup": False,
+            "participants": [
+                {"displayName": "User 1"},
+                {"displayName": "User 2"},
+            ],
+        }
+    ]
+    MESSAGES = [
+        {
+            "id": "msg1",
+            "createdDateTime": "2023-01-01T12:00:00Z",
+            "sender": {"user": {"displayName": "User 1"}},
+            "body": {"content": "Hello from mock!"},
+        }
+    ]
+
     def __init__(self, token):
         self.token = token
-        self.chats_data = [
-            {
-                "id": "chat123",
-                "displayName": "Test Chat",
-                "isGroup": False,
-                "participants": [
-                    {"displayName": "User 1"},
-                    {"displayName": "User 2"},
-                ],
-            }
-        ]
-        self.messages_data = [
-            {
-                "id": "msg1",
-                "createdDateTime": "2023-01-01T12:00:00Z",
-                "sender": {"user": {"displayName": "User 1"}},
-                "body": {"content": "Hello from mock!"},
-            }
-        ]
+        self.reset()
+
+    def reset(self):
+        """Restore the canned data so one instance can serve many tests."""
+        self.chats_data = self.CHATS
+        self.messages_data = self.MESSAGES
 
     def get_chats(self):
         return self.chats_data
@@ -98,12 +132,15 @@ class MockTeamsApi:
     def get_channels(self, team_id):
         return []
 
-    def get_messages(self, chat_id, chat_type, limit=None, before_date=None):
+    def get_messages(
+        self, chat_id, chat_type, limit=None, before_date=None, after_date=None
+    ):
         return self.messages_data
 
-    def get_all_messages(self, chat_id, chat_type, limit=None):
-        for msg in self.messages_data:
-            yield msg
+    def get_all_messages(
+        self, chat_id, chat_type, limit=None, before_date=None, after_date=None
+    ):
+        yield from self.messages_data
 
 
 class MockStorage:
@@ -114,108 +151,145 @@ class MockStorage:
         self.saved_messages = []
         self.saved_attachments = []
 
+    def reset(self):
+        """Forget saved content so one instance can serve many tests."""
+        self.saved_messages.clear()
+        self.saved_attachments.clear()
+
     def create_chat_directory(self, chat_name, chat_id, chat_type):
         return self.base_path / chat_type.value / f"{chat_name}_{chat_id[-8:]}"
 
-    def save_messages(self, messages, chat_dir, format=StorageFormat.JSON):
+    def save_messages(
+        self,
+        messages,
+        chat_dir,
+        format=StorageFormat.JSON,
+        pretty=False,
+        timestamp=None,
+    ):
         self.saved_messages.append((messages, chat_dir, format))
         return chat_dir / f"messages_mock.{format.value}"
 
+    @contextlib.contextmanager
+    def open_message_writer(
+        self, chat_dir, format=StorageFormat.JSON, pretty=False, timestamp=None
+    ):
+        written = []
+        yield mock.Mock(
+            write=written.append, path=chat_dir / f"messages_mock.{format.value}"
+        )
+        self.saved_messages.append((written, chat_dir, format))
+
+    def load_cursor(self, chat_dir):
+        return None
+
+    def save_cursor(self, chat_dir, before, count):
+        pass
+
+    def clear_cursor(self, chat_dir):
+        pass
+
     def save_attachment(self, attachment_data, filename, chat_dir):
         self.saved_attachments.append((attachment_data, filename, chat_dir))
         return chat_dir / "attachments" / filename
 
 
-def test_app_uses_ui_interface():
-    """Test that app interacts with UI through interfaces."""
-    # Mock platform info to avoid filesystem operations
-    with mock.patch(
-        "teamschatgrab.app.get_platform_info"
-    ) as mock_platform_info, mock.patch(
-        "teamschatgrab.storage.TeamsStorage._ensure_dir"
-    ), mock.patch(
-        "os.path.exists", return_value=True
-    ):
-        # Configure mocks - platform_type needs to have a value attribute
-        from teamschatgrab.platform_detection import PlatformType
+_MODULE_MOCK_UI = MockUI()
 
-        mock_platform_info.return_value = {
-            "platform": PlatformType.MACOS,
-            "teams_data_path": "/mock/teams/path",
-        }
 
-        # Create app with real UI but mocked environment
-        app = TeamsChatGrabber(output_dir=None, use_rich_ui=True)
+@pytest.fixture
+def mock_ui():
+    """Reuse one MockUI across tests, cleared before each use."""
+    _MODULE_MOCK_UI.reset()
+    return _MODULE_MOCK_UI
+
 
-        # Mock the app's UI class with a spy to track calls
-        mock_ui = mock.MagicMock()
-        app.ui = mock_ui
+@pytest.fixture(scope="module")
+def patched_app():
+    """Build one app in a mocked environment, shared by the tests below.
+
+    Each test injects the collaborator it inspects, so the patched
+    environment and constructor are only paid for once.
+    """
+    platform_info = {
+        "platform": PlatformType.MACOS,
+        "teams_data_path": "/mock/teams/path",
+    }
+    patches = (
+        # Mock platform info to avoid filesystem operations
+        mock.patch("teamschatgrab.app.get_platform_info", return_value=platform_info),
+        mock.patch("teamschatgrab.storage.TeamsStorage._ensure_dir"),
+        mock.patch("os.path.exists", return_value=True),
+    )
+    with contextlib.ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+
+        yield TeamsChatGrabber(output_dir=None, use_rich_ui=False)
+
+
+def test_app_uses_ui_interface(patched_app, mock_ui):
+    """Test that app interacts with UI through interfaces."""
+    app = patched_app
 
-        # Run the operation that uses the UI
-        app.check_environment()
+    # Substitute the recording UI for the terminal one
+    app.ui = mock_ui
 
-        # Verify app used UI through interface
-        assert mock_ui.info.called
-        assert mock_ui.success.called
+    # Run the operation that uses the UI
+    app.check_environment()
 
+    # Verify app used UI through interface
+    levels = {level for _, level in mock_ui.log_messages}
+    assert {"info", "success"} <= levels
 
-def test_app_uses_api_interface():
+
+def test_app_uses_api_interface(patched_app):
     """Test that app interacts with API through interfaces."""
-    # Mock the necessary components to avoid file system operations
-    with mock.patch("teamschatgrab.storage.TeamsStorage._ensure_dir"), mock.patch(
-        "teamschatgrab.app.get_platform_info"
-    ):
-        # Create app with minimal initialization
-        app = TeamsChatGrabber(use_rich_ui=False)
+    app = patched_app
 
-        # Create mock API and inject it
-        mock_api = mock.MagicMock()
-        mock_api.get_chats.return_value = [
-            {"id": "chat123", "displayName": "Test Chat", "isGroup": False}
-        ]
-        app.api = mock_api
+    # Create mock API and inject it
+    mock_api = mock.MagicMock()
+    mock_api.get_chats.return_value = [
+        {"id": "chat123", "displayName": "Test Chat", "isGroup": False}
+    ]
+    app.api = mock_api
 
-        # Set up a mock UI to prevent terminal output
-        app.ui = mock.MagicMock()
+    # Set up a mock UI to prevent terminal output
+    app.ui = mock.MagicMock()
 
-        # Run the operation that uses the API
-        app.list_chats()
+    # Run the operation that uses the API
+    app.list_chats()
 
-        # Verify app used API through interface
-        assert mock_api.get_chats.called
+    # Verify app used API through interface
+    assert mock_api.get_chats.called
 
 
-def test_app_uses_storage_interface():
+def test_app_uses_storage_interface(patched_app):
     """Test that app uses storage through interface."""
-    # Mock the necessary components to avoid file system operations
-    with mock.patch("teamschatgrab.storage.TeamsStorage._ensure_dir"), mock.patch(
-        "teamschatgrab.app.get_platform_info"
-    ):
-        # Create app with minimal initialization
-        app = TeamsChatGrabber(use_rich_ui=False)
-
-        # Mock the storage and inject it
-        mock_storage = mock.MagicMock()
-        mock_storage.create_chat_directory.return_value = Path("/mock/chat/dir")
-        mock_storage.save_messages.return_value = Path("/mock/chat/dir/messages.json")
-        app.storage = mock_storage
-
-        # Mock API for test data
-        app.api = mock.MagicMock()
-        app.api.get_all_messages.return_value = [
-            {"id": "msg1", "createdDateTime": "2023-01-01T12:00:00Z"}
-        ]
-
-        # Mock UI to prevent output
-        app.ui = mock.MagicMock()
-
-        # Run the operation that uses storage
-        chat = {"id": "chat123", "displayName": "Test Chat"}
-        chat_type = ChatType.DIRECT
-        config = {"format": StorageFormat.JSON}
-
-        app.download_chat(chat, chat_type, config)
-
-        # Verify app used storage through interface
-        assert mock_storage.create_chat_directory.called
-        assert mock_storage.save_messages.called
+    app = patched_app
+
+    # Mock the storage and inject it
+    mock_storage = mock.MagicMock()
+    mock_storage.create_chat_directory.return_value = Path("/mock/chat/dir")
+    mock_storage.save_messages.return_value = Path("/mock/chat/dir/messages.json")
+    app.storage = mock_storage
+
+    # Mock API for test data
+    app.api = mock.MagicMock()
+    app.api.get_all_messages.return_value = [
+        {"id": "msg1", "createdDateTime": "2023-01-01T12:00:00Z"}
+    ]
+
+    # Mock UI to prevent output
+    app.ui = mock.MagicMock()
+
+    # Run the operation that uses storage
+    chat = {"id": "chat123", "displayName": "Test Chat"}
+    chat_type = ChatType.DIRECT
+    config = {"format": StorageFormat.JSON}
+
+    app.download_chat(chat, chat_type, config)
+
+    # Verify app used storage through interface
+    assert mock_storage.create_chat_directory.called
+    assert mock_storage.open_message_writer.called
@@ -5,6 +5,7 @@ MIT License
 """
 
 import os
+import runpy
 import sys
 import subprocess
 from pathlib import Path
@@ -14,6 +15,12 @@ import pytest
 
 from teamschatgrab.exe_builder import build_exe
 
+REPO_ROOT = Path(__file__).resolve().parents[2]
+BUILD_SCRIPT = REPO_ROOT / "build_exe.py"
+
+# Build the module-scoped PyInstaller stub once rather than once per worker
+pytestmark = pytest.mark.xdist_group("pyinstaller_integration")
+
 
 @pytest.fixture
 def mock_subprocess_run():
@@ -26,16 +33,28 @@ def mock_subprocess_run():
         yield mock_run
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_pyinstaller_import():
-    """Mock PyInstaller import to bypass actual installation requirement."""
+    """Mock PyInstaller import to bypass actual installation requirement.
+
+    Module scoped so sys.modules is patched and restored once for this file
+    rather than around every test.
+    """
     mock_module = mock.MagicMock()
     mock_module.__main__ = mock.MagicMock()
-    mock_module.__main__.run = mock.MagicMock()
     
-    with mock.patch.dict("sys.modules", {"PyInstaller": mock_module}):
-        with mock.patch.dict("sys.modules", {"PyInstaller.__main__": mock_module.__main__}):
-            yield mock_module.__main__
+    with mock.patch.dict(
+        "sys.modules",
+        {"PyInstaller": mock_module, "PyInstaller.__main__": mock_module.__main__},
+    ):
+        yield mock_module.__main__
+
+
+@pytest.fixture(autouse=True)
+def reset_pyinstaller_mock(request):
+    """Give each test that uses the shared PyInstaller mock a clean call history."""
+    if "mock_pyinstaller_import" in request.fixturenames:
+        request.getfixturevalue("mock_pyinstaller_import").reset_mock()
 
 
 @pytest.fixture
@@ -52,31 +71,20 @@ class TestExeBuildProcess:
     @pytest.mark.skipif(sys.platform != "win32", reason="Windows-only test")
     def test_build_script_execution(self, mock_subprocess_run, tmp_path):
         """Test execution of the build_exe.py script."""
-        # Copy the script to a temporary location
-        build_script = Path(os.path.abspath(os.path.join(
-            os.path.dirname(__file__), "..", "..", "build_exe.py"
-        )))
-        
-        # Execute the script as a subprocess
-        result = subprocess.run(
-            [sys.executable, str(build_script), "--console"],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
+        # Run the script in-process so the subprocess.run mock applies
+        with mock.patch.object(sys, "argv", [str(BUILD_SCRIPT), "--console"]):
+            with pytest.raises(SystemExit):
+                runpy.run_path(str(BUILD_SCRIPT), run_name="__main__")
         
         # Verify the script runs without error when PyInstaller is available
         mock_subprocess_run.assert_called_once()
         assert "--console" in str(mock_subprocess_run.call_args)
 
+    @pytest.mark.skipif(not sys.platform.startswith("win"), reason="Windows-only test")
     def test_build_integration_with_pyinstaller(
         self, mock_pyinstaller_import, mock_exe_file_creation
     ):
         """Test integration between our module and PyInstaller."""
-        # Skip the test if we're not on Windows
-        if not sys.platform.startswith("win"):
-            pytest.skip("Windows-only test")
-        
         # Call our build function
         result = build_exe(name="TestIntegration", console=True, onefile=False)
         
@@ -118,9 +126,7 @@ class TestBuildExeMockHelpers:
                     name = arg.split("=")[1]
             
             # Determine dist path
-            curr_dir = os.path.abspath(os.path.dirname(__file__))
-            base_dir = os.path.dirname(os.path.dirname(curr_dir))
-            self.dist_path = Path(base_dir) / "dist" / f"{name}.exe"
+            self.dist_path = REPO_ROOT / "dist" / f"{name}.exe"
             
             if not self.build_successful:
                 raise RuntimeError("Mock build failure")
@@ -0,0 +1,130 @@
+"""Shared fixtures for the unit tests.
+
+Copyright (C) 2025 Eric C. Mumford (@heymumford)
+MIT License
+"""
+
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+import pytest
+
+from teamschatgrab.platform_detection import PlatformType
+
+
+@pytest.fixture
+def stdin_value(monkeypatch: pytest.MonkeyPatch) -> Dict[str, str]:
+    """Answer every input() call with the string stored under "value"."""
+    holder: Dict[str, str] = {"value": ""}
+    monkeypatch.setattr("builtins.input", lambda *args, **kwargs: holder["value"])
+    return holder
+
+
+# Payloads are built once per session and exposed read-only; fixtures that
+# hand them to code under test wrap them in fresh containers and mocks.
+
+
+@pytest.fixture(scope="session")
+def platform_payload() -> Mapping[str, Any]:
+    """Platform info as returned by get_platform_info on macOS."""
+    return MappingProxyType(
+        {
+            "platform": PlatformType.MACOS,
+            "system": "Darwin",
+            "release": "21.6.0",
+            "version": "Darwin Kernel Version 21.6.0",
+            "python_version": "3.9.0",
+            "teams_data_path": (
+                "/Users/testuser/Library/Application Support/Microsoft/Teams"
+            ),
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def user_payload() -> Mapping[str, Any]:
+    """User info as returned by get_current_user_info."""
+    return MappingProxyType(
+        {
+            "user_id": "user123",
+            "email": "user@example.com",
+            "name": "Test User",
+            "token": "valid_token_123",
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def chat_payload() -> Tuple[Mapping[str, Any], ...]:
+    """One direct chat and one group chat as returned by get_chats."""
+    return (
+        MappingProxyType(
+            {
+                "id": "chat123",
+                "displayName": "Test Chat 1",
+                "isGroup": False,
+                "participants": (
+                    MappingProxyType({"displayName": "User 1"}),
+                    MappingProxyType({"displayName": "User 2"}),
+                ),
+            }
+        ),
+        MappingProxyType(
+            {
+                "id": "chat456",
+                "displayName": "Test Group",
+                "isGroup": True,
+                "participants": (
+                    MappingProxyType({"displayName": "User 1"}),
+                    MappingProxyType({"displayName": "User 2"}),
+                    MappingProxyType({"displayName": "User 3"}),
+                ),
+            }
+        ),
+    )
+
+
+@pytest.fixture(scope="session")
+def message_payload() -> Tuple[Mapping[str, Any], ...]:
+    """Two plain messages as yielded by get_all_messages."""
+    return (
+        MappingProxyType(
+            {
+                "id": "msg1",
+                "createdDateTime": "2023-01-01T12:00:00Z",
+                "sender": {"user": {"displayName": "User 1"}},
+                "body": {"content": "Hello"},
+            }
+        ),
+        MappingProxyType(
+            {
+                "id": "msg2",
+                "createdDateTime": "2023-01-01T12:01:00Z",
+                "sender": {"user": {"displayName": "User 2"}},
+                "body": {"content": "Hi there"},
+            }
+        ),
+    )
+
+
+@pytest.fixture(scope="session")
+def sample_messages() -> Tuple[Dict[str, Any], ...]:
+    """Two Teams messages as handed to TeamsStorage.save_messages.
+
+    Kept as plain dicts so they stay JSON-serializable; the tuple stops
+    tests from mutating the shared payload.
+    """
+    return (
+        {
+            "id": "msg1",
+            "sender": {"user": {"displayName": "Test User 1"}},
+            "createdDateTime": "2025-01-15T10:30:00Z",
+            "body": {"content": "This is a test message"},
+        },
+        {
+            "id": "msg2",
+            "sender": {"user": {"displayName": "Test User 2"}},
+            "createdDateTime": "2025-01-15T10:35:00Z",
+            "body": {"content": "This is a reply"},
+        },
+    )
@@ -6,44 +6,89 @@ MIT License
 """
 
 import datetime
+import threading
 from unittest import mock
 import pytest
 import requests
 
-from teamschatgrab.api import TeamsApi, TeamsApiError, TeamsAuthError, ChatType
+from teamschatgrab import api as api_module
+from teamschatgrab.api import (
+    TeamsApi,
+    TeamsApiError,
+    TeamsAuthError,
+    TeamsRateLimitError,
+    TokenBucket,
+    ChatType,
+    _decode_json,
+    _find_list_key,
+    _is_older,
+    _utc_iso_bound,
+)
 
 
-@pytest.fixture
-def mock_session():
-    """Mock requests session."""
-    with mock.patch("teamschatgrab.api.requests.Session") as mock_session:
-        session_instance = mock_session.return_value
-        session_instance.request.return_value = mock.Mock(
-            status_code=200, json=mock.Mock(return_value={"data": "test_data"})
-        )
-        yield session_instance
+class _FakeResponse:
+    """Plain stand-in for requests.Response with just what the client reads."""
+
+    def __init__(self, status_code, payload=None, headers=None, error=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._payload = payload
+        self._error = error
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self._error is not None:
+            raise self._error
+
+
+# Fake responses are never mutated, so pagination tests can share them
+_EMPTY_PAGE = _FakeResponse(200, {"messages": []})
+_PAGES = (
+    _FakeResponse(
+        200,
+        {
+            "messages": [
+                {"id": "msg1", "createdDateTime": "2023-01-02T00:00:00"},
+                {"id": "msg2", "createdDateTime": "2023-01-01T00:00:00"},
+            ]
+        },
+    ),
+    _EMPTY_PAGE,
+)
+
+
+@pytest.fixture(autouse=True)
+def stdlib_json():
+    """Decode with response.json(), which the fake responses provide."""
+    with mock.patch("teamschatgrab.api.ORJSON_AVAILABLE", False):
+        yield
+
+
+@pytest.fixture(scope="module")
+def _session_patch():
+    """Patch requests.Session once for the whole module."""
+    with mock.patch("teamschatgrab.api.requests.Session") as mock_session_class:
+        yield mock_session_class
 
 
 @pytest.fixture
-def mock_session_auth_error():
-    """Mock requests session with auth error."""
-    with mock.patch("teamschatgrab.api.requests.Session") as mock_session:
-        session_instance = mock_session.return_value
-        response = mock.Mock(status_code=401)
-        response.raise_for_status.side_effect = requests.HTTPError("401 Unauthorized")
-        session_instance.request.return_value = response
-        yield session_instance
+def mock_session(_session_patch):
+    """Mock requests session, reset to a successful response for each test."""
+    session_instance = _session_patch.return_value
+    session_instance.reset_mock(return_value=True, side_effect=True)
+    session_instance.request.return_value = _FakeResponse(200, {"data": "test_data"})
+    return session_instance
 
 
 @pytest.fixture
-def mock_session_api_error():
-    """Mock requests session with API error."""
-    with mock.patch("teamschatgrab.api.requests.Session") as mock_session:
-        session_instance = mock_session.return_value
-        response = mock.Mock(status_code=500)
-        response.raise_for_status.side_effect = requests.HTTPError("500 Server Error")
-        session_instance.request.return_value = response
-        yield session_instance
+def mock_session_with_status(request, mock_session):
+    """Mock requests session answering with request.param's (status, error)."""
+    status_code, exc = request.param
+    if exc is not None:
+        mock_session.request.return_value = _FakeResponse(status_code, error=exc)
+    return mock_session
 
 
 @pytest.fixture
@@ -52,6 +97,18 @@ def api_client(mock_session):
     return TeamsApi(token="test_token")
 
 
+@pytest.fixture(scope="class")
+def shared_api_client(_session_patch):
+    """API client shared by tests that only read through it.
+
+    Tests that touch the rate limiter, list-key cache or init-time session
+    setup use the function-scoped api_client instead.
+    """
+    return TeamsApi(token="test_token")
+
+
+# Build the session patch and shared client once rather than once per worker
+@pytest.mark.xdist_group("api_session")
 class TestTeamsApi:
     """Tests for Teams API client."""
 
@@ -63,51 +120,146 @@ class TestTeamsApi:
         assert "Content-Type" in headers
         assert "User-Agent" in headers
 
-    def test_make_request_success(self, api_client, mock_session):
-        """Test successful API request."""
+    def test_init_mounts_connection_pool(self, api_client, mock_session):
+        """Test that init sizes the connection pool for concurrent calls."""
+        prefix, adapter = mock_session.mount.call_args[0]
+        assert prefix == "https://"
+        assert adapter._pool_maxsize == TeamsApi.MAX_CONCURRENCY
+
+    @pytest.mark.parametrize(
+        "mock_session_with_status, expected_error",
+        [
+            ((200, None), None),
+            ((401, requests.HTTPError("401 Unauthorized")), TeamsAuthError),
+            ((500, requests.HTTPError("500 Server Error")), TeamsApiError),
+        ],
+        indirect=["mock_session_with_status"],
+        ids=["success", "auth_error", "api_error"],
+    )
+    def test_make_request(self, mock_session_with_status, expected_error):
+        """Test API request success and error mapping."""
+        api_client = TeamsApi(token="test_token")
+        if expected_error is not None:
+            with pytest.raises(expected_error):
+                api_client._make_request("GET", "test_endpoint")
+            return
+
         result = api_client._make_request("GET", "test_endpoint")
         assert result == {"data": "test_data"}
-        mock_session.request.assert_called_once_with(
+        mock_session_with_status.request.assert_called_once_with(
             method="GET",
             url=f"{TeamsApi.BASE_URL}/test_endpoint",
             params=None,
             json=None,
+            timeout=TeamsApi.REQUEST_TIMEOUT,
         )
 
-    def test_make_request_auth_error(self, mock_session_auth_error):
-        """Test API request with auth error."""
-        api_client = TeamsApi(token="invalid_token")
-        with pytest.raises(TeamsAuthError):
-            api_client._make_request("GET", "test_endpoint")
-
-    def test_make_request_api_error(self, mock_session_api_error):
-        """Test API request with API error."""
+    def test_make_request_rate_limited(self, mock_session):
+        """Test API request throttled with Retry-After header."""
+        mock_session.request.return_value = _FakeResponse(
+            429, headers={"Retry-After": "3"}
+        )
         api_client = TeamsApi(token="test_token")
-        with pytest.raises(TeamsApiError):
+        with pytest.raises(TeamsRateLimitError) as excinfo:
             api_client._make_request("GET", "test_endpoint")
+        assert excinfo.value.retry_after == 3.0
 
-    def test_get_chats(self, api_client, mock_session):
+    def test_get_chats(self, shared_api_client, mock_session):
         """Test getting chats."""
-        result = api_client.get_chats()
+        result = shared_api_client.get_chats()
         assert result == {"data": "test_data"}
         mock_session.request.assert_called_with(
-            method="GET", url=f"{TeamsApi.BASE_URL}/chats", params=None, json=None
+            method="GET",
+            url=f"{TeamsApi.BASE_URL}/chats",
+            params=None,
+            json=None,
+            timeout=TeamsApi.REQUEST_TIMEOUT,
         )
 
-    def test_get_channels(self, api_client, mock_session):
+    def test_get_channels(self, shared_api_client, mock_session):
         """Test getting channels."""
-        result = api_client.get_channels(team_id="team123")
+        result = shared_api_client.get_channels(team_id="team123")
         assert result == {"data": "test_data"}
         mock_session.request.assert_called_with(
             method="GET",
             url=f"{TeamsApi.BASE_URL}/teams/team123/channels",
             params=None,
             json=None,
+            timeout=TeamsApi.REQUEST_TIMEOUT,
+        )
+
+    def test_batch_get_channels(self, api_client, mock_session):
+        """Test fetching channels for several teams in one batch call."""
+        mock_session.request.return_value = _FakeResponse(
+            200,
+            {
+                "responses": [
+                    {"id": "1", "status": 200, "body": {"value": ["c2"]}},
+                    {"id": "0", "status": 200, "body": {"value": ["c1"]}},
+                ]
+            },
         )
 
-    def test_get_messages_direct_chat(self, api_client, mock_session):
+        result = api_client.batch_get_channels(["team1", "team2"])
+
+        assert result == {"team1": {"value": ["c1"]}, "team2": {"value": ["c2"]}}
+        mock_session.request.assert_called_once()
+        call = mock_session.request.call_args
+        assert call.kwargs["method"] == "POST"
+        assert call.kwargs["url"] == f"{TeamsApi.BASE_URL}/$batch"
+        assert call.kwargs["json"]["requests"] == [
+            {"id": "0", "method": "GET", "url": "/teams/team1/channels"},
+            {"id": "1", "method": "GET", "url": "/teams/team2/channels"},
+        ]
+
+    def test_batch_get_channels_splits_into_batches(self, api_client, mock_session):
+        """Test teams are grouped BATCH_SIZE at a time."""
+        mock_session.request.return_value = _FakeResponse(200, {"responses": []})
+        team_ids = [f"team{i}" for i in range(TeamsApi.BATCH_SIZE * 2 + 1)]
+
+        api_client.batch_get_channels(team_ids)
+
+        batch_sizes = sorted(
+            len(call.kwargs["json"]["requests"])
+            for call in mock_session.request.call_args_list
+            if call.kwargs["method"] == "POST"
+        )
+        assert batch_sizes == [1, TeamsApi.BATCH_SIZE, TeamsApi.BATCH_SIZE]
+
+    def test_batch_get_channels_refetches_missing_items(self, api_client, mock_session):
+        """Test teams left out of a partial batch response are fetched singly."""
+        mock_session.request.side_effect = [
+            _FakeResponse(
+                200,
+                {"responses": [{"id": "0", "status": 200, "body": {"value": ["c1"]}}]},
+            ),
+            _FakeResponse(200, {"value": ["c2"]}),
+        ]
+
+        result = api_client.batch_get_channels(["team1", "team2"])
+
+        assert result == {"team1": {"value": ["c1"]}, "team2": {"value": ["c2"]}}
+        call = mock_session.request.call_args
+        assert call.kwargs["method"] == "GET"
+        assert call.kwargs["url"] == f"{TeamsApi.BASE_URL}/teams/team2/channels"
+
+    def test_batch_get_channels_failed_item(self, api_client, mock_session):
+        """Test a failed item in the batch raises an API error."""
+        mock_session.request.return_value = _FakeResponse(
+            200, {"responses": [{"id": "0", "status": 404}]}
+        )
+
+        with pytest.raises(TeamsApiError):
+            api_client.batch_get_channels(["team1"])
+
+    def test_batch_get_channels_empty(self, api_client, mock_session):
+        """Test fetching channels for no teams makes no calls."""
+        assert api_client.batch_get_channels([]) == {}
+        assert not mock_session.request.called
+
+    def test_get_messages_direct_chat(self, shared_api_client, mock_session):
         """Test getting messages from direct chat."""
-        result = api_client.get_messages(
+        result = shared_api_client.get_messages(
             chat_id="chat123", chat_type=ChatType.DIRECT, limit=50
         )
         assert result == {"data": "test_data"}
@@ -116,12 +268,13 @@ class TestTeamsApi:
             url=f"{TeamsApi.BASE_URL}/chats/chat123/messages",
             params={"limit": "50"},
             json=None,
+            timeout=TeamsApi.REQUEST_TIMEOUT,
         )
 
-    def test_get_messages_channel(self, api_client, mock_session):
+    def test_get_messages_channel(self, shared_api_client, mock_session):
         """Test getting messages from channel."""
         test_date = datetime.datetime(2023, 1, 1)
-        result = api_client.get_messages(
+        result = shared_api_client.get_messages(
             chat_id="channel123",
             chat_type=ChatType.CHANNEL,
             limit=50,
@@ -133,25 +286,12 @@ class TestTeamsApi:
             url=f"{TeamsApi.BASE_URL}/channels/channel123/messages",
             params={"limit": "50", "before": test_date.isoformat()},
             json=None,
+            timeout=TeamsApi.REQUEST_TIMEOUT,
         )
 
     def test_get_all_messages(self, api_client, mock_session):
         """Test paginated message fetching."""
-        # Setup mock to return different responses for pagination testing
-        mock_session.request.side_effect = [
-            mock.Mock(
-                status_code=200,
-                json=mock.Mock(
-                    return_value={
-                        "messages": [
-                            {"id": "msg1", "createdDateTime": "2023-01-02T00:00:00"},
-                            {"id": "msg2", "createdDateTime": "2023-01-01T00:00:00"},
-                        ]
-                    }
-                ),
-            ),
-            mock.Mock(status_code=200, json=mock.Mock(return_value={"messages": []})),
-        ]
+        mock_session.request.side_effect = _PAGES
 
         # Test the generator
         messages = list(
@@ -163,3 +303,277 @@ class TestTeamsApi:
         assert len(messages) == 2
         assert messages[0]["id"] == "msg1"
         assert messages[1]["id"] == "msg2"
+
+    def test_get_all_messages_caches_list_key(self, api_client, mock_session):
+        """Test the list key is discovered once and reused for later pages."""
+        mock_session.request.side_effect = [
+            _FakeResponse(
+                200,
+                {
+                    "meta": {},
+                    "messages": [
+                        {"id": "msg1", "createdDateTime": "2023-01-02T00:00:00"}
+                    ],
+                },
+            ),
+            _FakeResponse(200, {"other": [], "messages": []}),
+        ]
+
+        messages = list(
+            api_client.get_all_messages(chat_id="chat123", chat_type=ChatType.DIRECT)
+        )
+
+        assert [m["id"] for m in messages] == ["msg1"]
+        assert api_client._list_key_cache == {"messages": "messages"}
+
+    @pytest.mark.skipif(not api_module.ORJSON_AVAILABLE, reason="orjson missing")
+    def test_decode_json_with_orjson(self):
+        """Test raw response bytes are decoded with orjson when available."""
+        response = mock.Mock(content=b'{"value": [1]}')
+        with mock.patch("teamschatgrab.api.ORJSON_AVAILABLE", True):
+            assert _decode_json(response) == {"value": [1]}
+            assert _decode_json(mock.Mock(content=b"")) is None
+            with pytest.raises(TeamsApiError):
+                _decode_json(mock.Mock(content=b"not json"))
+        response.json.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "response,expected",
+        [
+            ({"a": [], "value": []}, "value"),
+            ({"count": 1, "chats": []}, "chats"),
+            ({"id": "x"}, None),
+        ],
+    )
+    def test_find_list_key(self, response, expected):
+        """Test Graph's "value" key is preferred over scanning."""
+        assert _find_list_key(response) == expected
+
+    def test_get_all_messages_stops_at_after_date(self, api_client, mock_session):
+        """Test pagination pushes the date range down and stops early."""
+        mock_session.request.side_effect = [
+            _FakeResponse(
+                200,
+                {
+                    "messages": [
+                        {"id": "msg1", "createdDateTime": "2023-01-03T00:00:00Z"},
+                        {"id": "msg2", "createdDateTime": "2023-01-01T00:00:00Z"},
+                    ]
+                },
+            ),
+        ]
+
+        messages = list(
+            api_client.get_all_messages(
+                chat_id="chat123",
+                chat_type=ChatType.DIRECT,
+                before_date=datetime.datetime(2023, 1, 4),
+                after_date=datetime.datetime(2023, 1, 2),
+            )
+        )
+
+        assert [m["id"] for m in messages] == ["msg1"]
+        mock_session.request.assert_called_once()
+        params = mock_session.request.call_args.kwargs["params"]
+        assert params["before"] == datetime.datetime(2023, 1, 4).isoformat()
+        assert params["after"] == datetime.datetime(2023, 1, 2).isoformat()
+
+    def test_get_all_messages_passes_raw_cursor(self, api_client, mock_session):
+        """Test the last message timestamp is sent back verbatim as the cursor."""
+        page = [
+            {"id": f"msg{i}", "createdDateTime": "2023-01-03T00:00:00Z"}
+            for i in range(TeamsApi.PAGE_SIZE - 1)
+        ]
+        page.append({"id": "last", "createdDateTime": "2023-01-02T10:00:00.5Z"})
+        mock_session.request.side_effect = [
+            _FakeResponse(200, {"messages": page}),
+            _EMPTY_PAGE,
+        ]
+
+        list(api_client.get_all_messages(chat_id="chat123", chat_type=ChatType.DIRECT))
+
+        params = mock_session.request.call_args_list[1].kwargs["params"]
+        assert params["before"] == "2023-01-02T10:00:00.5Z"
+
+    def test_get_all_messages_stops_after_short_page(self, api_client, mock_session):
+        """Test a page smaller than PAGE_SIZE ends pagination without a request."""
+        mock_session.request.return_value = _FakeResponse(
+            200,
+            {"messages": [{"id": "msg1", "createdDateTime": "2023-01-02T00:00:00Z"}]},
+        )
+
+        messages = list(
+            api_client.get_all_messages(chat_id="chat123", chat_type=ChatType.DIRECT)
+        )
+
+        assert [m["id"] for m in messages] == ["msg1"]
+        assert mock_session.request.call_count == 1
+
+    def test_get_all_messages_stops_without_cursor(self, api_client, mock_session):
+        """Test a full page lacking timestamps does not loop forever."""
+        mock_session.request.return_value = _FakeResponse(
+            200, {"messages": [{"id": f"msg{i}"} for i in range(TeamsApi.PAGE_SIZE)]}
+        )
+
+        messages = list(
+            api_client.get_all_messages(chat_id="chat123", chat_type=ChatType.DIRECT)
+        )
+
+        assert len(messages) == TeamsApi.PAGE_SIZE
+        assert mock_session.request.call_count == 1
+
+    @pytest.mark.parametrize(
+        "timestamp, expected",
+        [
+            ("2023-01-01T23:59:59.999Z", True),
+            ("2023-01-02T00:00:00Z", False),
+            ("2023-01-02T00:00:00.001Z", False),
+            ("2023-01-02T01:00:00+02:00", True),
+            ("2023-01-02T00:30:00", False),
+        ],
+    )
+    def test_is_older(self, timestamp, expected):
+        """Test timestamp comparison against a date bound."""
+        bound = _utc_iso_bound(datetime.datetime(2023, 1, 2))
+        assert _is_older(timestamp, bound) is expected
+
+    def test_get_all_messages_retries_when_rate_limited(self, api_client, mock_session):
+        """Test pagination waits for Retry-After and retries throttled pages."""
+        mock_session.request.side_effect = [
+            _FakeResponse(429, headers={"Retry-After": "2"}),
+            _FakeResponse(
+                200,
+                {
+                    "messages": [
+                        {"id": "msg1", "createdDateTime": "2023-01-02T00:00:00"}
+                    ]
+                },
+            ),
+            _EMPTY_PAGE,
+        ]
+
+        with mock.patch("teamschatgrab.api.time.sleep") as mock_sleep:
+            messages = list(
+                api_client.get_all_messages(
+                    chat_id="chat123", chat_type=ChatType.DIRECT
+                )
+            )
+
+        assert [m["id"] for m in messages] == ["msg1"]
+        mock_sleep.assert_called_once_with(2.0)
+
+    def test_get_all_messages_gives_up_after_max_retries(
+        self, api_client, mock_session
+    ):
+        """Test pagination re-raises once the retry budget is exhausted."""
+        mock_session.request.return_value = _FakeResponse(429, headers={})
+        api_client.rate_limiter = mock.Mock()
+
+        with mock.patch("teamschatgrab.api.time.sleep") as mock_sleep:
+            with pytest.raises(TeamsRateLimitError):
+                list(
+                    api_client.get_all_messages(
+                        chat_id="chat123", chat_type=ChatType.DIRECT
+                    )
+                )
+
+        assert mock_sleep.call_count == TeamsApi.MAX_RETRIES - 1
+
+    def test_get_all_messages_fails_fast_on_long_retry_after(
+        self, api_client, mock_session
+    ):
+        """Test a Retry-After beyond MAX_BACKOFF is raised instead of slept."""
+        mock_session.request.return_value = _FakeResponse(
+            429, headers={"Retry-After": "86400"}
+        )
+
+        with mock.patch("teamschatgrab.api.time.sleep") as mock_sleep:
+            with pytest.raises(TeamsRateLimitError, match="86400") as excinfo:
+                list(
+                    api_client.get_all_messages(
+                        chat_id="chat123", chat_type=ChatType.DIRECT
+                    )
+                )
+
+        assert excinfo.value.retry_after == 86400.0
+        mock_sleep.assert_not_called()
+        assert mock_session.request.call_count == 1
+
+    def test_get_all_messages_stops_during_backoff(self, api_client, mock_session):
+        """Test a set stop event cuts a throttled retry short."""
+        mock_session.request.return_value = _FakeResponse(
+            429, headers={"Retry-After": "60"}
+        )
+        stop = threading.Event()
+        stop.wait = mock.Mock(return_value=True)
+
+        with pytest.raises(TeamsRateLimitError):
+            next(
+                api_client.get_all_messages(
+                    chat_id="chat123", chat_type=ChatType.DIRECT, stop=stop
+                )
+            )
+
+        stop.wait.assert_called_once_with(60.0)
+        assert mock_session.request.call_count == 1
+
+    def test_get_all_messages_stops_between_pages(self, api_client, mock_session):
+        """Test no further pages are fetched once stop is set."""
+        stop = threading.Event()
+        stop.set()
+
+        messages = list(
+            api_client.get_all_messages(
+                chat_id="chat123", chat_type=ChatType.DIRECT, stop=stop
+            )
+        )
+
+        assert messages == []
+        mock_session.request.assert_not_called()
+
+
+class TestTokenBucket:
+    """Tests for the client-side rate limiter."""
+
+    def test_acquire_allows_burst_without_waiting(self):
+        """Test that a full bucket serves a burst immediately."""
+        bucket = TokenBucket(rate_per_s=10, burst=3)
+        with mock.patch("teamschatgrab.api.time.sleep") as mock_sleep:
+            for _ in range(3):
+                bucket.acquire()
+        assert not mock_sleep.called
+
+    def test_acquire_waits_when_empty(self):
+        """Test that an empty bucket sleeps until a token is refilled."""
+        clock = [0.0]
+        with mock.patch(
+            "teamschatgrab.api.time.monotonic", side_effect=lambda: clock[0]
+        ), mock.patch("teamschatgrab.api.time.sleep") as mock_sleep:
+            bucket = TokenBucket(rate_per_s=10, burst=1)
+            bucket.acquire()
+
+            def advance(seconds):
+                clock[0] += seconds
+
+            mock_sleep.side_effect = advance
+            bucket.acquire()
+
+        mock_sleep.assert_called_once_with(pytest.approx(0.1))
+
+    def test_rate_adapts_to_throttling(self):
+        """Test multiplicative decrease and additive recovery of the rate."""
+        bucket = TokenBucket(rate_per_s=40, burst=10)
+
+        bucket.decrease_rate()
+        assert bucket.rate_per_s == 20
+
+        bucket.increase_rate()
+        assert bucket.rate_per_s == 21
+
+        for _ in range(100):
+            bucket.increase_rate()
+        assert bucket.rate_per_s == 40
+
+        for _ in range(100):
+            bucket.decrease_rate()
+        assert bucket.rate_per_s == TokenBucket.MIN_RATE
@@ -4,153 +4,132 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
+import contextlib
+import datetime
+import functools
+import os
+import threading
+import time
 from pathlib import Path
 from unittest import mock
 
 import pytest
 
-from teamschatgrab.app import TeamsChatGrabber, create_app
+from teamschatgrab.app import TeamsChatGrabber, create_app, _prefetch
 from teamschatgrab.api import ChatType, TeamsApiError
 from teamschatgrab.auth import TeamsAuthError
 from teamschatgrab.storage import StorageFormat
-from teamschatgrab.platform_detection import PlatformType
 
+# Build the module-scoped UI and storage patches once rather than once per worker
+pytestmark = pytest.mark.xdist_group("app_patches")
 
-@pytest.fixture
-def mock_ui():
-    """Mock terminal UI."""
+
+def _iter_messages(messages, *args, **kwargs):
+    """Stand in for TeamsApi.get_all_messages, ignoring the query arguments."""
+    yield from messages
+
+
+@pytest.fixture(scope="module")
+def _ui_patcher():
+    """Patch TerminalUI once for the whole module."""
     with mock.patch("teamschatgrab.app.TerminalUI") as mock_ui_class:
-        ui_instance = mock_ui_class.return_value
+        yield mock_ui_class
+
+
+@pytest.fixture
+def mock_ui(_ui_patcher):
+    """Mock terminal UI, reset before each test."""
+    ui_instance = _ui_patcher.return_value
+    ui_instance.reset_mock(return_value=True, side_effect=True)
 
-        # Mock UI methods
-        ui_instance.info = mock.Mock()
-        ui_instance.success = mock.Mock()
-        ui_instance.warning = mock.Mock()
-        ui_instance.error = mock.Mock()
-        ui_instance.prompt = mock.Mock(return_value="test input")
-        ui_instance.confirm = mock.Mock(return_value=True)
-        ui_instance.select_option = mock.Mock(return_value=0)
+    # Mock UI methods
+    ui_instance.prompt.return_value = "test input"
+    ui_instance.confirm.return_value = True
+    ui_instance.select_option.return_value = 0
 
-        # Mock progress methods
-        progress_obj = {"progress": mock.Mock(), "task": "task1"}
-        ui_instance.progress = mock.Mock(return_value=progress_obj)
-        ui_instance.start_progress = mock.Mock()
-        ui_instance.update_progress = mock.Mock()
-        ui_instance.stop_progress = mock.Mock()
+    # Mock progress methods
+    ui_instance.progress.return_value = {"progress": mock.Mock(), "task": "task1"}
 
-        yield ui_instance
+    return ui_instance
 
 
 @pytest.fixture
-def mock_platform():
+def mock_platform(platform_payload, monkeypatch):
     """Mock platform detection."""
+    monkeypatch.setattr(os.path, "exists", lambda _p: True)
     with mock.patch("teamschatgrab.app.get_platform_info") as mock_platform_info:
-        mock_platform_info.return_value = {
-            "platform": PlatformType.MACOS,
-            "system": "Darwin",
-            "release": "21.6.0",
-            "version": "Darwin Kernel Version 21.6.0",
-            "python_version": "3.9.0",
-            "teams_data_path": "/Users/testuser/Library/Application Support/Microsoft/Teams",
-        }
+        mock_platform_info.return_value = dict(platform_payload)
+        yield mock_platform_info
+
 
-        with mock.patch("os.path.exists", return_value=True):
-            yield mock_platform_info
+# Keys of the mock_auth dict and the teamschatgrab.app functions they replace
+_AUTH_TARGETS = {
+    "user_info": "get_current_user_info",
+    "validate": "validate_token",
+    "refresh": "refresh_token",
+    "save_session": "save_cached_session",
+    "clear_session": "clear_cached_session",
+}
 
 
 @pytest.fixture
-def mock_auth():
+def mock_auth(user_payload):
     """Mock authentication."""
-    with mock.patch(
-        "teamschatgrab.app.get_current_user_info"
-    ) as mock_user_info, mock.patch(
-        "teamschatgrab.app.validate_token"
-    ) as mock_validate:
-        mock_user_info.return_value = {
-            "user_id": "user123",
-            "email": "user@example.com",
-            "name": "Test User",
-            "token": "valid_token_123",
+    with contextlib.ExitStack() as stack:
+        mocks = {
+            key: stack.enter_context(mock.patch(f"teamschatgrab.app.{name}"))
+            for key, name in _AUTH_TARGETS.items()
         }
 
-        mock_validate.return_value = (True, None)
+        # The app replaces the token in place, so each test gets its own dict
+        mocks["user_info"].return_value = dict(user_payload)
+
+        mocks["validate"].return_value = (True, None)
+        mocks["refresh"].return_value = None
 
-        yield {"user_info": mock_user_info, "validate": mock_validate}
+        yield mocks
 
 
 @pytest.fixture
-def mock_api():
+def mock_api(chat_payload, message_payload):
     """Mock Teams API."""
     with mock.patch("teamschatgrab.app.TeamsApi") as mock_api_class:
         api_instance = mock_api_class.return_value
 
         # Mock API methods
-        api_instance.get_chats = mock.Mock(
-            return_value=[
-                {
-                    "id": "chat123",
-                    "displayName": "Test Chat 1",
-                    "isGroup": False,
-                    "participants": [
-                        {"displayName": "User 1"},
-                        {"displayName": "User 2"},
-                    ],
-                },
-                {
-                    "id": "chat456",
-                    "displayName": "Test Group",
-                    "isGroup": True,
-                    "participants": [
-                        {"displayName": "User 1"},
-                        {"displayName": "User 2"},
-                        {"displayName": "User 3"},
-                    ],
-                },
-            ]
-        )
+        api_instance.get_chats = mock.Mock(return_value=list(chat_payload))
 
         # Mock messages generator
-        def mock_get_all_messages(*args, **kwargs):
-            messages = [
-                {
-                    "id": "msg1",
-                    "createdDateTime": "2023-01-01T12:00:00Z",
-                    "sender": {"user": {"displayName": "User 1"}},
-                    "body": {"content": "Hello"},
-                },
-                {
-                    "id": "msg2",
-                    "createdDateTime": "2023-01-01T12:01:00Z",
-                    "sender": {"user": {"displayName": "User 2"}},
-                    "body": {"content": "Hi there"},
-                },
-            ]
-            for msg in messages:
-                yield msg
-
-        api_instance.get_all_messages = mock_get_all_messages
+        api_instance.get_all_messages = functools.partial(
+            _iter_messages, message_payload
+        )
 
         yield api_instance
 
 
-@pytest.fixture
-def mock_storage():
-    """Mock storage."""
+@pytest.fixture(scope="module")
+def _storage_patcher():
+    """Patch TeamsStorage once for the whole module."""
     with mock.patch("teamschatgrab.app.TeamsStorage") as mock_storage_class:
-        storage_instance = mock_storage_class.return_value
+        yield mock_storage_class
 
-        # Mock storage methods
-        storage_instance.create_chat_directory = mock.Mock(
-            return_value=Path("/test/output/direct/Test_Chat_1_chat123")
-        )
 
-        storage_instance.save_messages = mock.Mock(
-            return_value=Path(
-                "/test/output/direct/Test_Chat_1_chat123/messages_20230101_120000.json"
-            )
-        )
+@pytest.fixture
+def mock_storage(_storage_patcher):
+    """Mock storage, reset before each test."""
+    storage_instance = _storage_patcher.return_value
+    storage_instance.reset_mock(return_value=True, side_effect=True)
 
-        yield storage_instance
+    # Mock storage methods
+    storage_instance.create_chat_directory.return_value = Path(
+        "/test/output/direct/Test_Chat_1_chat123"
+    )
+    storage_instance.load_cursor.return_value = None
+    storage_instance.save_messages.return_value = Path(
+        "/test/output/direct/Test_Chat_1_chat123/messages_20230101_120000.json"
+    )
+
+    return storage_instance
 
 
 @pytest.fixture
@@ -173,14 +152,13 @@ class TestTeamsChatGrabber:
         assert app.api is None
         assert app.user_info is None
 
-    def test_check_environment_success(self, app):
+    def test_check_environment_success(self, app, monkeypatch):
         """Test successful environment check."""
-        # Mock os.path.exists to return True
-        with mock.patch("os.path.exists", return_value=True):
-            result = app.check_environment()
+        monkeypatch.setattr(os.path, "exists", lambda _p: True)
+        result = app.check_environment()
 
-            assert result is True
-            app.ui.success.assert_called_with("Environment check passed")
+        assert result is True
+        app.ui.success.assert_called_with("Environment check passed")
 
     def test_check_environment_no_teams_path(self, app):
         """Test environment check with missing Teams path."""
@@ -202,6 +180,7 @@ class TestTeamsChatGrabber:
 
         # Check if TeamsApi was created
         assert app.api is not None
+        mock_auth["save_session"].assert_called_once_with(app.user_info)
 
     def test_authenticate_no_user(self, app, mock_auth):
         """Test authentication with no user."""
@@ -220,6 +199,44 @@ class TestTeamsChatGrabber:
 
         assert result is False
         assert app.ui.error.called
+        assert not mock_auth["save_session"].called
+
+    def test_authenticate_never_caches_invalid_token(self, app, tmp_path):
+        """Test a token that fails validation is never written to the cache."""
+        cache_path = tmp_path / "session.json"
+        user_info = {"user_id": "u1", "email": "a@b.c", "name": "A"}
+        with mock.patch(
+            "teamschatgrab.auth.get_session_cache_path", return_value=cache_path
+        ), mock.patch(
+            "teamschatgrab.app.get_current_user_info",
+            side_effect=lambda **_kw: dict(user_info, token="placeholder_token"),
+        ):
+            result = app.authenticate()
+
+        assert result is False
+        assert not cache_path.exists()
+
+    def test_authenticate_refreshes_invalid_token(self, app, mock_auth):
+        """Test that an invalid cached token is refreshed and re-cached."""
+        mock_auth["validate"].side_effect = [(False, "Expired"), (True, None)]
+        mock_auth["refresh"].return_value = "refreshed_token"
+
+        result = app.authenticate()
+
+        assert result is True
+        assert app.user_info["token"] == "refreshed_token"
+        mock_auth["save_session"].assert_called_once_with(app.user_info)
+        assert not mock_auth["clear_session"].called
+
+    def test_authenticate_rescans_when_refresh_fails(self, app, mock_auth):
+        """Test falling back to Teams storage when refreshing fails."""
+        mock_auth["validate"].side_effect = [(False, "Expired"), (True, None)]
+
+        result = app.authenticate()
+
+        assert result is True
+        assert mock_auth["clear_session"].called
+        mock_auth["user_info"].assert_called_with(use_cache=False)
 
     def test_authenticate_error(self, app, mock_auth):
         """Test authentication error."""
@@ -240,6 +257,37 @@ class TestTeamsChatGrabber:
         assert len(channels) == 0
         assert app.ui.success.called
 
+    def test_list_chats_with_channels(self, app, mock_api):
+        """Test listing channels across teams."""
+        app.api = mock_api
+        mock_api.get_teams.return_value = {
+            "teams": [{"id": "team1", "displayName": "Team One"}]
+        }
+        mock_api.batch_get_channels.return_value = {
+            "team1": {"channels": [{"id": "channel1", "displayName": "General"}]}
+        }
+
+        chats, channels = app.list_chats()
+
+        assert len(chats) == 2
+        assert len(channels) == 1
+        assert channels[0]["team"]["displayName"] == "Team One"
+        mock_api.batch_get_channels.assert_called_once_with(["team1"])
+
+    def test_list_chats_empty_value_lists(self, app, mock_api):
+        """Test empty "value" lists yield no chats or channels."""
+        app.api = mock_api
+        mock_api.get_chats.return_value = {"value": []}
+        mock_api.get_teams.return_value = {
+            "value": [{"id": "team1", "displayName": "Team One"}]
+        }
+        mock_api.batch_get_channels.return_value = {"team1": {"value": []}}
+
+        chats, channels = app.list_chats()
+
+        assert chats == []
+        assert channels == []
+
     def test_list_chats_not_authenticated(self, app):
         """Test listing chats when not authenticated."""
         app.api = None
@@ -303,6 +351,7 @@ class TestTeamsChatGrabber:
         config = app.configure_download()
 
         assert config["format"] == StorageFormat.JSON
+        assert config["pretty"] is True
         assert config["limit"] == 100
         assert "date_from" in config
         assert "date_to" in config
@@ -320,7 +369,147 @@ class TestTeamsChatGrabber:
         assert result is not None
         assert app.ui.success.called
         assert mock_storage.create_chat_directory.called
-        assert mock_storage.save_messages.called
+        writer = mock_storage.open_message_writer.return_value.__enter__.return_value
+        assert writer.write.call_count == 2
+        app.ui.success.assert_any_call("Downloaded 2 messages")
+
+    def test_download_chat_batches_progress_updates(self, app, mock_storage):
+        """Test progress is redrawn in batches rather than per message."""
+        app.api.get_all_messages.return_value = iter(
+            [{"id": f"msg{i}"} for i in range(600)]
+        )
+        app.PROGRESS_INTERVAL = 3600
+
+        chat = {"id": "chat123", "displayName": "Test Chat"}
+        app.download_chat(chat, ChatType.DIRECT, {"format": StorageFormat.JSON})
+
+        advances = [c.kwargs["advance"] for c in app.ui.update_progress.call_args_list]
+        assert advances == [256, 256, 88]
+
+    def test_download_chat_resumes_from_cursor(self, app, mock_storage):
+        """Test an interrupted download continues from its checkpoint."""
+        app.api.get_all_messages.return_value = iter([{"id": "msg1"}])
+        mock_storage.load_cursor.return_value = {
+            "before": "2023-01-02T00:00:00Z",
+            "count": 4,
+            "format": "json",
+            "date_from": None,
+            "date_to": None,
+            "files": ["messages_20230103_000000.json"],
+        }
+
+        chat = {"id": "chat123", "displayName": "Test Chat"}
+        config = {"format": StorageFormat.JSON, "limit": 10}
+        app.download_chat(chat, ChatType.DIRECT, config)
+
+        kwargs = app.api.get_all_messages.call_args.kwargs
+        assert kwargs["before_date"] == "2023-01-02T00:00:00Z"
+        assert kwargs["limit"] == 6
+        mock_storage.clear_cursor.assert_called_once()
+        app.ui.info.assert_any_call(
+            "The 4 messages downloaded before the interruption are in: "
+            "messages_20230103_000000.json (5 in total)"
+        )
+
+    @pytest.mark.parametrize(
+        "saved",
+        [
+            {"format": "html", "date_from": None, "date_to": None},
+            {"format": "json", "date_from": None, "date_to": "2023-02-01T00:00:00"},
+            {},
+        ],
+        ids=["format", "date_range", "legacy"],
+    )
+    def test_download_chat_ignores_mismatched_cursor(self, app, mock_storage, saved):
+        """Test a checkpoint from a run with other settings is not applied."""
+        app.api.get_all_messages.return_value = iter([])
+        mock_storage.load_cursor.return_value = {
+            "before": "2023-01-02T00:00:00Z",
+            "count": 4,
+            **saved,
+        }
+
+        chat = {"id": "chat123", "displayName": "Test Chat"}
+        config = {"format": StorageFormat.JSON, "limit": 10}
+        app.download_chat(chat, ChatType.DIRECT, config)
+
+        kwargs = app.api.get_all_messages.call_args.kwargs
+        assert kwargs["before_date"] is None
+        assert kwargs["limit"] == 10
+        app.ui.confirm.assert_not_called()
+        assert app.ui.warning.called
+
+    def test_download_chat_starts_fresh_when_resume_declined(self, app, mock_storage):
+        """Test declining the resume prompt downloads from the start."""
+        app.api.get_all_messages.return_value = iter([])
+        app.ui.confirm.return_value = False
+        mock_storage.load_cursor.return_value = {
+            "before": "2023-01-02T00:00:00Z",
+            "count": 4,
+            "format": "json",
+            "date_from": None,
+            "date_to": None,
+        }
+
+        chat = {"id": "chat123", "displayName": "Test Chat"}
+        app.download_chat(chat, ChatType.DIRECT, {"format": StorageFormat.JSON})
+
+        kwargs = app.api.get_all_messages.call_args.kwargs
+        assert kwargs["before_date"] is None
+
+    def test_download_chat_checkpoints_on_api_error(self, app, mock_storage):
+        """Test a failed download records the oldest message written."""
+
+        def messages():
+            yield {"id": "msg1", "createdDateTime": "2023-01-03T00:00:00Z"}
+            yield {"id": "msg2", "createdDateTime": "2023-01-02T00:00:00Z"}
+            raise TeamsApiError("API rate limit exceeded")
+
+        app.api.get_all_messages.return_value = messages()
+
+        chat = {"id": "chat123", "displayName": "Test Chat"}
+        result = app.download_chat(
+            chat, ChatType.DIRECT, {"format": StorageFormat.JSON}
+        )
+
+        assert result is None
+        writer = mock_storage.open_message_writer.return_value.__enter__.return_value
+        mock_storage.save_cursor.assert_called_once_with(
+            mock_storage.create_chat_directory.return_value,
+            before="2023-01-02T00:00:00Z",
+            count=2,
+            settings={
+                "format": "json",
+                "date_from": None,
+                "date_to": None,
+                "files": [writer.path.name],
+            },
+        )
+        mock_storage.clear_cursor.assert_not_called()
+
+    def test_download_chat_pushes_date_range_to_api(self, app, mock_storage):
+        """Test the configured date range is passed to the API."""
+        app.api.get_all_messages.return_value = iter([])
+        date_from = datetime.datetime(2023, 1, 1)
+        date_to = datetime.datetime(2023, 2, 1)
+
+        chat = {"id": "chat123", "displayName": "Test Chat"}
+        config = {
+            "format": StorageFormat.JSON,
+            "date_from": date_from,
+            "date_to": date_to,
+        }
+
+        app.download_chat(chat, ChatType.DIRECT, config)
+
+        app.api.get_all_messages.assert_called_once_with(
+            chat_id="chat123",
+            chat_type=ChatType.DIRECT,
+            limit=None,
+            before_date=date_to,
+            after_date=date_from,
+            stop=mock.ANY,
+        )
 
     def test_download_chat_not_authenticated(self, app):
         """Test downloading chat when not authenticated."""
@@ -396,3 +585,73 @@ class TestTeamsChatGrabber:
 
         assert isinstance(app, TeamsChatGrabber)
         assert app.ui is mock_ui
+
+
+class TestPrefetch:
+    """Tests for the background prefetch helper."""
+
+    def test_prefetch_preserves_order(self):
+        """Test items are yielded in source order."""
+        assert list(_prefetch(iter(range(100)), maxsize=4)) == list(range(100))
+
+    def test_prefetch_waits_out_slow_producer(self):
+        """Test the consumer keeps polling while the producer is between items."""
+
+        def slow_source():
+            for i in range(3):
+                # Longer than one poll interval, so the consumer sees an empty buffer
+                time.sleep(0.25)
+                yield i
+
+        assert list(_prefetch(slow_source(), maxsize=2)) == [0, 1, 2]
+
+    def test_prefetch_propagates_errors(self):
+        """Test producer exceptions are re-raised to the consumer."""
+
+        def failing_source():
+            yield 1
+            raise TeamsApiError("API error")
+
+        results = []
+        with pytest.raises(TeamsApiError):
+            for item in _prefetch(failing_source(), maxsize=4):
+                results.append(item)
+
+        assert results == [1]
+
+    def test_prefetch_stops_producer_on_early_exit(self):
+        """Test breaking out of the loop stops the producer thread."""
+        produced = []
+
+        def source():
+            for i in range(10_000):
+                produced.append(i)
+                yield i
+
+        for item in _prefetch(source(), maxsize=2):
+            if item == 5:
+                break
+
+        assert len(produced) < 10_000
+
+    def test_prefetch_does_not_wait_for_blocked_producer(self):
+        """Test closing the generator returns while the source is blocked."""
+        release = threading.Event()
+
+        def blocking_source():
+            yield 1
+            # Stands in for a slow HTTP call that ignores the stop event
+            release.wait(30)
+            yield 2
+
+        stop = threading.Event()
+        items = _prefetch(blocking_source(), maxsize=2, stop=stop)
+        assert next(items) == 1
+
+        start = time.monotonic()
+        items.close()
+        elapsed = time.monotonic() - start
+        release.set()
+
+        assert stop.is_set()
+        assert elapsed < 10
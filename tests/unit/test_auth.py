@@ -5,29 +5,45 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
+import json
+import os
+import time
 from unittest import mock
 
 import pytest
 
 from teamschatgrab.auth import (
+    TEAMS_STORAGE_PREFIX,
+    find_stored_token,
     find_token_db_path,
     get_current_user_info,
+    load_cached_session,
+    save_cached_session,
     validate_token,
     refresh_token,
 )
 from teamschatgrab.platform_detection import PlatformType
 
 
+@pytest.fixture(autouse=True)
+def session_cache_path(tmp_path):
+    """Redirect the session cache away from the user's real cache dir."""
+    cache_path = tmp_path / "session.json"
+    with mock.patch(
+        "teamschatgrab.auth.get_session_cache_path", return_value=cache_path
+    ):
+        yield cache_path
+
+
 @pytest.fixture
-def mock_windows_teams_data():
+def mock_windows_teams_data(monkeypatch):
     """Mock Windows Teams data path."""
+    monkeypatch.setattr(os.path, "exists", lambda _p: True)
     with mock.patch(
         "teamschatgrab.auth.detect_platform", return_value=PlatformType.WINDOWS
     ), mock.patch(
         "teamschatgrab.auth.get_teams_data_path",
         return_value=r"C:\Users\testuser\AppData\Roaming\Microsoft\Teams",
-    ), mock.patch(
-        "os.path.exists", return_value=True
     ), mock.patch(
         "os.path.join",
         return_value=r"C:\Users\testuser\AppData\Roaming\Microsoft\Teams\Local Storage\leveldb",
@@ -36,15 +52,14 @@ def mock_windows_teams_data():
 
 
 @pytest.fixture
-def mock_macos_teams_data():
+def mock_macos_teams_data(monkeypatch):
     """Mock macOS Teams data path."""
+    monkeypatch.setattr(os.path, "exists", lambda _p: True)
     with mock.patch(
         "teamschatgrab.auth.detect_platform", return_value=PlatformType.MACOS
     ), mock.patch(
         "teamschatgrab.auth.get_teams_data_path",
         return_value="/Users/testuser/Library/Application Support/Microsoft/Teams",
-    ), mock.patch(
-        "os.path.exists", return_value=True
     ), mock.patch(
         "os.path.join", side_effect=lambda *args: "/".join(args)
     ):
@@ -52,11 +67,10 @@ def mock_macos_teams_data():
 
 
 @pytest.fixture
-def mock_no_teams_data():
+def mock_no_teams_data(monkeypatch):
     """Mock missing Teams data path."""
-    with mock.patch(
-        "teamschatgrab.auth.get_teams_data_path", return_value=None
-    ), mock.patch("os.path.exists", return_value=False):
+    monkeypatch.setattr(os.path, "exists", lambda _p: False)
+    with mock.patch("teamschatgrab.auth.get_teams_data_path", return_value=None):
         yield
 
 
@@ -123,3 +137,80 @@ class TestTeamsAuth:
         """Test failing to refresh an invalid token."""
         new_token = refresh_token("placeholder_token")
         assert new_token is None
+
+    def test_get_current_user_info_uses_cached_session(self, mock_no_teams_data):
+        """Test cached user info is returned without scanning Teams storage."""
+        cached = {"user_id": "u1", "email": "a@b.c", "name": "A", "token": "t"}
+        save_cached_session(cached, exp_ts=time.time() + 3600)
+
+        assert get_current_user_info() == cached
+        assert get_current_user_info(use_cache=False) is None
+
+    def test_get_current_user_info_does_not_cache_session(
+        self, mock_windows_teams_data, session_cache_path
+    ):
+        """Test discovered user info is not cached before it is validated."""
+        assert get_current_user_info() is not None
+        assert not session_cache_path.exists()
+
+    def test_save_cached_session(self, session_cache_path):
+        """Test user info is written to a private cache file."""
+        info = {"user_id": "u1", "email": "a@b.c", "name": "A", "token": "t"}
+        save_cached_session(info)
+
+        cached = json.loads(session_cache_path.read_text())
+        assert cached["info"] == info
+        if os.name == "posix":
+            assert session_cache_path.stat().st_mode & 0o777 == 0o600
+
+    def test_load_cached_session_expired(self):
+        """Test sessions about to expire are not reused."""
+        save_cached_session({"token": "t"}, exp_ts=time.time() + 30)
+        assert load_cached_session() is None
+
+    def test_load_cached_session_corrupt(self, session_cache_path):
+        """Test an unreadable cache file is ignored."""
+        session_cache_path.write_text("not json")
+        assert load_cached_session() is None
+
+    def test_find_stored_token_without_plyvel(self):
+        """Test the LevelDB probe is skipped when plyvel is not installed."""
+        with mock.patch("teamschatgrab.auth.PLYVEL_AVAILABLE", False):
+            assert find_stored_token("/path/to/db") is None
+
+    def test_find_stored_token_probes_teams_prefix(self):
+        """Test only Teams-origin keys are visited and token keys decoded."""
+        db = mock.MagicMock()
+        db.iterator.return_value = [
+            (TEAMS_STORAGE_PREFIX + b"theme", b"\x01dark"),
+            (TEAMS_STORAGE_PREFIX + b"ts.abc.cache.token", b"\x01secret"),
+        ]
+        with mock.patch("teamschatgrab.auth.PLYVEL_AVAILABLE", True), mock.patch(
+            "teamschatgrab.auth.plyvel", create=True
+        ) as plyvel:
+            plyvel.DB.return_value = db
+            assert find_stored_token("/path/to/db") == "secret"
+
+        db.iterator.assert_called_once_with(prefix=TEAMS_STORAGE_PREFIX)
+        db.close.assert_called_once()
+
+    def test_find_stored_token_unwraps_json(self):
+        """Test tokens stored inside a JSON object are extracted."""
+        db = mock.MagicMock()
+        value = json.dumps({"skypeToken": "abc"}).encode("utf-16-le")
+        db.iterator.return_value = [
+            (TEAMS_STORAGE_PREFIX + b"skypetoken", b"\x00" + value)
+        ]
+        with mock.patch("teamschatgrab.auth.PLYVEL_AVAILABLE", True), mock.patch(
+            "teamschatgrab.auth.plyvel", create=True
+        ) as plyvel:
+            plyvel.DB.return_value = db
+            assert find_stored_token("/path/to/db") == "abc"
+
+    def test_find_stored_token_locked_db(self):
+        """Test a database locked by a running Teams client is skipped."""
+        with mock.patch("teamschatgrab.auth.PLYVEL_AVAILABLE", True), mock.patch(
+            "teamschatgrab.auth.plyvel", create=True
+        ) as plyvel:
+            plyvel.DB.side_effect = IOError("lock held")
+            assert find_stored_token("/path/to/db") is None
@@ -0,0 +1,25 @@
+"""Tests for build_exe platform dispatch.
+
+Copyright (C) 2025 Eric C. Mumford (@heymumford)
+MIT License
+"""
+
+import sys
+from unittest import mock
+
+import pytest
+
+from teamschatgrab.exe_builder import build_exe
+
+
+@mock.patch("teamschatgrab.exe_builder.ExeBuilder")
+def test_build_exe_unsupported_platform(mock_builder_class, monkeypatch):
+    """Test the build_exe function on an unsupported platform."""
+    # Mock sys.platform to simulate Linux
+    monkeypatch.setattr(sys, "platform", "linux")
+
+    with pytest.raises(NotImplementedError) as excinfo:
+        build_exe()
+
+    assert "not yet supported" in str(excinfo.value)
+    assert "linux" in str(excinfo.value)
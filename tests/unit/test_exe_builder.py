@@ -4,6 +4,7 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
+import subprocess
 import sys
 from pathlib import Path
 from unittest import mock
@@ -13,17 +14,29 @@ import pytest
 from teamschatgrab.exe_builder import ExeBuilder, build_exe
 
 
-@pytest.fixture
-def mock_pyinstaller():
-    """Mock PyInstaller import."""
+@pytest.fixture(scope="module")
+def _pyinstaller_patch():
+    """Patch the PyInstaller import once for the whole module.
+
+    Both modules are patched, since "import PyInstaller.__main__" looks up
+    the submodule itself when PyInstaller is not installed.
+    """
     pyinstaller_mock = mock.MagicMock()
     main_mock = mock.MagicMock()
     pyinstaller_mock.__main__ = main_mock
+    modules = {"PyInstaller": pyinstaller_mock, "PyInstaller.__main__": main_mock}
     
-    with mock.patch.dict("sys.modules", {"PyInstaller": pyinstaller_mock}):
+    with mock.patch.dict("sys.modules", modules):
         yield main_mock
 
 
+@pytest.fixture
+def mock_pyinstaller(_pyinstaller_patch):
+    """Mock PyInstaller import, reset so no side effect outlives its test."""
+    _pyinstaller_patch.reset_mock(return_value=True, side_effect=True)
+    return _pyinstaller_patch
+
+
 @pytest.fixture
 def mock_exists():
     """Mock path exists method."""
@@ -63,7 +76,7 @@ class TestExeBuilder:
         
         assert "PyInstaller is required" in str(excinfo.value)
 
-    def test_build_windows_exe_missing_main_script(self, builder):
+    def test_build_windows_exe_missing_main_script(self, builder, mock_pyinstaller):
         """Test building when main script is not found."""
         with mock.patch("pathlib.Path.exists", return_value=False):
             with pytest.raises(FileNotFoundError) as excinfo:
@@ -114,6 +127,69 @@ class TestExeBuilder:
             assert "Expected executable not found" in str(excinfo.value)
             assert "MissingExe.exe" in str(excinfo.value)
 
+    def test_build_windows_exe_clean_build_opt_in(
+        self, builder, mock_exists, monkeypatch
+    ):
+        """Test builds are incremental unless TEAMSGRAB_CLEAN_BUILD is set."""
+        main_mock = mock.MagicMock()
+        pyinstaller = mock.MagicMock(__main__=main_mock)
+        modules = {"PyInstaller": pyinstaller, "PyInstaller.__main__": main_mock}
+
+        with mock.patch.dict("sys.modules", modules):
+            monkeypatch.delenv("TEAMSGRAB_CLEAN_BUILD", raising=False)
+            builder.build_windows_exe()
+            args = main_mock.run.call_args[0][0]
+            assert "--clean" not in args
+            assert "--noconfirm" in args
+            assert f"--workpath={builder.base_path / 'build'}" in args
+            assert f"--distpath={builder.dist_path}" in args
+
+            monkeypatch.setenv("TEAMSGRAB_CLEAN_BUILD", "1")
+            builder.build_windows_exe()
+            assert "--clean" in main_mock.run.call_args[0][0]
+
+    def test_build_windows_exe_unknown_backend(self, builder):
+        """Test building with an unsupported backend."""
+        with pytest.raises(ValueError) as excinfo:
+            builder.build_windows_exe(backend="py2exe")
+
+        assert "Unsupported build backend" in str(excinfo.value)
+
+    def test_build_windows_exe_missing_nuitka(self, builder):
+        """Test building with Nuitka when it is not installed."""
+        with mock.patch("importlib.util.find_spec", return_value=None):
+            with pytest.raises(ImportError) as excinfo:
+                builder.build_windows_exe(backend="nuitka")
+
+        assert "Nuitka is required" in str(excinfo.value)
+
+    def test_build_windows_exe_nuitka(self, builder, mock_exists):
+        """Test successful Windows exe build with Nuitka."""
+        with mock.patch("importlib.util.find_spec"), mock.patch(
+            "teamschatgrab.exe_builder.subprocess.run"
+        ) as mock_run:
+            result = builder.build_windows_exe(name="TestApp", backend="nuitka")
+
+        assert result == builder.dist_path / "TestApp.exe"
+        args = mock_run.call_args[0][0]
+        assert args[1:3] == ["-m", "nuitka"]
+        assert "--onefile" in args
+        assert "--standalone" in args
+        assert "--output-filename=TestApp.exe" in args
+        assert "--windows-console-mode=disable" in args
+        assert args[-1] == str(builder.base_path / "main.py")
+
+    def test_build_windows_exe_nuitka_fails(self, builder, mock_exists):
+        """Test handling of a failed Nuitka compile."""
+        with mock.patch("importlib.util.find_spec"), mock.patch(
+            "teamschatgrab.exe_builder.subprocess.run",
+            side_effect=subprocess.CalledProcessError(1, "nuitka"),
+        ):
+            with pytest.raises(RuntimeError) as excinfo:
+                builder.build_windows_exe(backend="nuitka")
+
+        assert "Failed to build executable" in str(excinfo.value)
+
 
 class TestBuildExe:
     """Tests for the build_exe function."""
@@ -138,17 +214,5 @@ class TestBuildExe:
         # Check results
         assert result == expected_path
         mock_builder.build_windows_exe.assert_called_once_with(
-            "TestApp", True, False
-        )
-
-    @mock.patch("teamschatgrab.exe_builder.ExeBuilder")
-    def test_build_exe_unsupported_platform(self, mock_builder_class, monkeypatch):
-        """Test the build_exe function on an unsupported platform."""
-        # Mock sys.platform to simulate Linux
-        monkeypatch.setattr(sys, "platform", "linux")
-        
-        with pytest.raises(NotImplementedError) as excinfo:
-            build_exe()
-        
-        assert "not yet supported" in str(excinfo.value)
-        assert "linux" in str(excinfo.value)
\ No newline at end of file
+            "TestApp", True, False, "pyinstaller"
+        )
\ No newline at end of file
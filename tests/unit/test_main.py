@@ -10,14 +10,29 @@ import pytest
 
 from teamschatgrab.__main__ import main, parse_args
 
+# Build the module-scoped create_app patch once rather than once per worker
+pytestmark = pytest.mark.xdist_group("main_create_app")
 
-@pytest.fixture
-def mock_app():
-    """Mock app creation and running."""
+
+@pytest.fixture(scope="module")
+def _create_app_patcher():
+    """Patch create_app once for the whole module."""
     with mock.patch("teamschatgrab.__main__.create_app") as mock_create_app:
-        app_instance = mock_create_app.return_value
-        app_instance.run.return_value = True
-        yield {"create": mock_create_app, "instance": app_instance}
+        yield mock_create_app
+
+
+@pytest.fixture
+def mock_app(_create_app_patcher):
+    """Mock app creation and running, reset before each test.
+
+    The app instance mock is kept across tests like the patch itself; only
+    its run method is reset, since that is all the tests configure.
+    """
+    _create_app_patcher.reset_mock(side_effect=True)
+    app_instance = _create_app_patcher.return_value
+    app_instance.run.reset_mock(return_value=True, side_effect=True)
+    app_instance.run.return_value = True
+    return {"create": _create_app_patcher, "instance": app_instance}
 
 
 class TestMain:
@@ -39,6 +54,37 @@ class TestMain:
         assert args.no_rich is True
         assert args.debug is True
 
+    def test_parse_args_output_dir_equals(self):
+        """Test the --output-dir=VALUE form."""
+        args = parse_args(["--output-dir=/custom/path"])
+
+        assert args.output_dir == "/custom/path"
+
+    def test_parse_args_fast_path_skips_argparse(self):
+        """Test known flags are parsed without building an argparse parser."""
+        with mock.patch("argparse.ArgumentParser") as mock_parser:
+            args = parse_args(["--debug"])
+
+        assert args.debug is True
+        mock_parser.assert_not_called()
+
+    def test_parse_args_help_uses_argparse(self, capsys):
+        """Test --help falls back to argparse for the usage text."""
+        with pytest.raises(SystemExit):
+            parse_args(["--help"])
+
+        assert "--output-dir" in capsys.readouterr().out
+
+    def test_parse_args_unknown_flag(self):
+        """Test unknown flags are rejected by argparse."""
+        with pytest.raises(SystemExit):
+            parse_args(["--bogus"])
+
+    def test_parse_args_missing_value(self):
+        """Test a missing --output-dir value is rejected by argparse."""
+        with pytest.raises(SystemExit):
+            parse_args(["-o"])
+
     def test_main_success(self, mock_app):
         """Test successful main execution."""
         result = main(["-o", "/custom/path"])
@@ -4,100 +4,103 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
-import os
+from types import SimpleNamespace
 from unittest import mock
 
 import pytest
 
 from teamschatgrab.platform_detection import (
     PlatformType,
+    clear_platform_cache,
     detect_platform,
     get_teams_data_path,
     get_platform_info,
+    supports_unicode,
 )
 
+# platform.uname() results for the mocked Linux kernels
+_WSL_UNAME = SimpleNamespace(system="Linux", release="5.10.16.3-microsoft-standard")
+_LINUX_UNAME = SimpleNamespace(system="Linux", release="5.15.0-generic")
+
+
+@pytest.fixture(autouse=True)
+def fresh_platform_cache():
+    """Re-probe the mocked platform in every test."""
+    clear_platform_cache()
+    yield
+    clear_platform_cache()
+
 
 @pytest.fixture
-def mock_windows():
+def mock_windows(monkeypatch):
     """Mock Windows environment."""
-    with mock.patch("platform.system", return_value="Windows"), mock.patch(
+    monkeypatch.setattr("platform.system", lambda: "Windows")
+    monkeypatch.setattr(
         "os.path.expandvars",
-        return_value=r"C:\Users\testuser\AppData\Roaming\Microsoft\Teams",
-    ):
-        yield
+        lambda _path: r"C:\Users\testuser\AppData\Roaming\Microsoft\Teams",
+    )
 
 
 @pytest.fixture
-def mock_macos():
+def mock_macos(monkeypatch):
     """Mock macOS environment."""
-    with mock.patch("platform.system", return_value="Darwin"), mock.patch(
+    monkeypatch.setattr("platform.system", lambda: "Darwin")
+    monkeypatch.setattr(
         "os.path.expanduser",
-        return_value="/Users/testuser/Library/Application Support/Microsoft/Teams",
-    ):
-        yield
+        lambda _path: "/Users/testuser/Library/Application Support/Microsoft/Teams",
+    )
 
 
 @pytest.fixture
-def mock_wsl():
+def mock_wsl(monkeypatch):
     """Mock WSL environment."""
-    with mock.patch("platform.system", return_value="Linux"), mock.patch(
-        "platform.uname", return_value=mock.Mock(release="5.10.16.3-microsoft-standard")
-    ), mock.patch.dict(os.environ, {"USER": "testuser"}):
-        yield
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    monkeypatch.setattr("platform.uname", lambda: _WSL_UNAME)
+    monkeypatch.setenv("USER", "testuser")
 
 
 @pytest.fixture
-def mock_linux():
+def mock_linux(monkeypatch):
     """Mock Linux environment."""
-    with mock.patch("platform.system", return_value="Linux"), mock.patch(
-        "platform.uname", return_value=mock.Mock(release="5.15.0-generic")
-    ):
-        yield
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    monkeypatch.setattr("platform.uname", lambda: _LINUX_UNAME)
 
 
 class TestPlatformDetection:
     """Tests for platform detection functions."""
 
-    def test_detect_windows(self, mock_windows):
-        """Test Windows platform detection."""
-        assert detect_platform() == PlatformType.WINDOWS
-
-    def test_detect_macos(self, mock_macos):
-        """Test macOS platform detection."""
-        assert detect_platform() == PlatformType.MACOS
-
-    def test_detect_wsl(self, mock_wsl):
-        """Test WSL platform detection."""
-        assert detect_platform() == PlatformType.WSL
-
-    def test_detect_linux(self, mock_linux):
-        """Test Linux platform detection."""
-        assert detect_platform() == PlatformType.LINUX
-
-    def test_get_teams_data_path_windows(self, mock_windows):
-        """Test getting Teams data path on Windows."""
-        assert (
-            get_teams_data_path()
-            == r"C:\Users\testuser\AppData\Roaming\Microsoft\Teams"
-        )
-
-    def test_get_teams_data_path_macos(self, mock_macos):
-        """Test getting Teams data path on macOS."""
-        assert (
-            get_teams_data_path()
-            == "/Users/testuser/Library/Application Support/Microsoft/Teams"
-        )
-
-    def test_get_teams_data_path_wsl(self, mock_wsl):
-        """Test getting Teams data path on WSL."""
-        assert (
-            get_teams_data_path()
-            == "/mnt/c/Users/testuser/AppData/Roaming/Microsoft/Teams"
-        )
-
-    def test_get_teams_data_path_linux(self, mock_linux):
-        """Test getting Teams data path on Linux (should be None)."""
-        assert get_teams_data_path() is None
+    @pytest.mark.parametrize(
+        "environment, expected",
+        [
+            ("mock_windows", PlatformType.WINDOWS),
+            ("mock_macos", PlatformType.MACOS),
+            ("mock_wsl", PlatformType.WSL),
+            ("mock_linux", PlatformType.LINUX),
+        ],
+    )
+    def test_detect_platform(self, request, environment, expected):
+        """Test platform detection in each mocked environment."""
+        request.getfixturevalue(environment)
+        assert detect_platform() == expected
+
+    @pytest.mark.parametrize(
+        "environment, expected",
+        [
+            ("mock_windows", r"C:\Users\testuser\AppData\Roaming\Microsoft\Teams"),
+            (
+                "mock_macos",
+                "/Users/testuser/Library/Application Support/Microsoft/Teams",
+            ),
+            ("mock_wsl", "/mnt/c/Users/testuser/AppData/Roaming/Microsoft/Teams"),
+            # Teams has no Linux client
+            ("mock_linux", None),
+        ],
+        ids=["windows", "macos", "wsl", "linux"],
+    )
+    def test_get_teams_data_path(self, request, environment, expected):
+        """Test the Teams data path resolved in each mocked environment."""
+        request.getfixturevalue(environment)
+        assert get_teams_data_path() == expected
 
     def test_get_platform_info_includes_required_keys(self, mock_macos):
         """Test that platform info contains all required keys."""
@@ -112,3 +115,27 @@ class TestPlatformDetection:
         ]
         for key in required_keys:
             assert key in info
+
+    def test_get_platform_info_is_cached(self, mock_macos):
+        """Test platform probes run once until the cache is cleared."""
+        with mock.patch("platform.release", return_value="1.0") as release:
+            first = get_platform_info()
+            assert get_platform_info() is first
+            assert release.call_count == 1
+
+            clear_platform_cache()
+            get_platform_info()
+            assert release.call_count == 2
+
+    def test_supports_unicode(self, mock_linux):
+        """Test non-Windows terminals are assumed to handle unicode."""
+        assert supports_unicode() is True
+
+    def test_supports_unicode_windows(self, mock_windows, monkeypatch):
+        """Test Windows needs Windows Terminal for unicode symbols."""
+        monkeypatch.delenv("WT_SESSION", raising=False)
+        assert supports_unicode() is False
+
+        clear_platform_cache()
+        monkeypatch.setenv("WT_SESSION", "1")
+        assert supports_unicode() is True
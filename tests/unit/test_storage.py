@@ -4,40 +4,129 @@ Copyright (C) 2025 Eric C. Mumford (@heymumford)
 MIT License
 """
 
+import io
+import json
+from pathlib import Path
 from unittest import mock
 import pytest
 
+from teamschatgrab import storage as storage_module
 from teamschatgrab.storage import TeamsStorage, StorageFormat, StorageError, ChatType
 
+# Build the module-scoped mocks and storage once rather than once per worker
+pytestmark = pytest.mark.xdist_group("storage_mocks")
+
+
+def _compact_json_array(messages):
+    """Expected default JSON output: one compact message per line."""
+    records = [
+        json.dumps(m, ensure_ascii=False, separators=(",", ":")) for m in messages
+    ]
+    return "[\n" + ",\n".join(records) + "\n]"
+
 
 @pytest.fixture
-def mock_path():
-    """Mock Path object and filesystem operations."""
-    with mock.patch("teamschatgrab.storage.Path") as mock_path, mock.patch(
-        "teamschatgrab.storage.open", mock.mock_open()
-    ) as mock_open, mock.patch("json.dump") as mock_dump:
-        # Setup path mocks
-        path_instance = mock_path.return_value
-        path_instance.__truediv__.return_value = (
-            path_instance  # For path / path operations
-        )
+def frozen_now(monkeypatch):
+    """Freeze the filename timestamp and return it."""
+    stamp = "20250115_103000"
+    monkeypatch.setattr(storage_module.time, "strftime", lambda *args: stamp)
+    return stamp
 
-        # Mock mkdir
-        path_instance.mkdir.return_value = None
 
-        yield {
-            "path": mock_path,
-            "open": mock_open,
-            "dump": mock_dump,
-            "instance": path_instance,
-        }
+class _FileStub(io.StringIO):
+    """In-memory text file that counts writes and flushes.
+
+    Leaving the with block does not close it, so the contents can still be
+    read after the code under test is done with the file.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.write_count = 0
+        self.flushes = 0
+
+    def write(self, text):
+        self.write_count += 1
+        return super().write(text)
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+class _OpenStub:
+    """Stand-in for open() that records its calls and returns one file."""
+
+    def __init__(self):
+        self.calls = []
+        self.file = _FileStub()
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return self.file
+
+
+@pytest.fixture(scope="module")
+def _path_mocks():
+    """Build the Path and json.dump mocks once for the module."""
+    return {
+        "path": mock.MagicMock(),
+        "instance": mock.MagicMock(),
+        "dump": mock.MagicMock(),
+    }
 
 
 @pytest.fixture
-def storage(mock_path):
-    """Create a test storage instance."""
-    storage = TeamsStorage(base_path="/test/path")
-    return storage
+def mock_path(_path_mocks, monkeypatch):
+    """Mock Path object and filesystem operations.
+
+    The mocks are shared across the module and reset here; the patches are
+    still only active for the tests that ask for them, since the tmp_path
+    based tests in this module need the real Path, open and json.dump.
+    open() is replaced by a plain recording stub rather than mock_open.
+    """
+    mock_path = _path_mocks["path"]
+    path_instance = _path_mocks["instance"]
+    mock_path.reset_mock(return_value=True, side_effect=True)
+    # Keep the instance's configured magic methods such as __hash__
+    path_instance.reset_mock(side_effect=True)
+    _path_mocks["dump"].reset_mock()
+
+    # Setup path mocks
+    mock_path.return_value = path_instance
+    path_instance.__truediv__.return_value = path_instance  # For path / path
+
+    # Mock mkdir
+    path_instance.mkdir.return_value = None
+
+    open_stub = _OpenStub()
+    monkeypatch.setattr(storage_module, "Path", mock_path)
+    monkeypatch.setattr(storage_module, "open", open_stub, raising=False)
+    monkeypatch.setattr(json, "dump", _path_mocks["dump"])
+
+    return {**_path_mocks, "open": open_stub}
+
+
+@pytest.fixture(scope="module")
+def _shared_storage(_path_mocks):
+    """Construct the mocked storage once for the module."""
+    with mock.patch("teamschatgrab.storage.Path", _path_mocks["path"]):
+        return TeamsStorage(base_path="/test/path")
+
+
+@pytest.fixture
+def storage(mock_path, _shared_storage):
+    """Create a test storage instance.
+
+    The instance is shared, so its directory memo is cleared to keep
+    mkdir assertions isolated per test.
+    """
+    _shared_storage._dirs_created.clear()
+    _shared_storage._attachment_dirs.clear()
+    return _shared_storage
 
 
 class TestTeamsStorage:
@@ -57,9 +146,6 @@ class TestTeamsStorage:
         mock_path["path"].home.return_value = home_mock
         home_mock.__truediv__.return_value = path_instance
 
-        # Disable real directory creation
-        path_instance.mkdir = mock.MagicMock()
-
         # Create storage with default path
         with mock.patch("pathlib.Path.home", return_value=home_mock):
             TeamsStorage()
@@ -76,362 +162,218 @@ class TestTeamsStorage:
 
     def test_ensure_dir_error(self, storage, mock_path):
         """Test directory creation error."""
-        test_path = mock_path["instance"]
+        test_path = mock.MagicMock()
         test_path.mkdir.side_effect = OSError("Permission denied")
 
         with pytest.raises(StorageError):
             storage._ensure_dir(test_path)
 
-    def test_sanitize_filename(self, mock_path):
+    def test_sanitize_filename(self, storage):
         """Test filename sanitization."""
-        storage_instance = TeamsStorage()
-        # Test invalid characters - the regex in storage.py will replace all invalid chars with underscore
-        result = storage_instance._sanitize_filename('file<>:"/\\|?*name')
-        # The number of underscores doesn't need to match exactly, just check that:
-        # - invalid characters are replaced
-        # - string starts and ends as expected
-        assert result.startswith("file")
-        assert result.endswith("name")
-        assert "<" not in result
-        assert ":" not in result
-        assert "/" not in result
+        # Each invalid character becomes one underscore
+        result = storage._sanitize_filename('file<>:"/\\|?*name')
+        assert result == "file" + "_" * 9 + "name"
 
         # Test length limitation
         long_name = "a" * 300
-        sanitized = storage_instance._sanitize_filename(long_name)
+        sanitized = storage._sanitize_filename(long_name)
         assert len(sanitized) <= 200
         assert sanitized.endswith("...")
 
-    def test_create_chat_directory(self, storage, mock_path):
-        """Test chat directory creation."""
-        # Create a chat directory with our mock path
-        chat_id = "1234567890abcdef"
-        test_chat_name = "Test Chat"
+    @pytest.mark.parametrize("char", list('<>:"/\\|?*'))
+    def test_sanitize_filename_replaces_each_invalid_char(self, storage, char):
+        """Test every character invalid on Windows is replaced."""
+        assert storage._sanitize_filename(f"a{char}b") == "a_b"
 
-        # Instead of checking specific calls, verify that the right number of operations happened
-        storage.create_chat_directory(
-            chat_name=test_chat_name, chat_id=chat_id, chat_type=ChatType.DIRECT
-        )
+    def test_sanitize_filename_keeps_valid_names(self, storage):
+        """Test names without invalid characters pass through unchanged."""
+        names = [f"Chat {i} - Caf\u00e9 (team).txt" for i in range(1000)]
+        assert [storage._sanitize_filename(name) for name in names] == names
 
-        # Check that directories were created
-        assert mock_path["instance"].mkdir.call_count >= 2
-        assert len(mock_path["instance"].__truediv__.call_args_list) >= 3
+    def test_create_chat_directory(self, tmp_path):
+        """Test chat directory creation."""
+        storage = TeamsStorage(base_path=str(tmp_path))
 
-    def test_save_messages_json(self, storage, mock_path):
-        """Test saving messages in JSON format."""
-        messages = [
-            {
-                "id": "1",
-                "sender": {"user": {"displayName": "User 1"}},
-                "createdDateTime": "2023-01-01T12:00:00Z",
-                "body": {"content": "Hello"},
-            },
-            {
-                "id": "2",
-                "sender": {"user": {"displayName": "User 2"}},
-                "createdDateTime": "2023-01-01T12:01:00Z",
-                "body": {"content": "Hi there"},
-            },
-        ]
+        chat_dir = storage.create_chat_directory(
+            chat_name="Test Chat", chat_id="1234567890abcdef", chat_type=ChatType.DIRECT
+        )
 
-        chat_dir = mock_path["instance"]
+        assert chat_dir == tmp_path / "direct" / "Test Chat_90abcdef"
+        assert (chat_dir / "attachments").is_dir()
 
-        with mock.patch("datetime.datetime") as mock_datetime:
-            # Mock timestamp
-            mock_datetime.now.return_value.strftime.return_value = "20230101_120000"
+    def test_create_chat_directory_memoizes_mkdir(self, tmp_path):
+        """Test repeat calls for the same chat skip the filesystem."""
+        storage = TeamsStorage(base_path=str(tmp_path))
+        storage.create_chat_directory("Test Chat", "1234567890abcdef", ChatType.DIRECT)
 
-            storage.save_messages(
-                messages=messages, chat_dir=chat_dir, format=StorageFormat.JSON
+        with mock.patch.object(Path, "mkdir") as mkdir:
+            chat_dir = storage.create_chat_directory(
+                "Test Chat", "1234567890abcdef", ChatType.DIRECT
             )
 
-            # Check that file was opened with correct path
-            mock_path["open"].assert_called_with(
-                chat_dir / "messages_20230101_120000.json", "w", encoding="utf-8"
-            )
+        mkdir.assert_not_called()
+        assert chat_dir.is_dir()
 
-            # Check that json.dump was called with messages
-            mock_path["dump"].assert_called_with(
-                messages,
-                mock_path["open"].return_value.__enter__.return_value,
-                indent=2,
-                ensure_ascii=False,
-            )
+    def test_save_messages_shared_timestamp(self, tmp_path):
+        """Test formats saved with one timestamp get matching filenames."""
+        storage = TeamsStorage(base_path=str(tmp_path))
+        messages = [{"body": {"content": "Hello"}}]
 
-    def test_save_messages_text(self, storage, mock_path):
-        """Test saving messages in text format."""
-        messages = [
-            {
-                "id": "1",
-                "sender": {"user": {"displayName": "User 1"}},
-                "createdDateTime": "2023-01-01T12:00:00Z",
-                "body": {"content": "Hello"},
-            },
-            {
-                "id": "2",
-                "sender": {"user": {"displayName": "User 2"}},
-                "createdDateTime": "2023-01-01T12:01:00Z",
-                "body": {"content": "Hi there"},
-            },
+        paths = [
+            storage.save_messages(messages, tmp_path, fmt, timestamp="20250115_103000")
+            for fmt in (StorageFormat.JSON, StorageFormat.HTML)
         ]
 
-        chat_dir = mock_path["instance"]
-        mock_file = mock_path["open"].return_value.__enter__.return_value
-
-        with mock.patch("datetime.datetime") as mock_datetime:
-            # Mock timestamp
-            mock_datetime.now.return_value.strftime.return_value = "20230101_120000"
-
-            storage.save_messages(
-                messages=messages, chat_dir=chat_dir, format=StorageFormat.TEXT
-            )
-
-            # Check that file was opened with correct path
-            mock_path["open"].assert_called_with(
-                chat_dir / "messages_20230101_120000.txt", "w", encoding="utf-8"
-            )
+        assert [p.name for p in paths] == [
+            "messages_20250115_103000.json",
+            "messages_20250115_103000.html",
+        ]
 
-            # Check that write was called with expected content
-            assert mock_file.write.call_count > 0
+    def test_save_messages_json(self, storage, mock_path, sample_messages, frozen_now):
+        """Test saving messages in JSON format."""
+        messages = list(sample_messages)
 
-    def test_save_attachment(self, storage, mock_path):
-        """Test saving attachment."""
-        attachment_data = b"binary data"
-        filename = "test<file>.pdf"
         chat_dir = mock_path["instance"]
-        mock_file = mock_path["open"].return_value.__enter__.return_value
 
-        storage.save_attachment(
-            attachment_data=attachment_data, filename=filename, chat_dir=chat_dir
+        storage.save_messages(
+            messages=messages, chat_dir=chat_dir, format=StorageFormat.JSON
         )
 
-        # Check that file was opened with sanitized path
-        mock_path["open"].assert_called_with(
-            chat_dir / "attachments" / "test_file_.pdf", "wb"
+        # Check that file was opened with correct path
+        assert mock_path["open"].calls[-1] == (
+            (chat_dir / f"messages_{frozen_now}.json", "w"),
+            {"encoding": "utf-8", "buffering": 1 << 20},
         )
 
-        # Check that write was called with the binary data
-        mock_file.write.assert_called_with(attachment_data)
-
-    def test_content_download_json(self, storage, mock_path):
-        """Test content download in JSON format with test doubles."""
-        # Sample message data
-        messages = [
-            {
-                "id": "msg1",
-                "sender": {"user": {"displayName": "Test User 1"}},
-                "createdDateTime": "2025-01-15T10:30:00Z",
-                "body": {"content": "This is a test message"},
-            },
-            {
-                "id": "msg2",
-                "sender": {"user": {"displayName": "Test User 2"}},
-                "createdDateTime": "2025-01-15T10:35:00Z",
-                "body": {"content": "This is a reply"},
-            },
-        ]
-
-        # Setup mocks
-        chat_dir = mock_path["instance"]
-        mock_file = mock_path["open"].return_value.__enter__.return_value
-
-        with mock.patch("datetime.datetime") as mock_datetime:
-            # Mock timestamp for predictable filenames
-            mock_datetime.now.return_value.strftime.return_value = "20250115_103000"
-
-            # Call the method under test
-            result = storage.save_messages(
-                messages=messages, chat_dir=chat_dir, format=StorageFormat.JSON
-            )
-
-            # Verify file path is correct
-            expected_path = chat_dir / "messages_20250115_103000.json"
-            assert result == expected_path
-
-            # Verify file was opened with correct path and mode
-            mock_path["open"].assert_called_with(expected_path, "w", encoding="utf-8")
+        # By default each message is written compactly on its own line
+        mock_file = mock_path["open"].file
+        written = mock_file.getvalue()
+        assert written == _compact_json_array(messages)
+        assert json.loads(written) == messages
 
-            # Verify JSON dump was called with correct parameters
-            mock_path["dump"].assert_called_with(
-                messages, mock_file, indent=2, ensure_ascii=False
-            )
-
-    def test_content_download_text(self, storage, mock_path):
-        """Test content download in TEXT format with test doubles."""
-        # Sample message data
-        messages = [
-            {
-                "id": "msg1",
-                "sender": {"user": {"displayName": "Test User 1"}},
-                "createdDateTime": "2025-01-15T10:30:00Z",
-                "body": {"content": "This is a test message"},
-            },
-            {
-                "id": "msg2",
-                "sender": {"user": {"displayName": "Test User 2"}},
-                "createdDateTime": "2025-01-15T10:35:00Z",
-                "body": {"content": "This is a reply"},
-            },
-        ]
-
-        # Setup mocks
+    def test_save_messages_text(self, storage, mock_path, sample_messages, frozen_now):
+        """Test saving messages in text format."""
         chat_dir = mock_path["instance"]
-        mock_file = mock_path["open"].return_value.__enter__.return_value
-
-        with mock.patch("datetime.datetime") as mock_datetime:
-            # Mock timestamp for predictable filenames
-            mock_datetime.now.return_value.strftime.return_value = "20250115_103000"
+        mock_file = mock_path["open"].file
 
-            # Call the method under test
-            result = storage.save_messages(
-                messages=messages, chat_dir=chat_dir, format=StorageFormat.TEXT
-            )
-
-            # Verify file path is correct
-            expected_path = chat_dir / "messages_20250115_103000.txt"
-            assert result == expected_path
-
-            # Verify file was opened with correct path and mode
-            mock_path["open"].assert_called_with(expected_path, "w", encoding="utf-8")
-
-            # Verify write was called for each message with correct content
-            # We should have at least 6 writes (2 msgs * 3 lines each)
-            assert mock_file.write.call_count >= 6
-
-            # Check specific content is written
-            mock_file.write.assert_any_call("From: Test User 1\n")
-            mock_file.write.assert_any_call("Time: 2025-01-15T10:30:00Z\n")
-            mock_file.write.assert_any_call("Message: This is a test message\n")
-            mock_file.write.assert_any_call("From: Test User 2\n")
-            mock_file.write.assert_any_call("Time: 2025-01-15T10:35:00Z\n")
-            mock_file.write.assert_any_call("Message: This is a reply\n")
-
-    def test_content_download_html(self, storage, mock_path):
-        """Test content download in HTML format with test doubles."""
-        # Sample message data
-        messages = [
-            {
-                "id": "msg1",
-                "sender": {"user": {"displayName": "Test User 1"}},
-                "createdDateTime": "2025-01-15T10:30:00Z",
-                "body": {"content": "This is a test message"},
-            },
-            {
-                "id": "msg2",
-                "sender": {"user": {"displayName": "Test User 2"}},
-                "createdDateTime": "2025-01-15T10:35:00Z",
-                "body": {"content": "This is a reply"},
-            },
-        ]
-
-        # Setup mocks
-        chat_dir = mock_path["instance"]
-        mock_file = mock_path["open"].return_value.__enter__.return_value
+        storage.save_messages(
+            messages=sample_messages, chat_dir=chat_dir, format=StorageFormat.TEXT
+        )
 
-        with mock.patch("datetime.datetime") as mock_datetime:
-            # Mock timestamp for predictable filenames
-            mock_datetime.now.return_value.strftime.return_value = "20250115_103000"
+        # Check that file was opened with correct path
+        assert mock_path["open"].calls[-1] == (
+            (chat_dir / f"messages_{frozen_now}.txt", "w"),
+            {"encoding": "utf-8", "buffering": 1 << 20},
+        )
 
-            # Call the method under test
-            result = storage.save_messages(
-                messages=messages, chat_dir=chat_dir, format=StorageFormat.HTML
-            )
+        # Check that both messages were written
+        written = mock_file.getvalue()
+        assert "From: Test User 1\n" in written
+        assert "From: Test User 2\n" in written
 
-            # Verify file path is correct
-            expected_path = chat_dir / "messages_20250115_103000.html"
-            assert result == expected_path
+    def test_save_attachment(self, tmp_path):
+        """Test saving attachment."""
+        storage = TeamsStorage(base_path=str(tmp_path))
+        chat_dir = storage.create_chat_directory(
+            "Test Chat", "1234567890abcdef", ChatType.DIRECT
+        )
 
-            # Verify file was opened with correct path and mode
-            mock_path["open"].assert_called_with(expected_path, "w", encoding="utf-8")
+        path = storage.save_attachment(
+            attachment_data=b"binary data", filename="test<file>.pdf", chat_dir=chat_dir
+        )
 
-            # Verify HTML elements were written
-            mock_file.write.assert_any_call(
+        # Saved under the sanitized name
+        assert path == chat_dir / "attachments" / "test_file_.pdf"
+        assert path.read_bytes() == b"binary data"
+
+    def test_save_attachment_unknown_chat_dir(self, tmp_path):
+        """Test chats not created by this instance still resolve attachments."""
+        storage = TeamsStorage(base_path=str(tmp_path))
+        (tmp_path / "attachments").mkdir()
+
+        path = storage.save_attachment(b"data", "file.txt", tmp_path)
+
+        assert path == tmp_path / "attachments" / "file.txt"
+        assert storage._attachment_dirs[tmp_path] == str(tmp_path / "attachments")
+
+    @pytest.mark.parametrize(
+        "fmt,ext,expected",
+        [
+            # JSON is compared against json.dumps of the same messages
+            (StorageFormat.JSON, "json", None),
+            (
+                StorageFormat.TEXT,
+                "txt",
+                "From: Test User 1\n"
+                "Time: 2025-01-15T10:30:00Z\n"
+                "Message: This is a test message\n" + "-" * 50 + "\n\n"
+                "From: Test User 2\n"
+                "Time: 2025-01-15T10:35:00Z\n"
+                "Message: This is a reply\n" + "-" * 50 + "\n\n",
+            ),
+            (
+                StorageFormat.HTML,
+                "html",
                 "<html><head><title>Teams Chat</title></head><body>\n"
-            )
-            mock_file.write.assert_any_call("<div class='messages'>\n")
-
-            # Check user 1 message content is written with appropriate HTML
-            mock_file.write.assert_any_call("<div class='message'>\n")
-            mock_file.write.assert_any_call("  <div class='sender'>Test User 1</div>\n")
-            mock_file.write.assert_any_call(
+                "<div class='messages'>\n"
+                "<div class='message'>\n"
+                "  <div class='sender'>Test User 1</div>\n"
                 "  <div class='time'>2025-01-15T10:30:00Z</div>\n"
-            )
-            mock_file.write.assert_any_call(
                 "  <div class='content'>This is a test message</div>\n"
-            )
-
-            # Check user 2 message content is written with appropriate HTML
-            mock_file.write.assert_any_call("  <div class='sender'>Test User 2</div>\n")
-            mock_file.write.assert_any_call(
+                "</div>\n"
+                "<div class='message'>\n"
+                "  <div class='sender'>Test User 2</div>\n"
                 "  <div class='time'>2025-01-15T10:35:00Z</div>\n"
-            )
-            mock_file.write.assert_any_call(
                 "  <div class='content'>This is a reply</div>\n"
-            )
-
-            # Check closing tags
-            mock_file.write.assert_any_call("</div></body></html>\n")
-
-    def test_content_download_markdown(self, storage, mock_path):
-        """Test content download in Markdown format with test doubles."""
-        # Sample message data
-        messages = [
-            {
-                "id": "msg1",
-                "sender": {"user": {"displayName": "Test User 1"}},
-                "createdDateTime": "2025-01-15T10:30:00Z",
-                "body": {"content": "This is a test message"},
-            },
-            {
-                "id": "msg2",
-                "sender": {"user": {"displayName": "Test User 2"}},
-                "createdDateTime": "2025-01-15T10:35:00Z",
-                "body": {"content": "This is a reply"},
-            },
-        ]
-
+                "</div>\n"
+                "</div></body></html>\n",
+            ),
+            (
+                StorageFormat.MARKDOWN,
+                "md",
+                "# Teams Chat Export\n\n"
+                "## Test User 1 - 2025-01-15T10:30:00Z\n\n"
+                "This is a test message\n\n---\n\n"
+                "## Test User 2 - 2025-01-15T10:35:00Z\n\nThis is a reply\n\n---\n\n",
+            ),
+        ],
+        ids=["json", "text", "html", "markdown"],
+    )
+    def test_content_download(
+        self, storage, mock_path, sample_messages, frozen_now, fmt, ext, expected
+    ):
+        """Test content download in each format with test doubles."""
         # Setup mocks
         chat_dir = mock_path["instance"]
-        mock_file = mock_path["open"].return_value.__enter__.return_value
-
-        with mock.patch("datetime.datetime") as mock_datetime:
-            # Mock timestamp for predictable filenames
-            mock_datetime.now.return_value.strftime.return_value = "20250115_103000"
-
-            # Call the method under test
-            result = storage.save_messages(
-                messages=messages, chat_dir=chat_dir, format=StorageFormat.MARKDOWN
-            )
-
-            # Verify file path is correct
-            expected_path = chat_dir / "messages_20250115_103000.md"
-            assert result == expected_path
+        mock_file = mock_path["open"].file
 
-            # Verify file was opened with correct path and mode
-            mock_path["open"].assert_called_with(expected_path, "w", encoding="utf-8")
+        # Call the method under test; pretty only affects JSON
+        result = storage.save_messages(
+            messages=sample_messages, chat_dir=chat_dir, format=fmt, pretty=True
+        )
 
-            # Verify Markdown elements were written
-            mock_file.write.assert_any_call("# Teams Chat Export\n\n")
+        # Verify file path is correct
+        expected_path = chat_dir / f"messages_{frozen_now}.{ext}"
+        assert result == expected_path
 
-            # Check user 1 message content is written with appropriate Markdown
-            mock_file.write.assert_any_call("## Test User 1 - 2025-01-15T10:30:00Z\n\n")
-            mock_file.write.assert_any_call("This is a test message\n\n")
-            mock_file.write.assert_any_call("---\n\n")
+        # Verify file was opened with correct path and mode
+        assert mock_path["open"].calls[-1] == (
+            (expected_path, "w"),
+            {"encoding": "utf-8", "buffering": 1 << 20},
+        )
 
-            # Check user 2 message content is written with appropriate Markdown
-            mock_file.write.assert_any_call("## Test User 2 - 2025-01-15T10:35:00Z\n\n")
-            mock_file.write.assert_any_call("This is a reply\n\n")
-            mock_file.write.assert_any_call("---\n\n")
+        written = mock_file.getvalue()
+        if fmt is StorageFormat.JSON:
+            # Identical to dumping the whole list at once
+            assert written == json.dumps(sample_messages, indent=2, ensure_ascii=False)
+        else:
+            # Header, messages and footer are coalesced into a single write
+            assert mock_file.write_count == 1
+            assert written == expected
 
-    def test_unsupported_format_error(self, storage, mock_path):
+    def test_unsupported_format_error(self, storage, mock_path, sample_messages):
         """Test error handling for unsupported format."""
-        messages = [
-            {
-                "id": "msg1",
-                "sender": {"user": {"displayName": "Test User 1"}},
-                "createdDateTime": "2025-01-15T10:30:00Z",
-                "body": {"content": "This is a test message"},
-            }
-        ]
+        messages = sample_messages[:1]
 
         chat_dir = mock_path["instance"]
 
@@ -447,3 +389,141 @@ class TestTeamsStorage:
         # Check the error message contains the format name
         assert "Unsupported output format" in str(excinfo.value)
         assert str(unsupported_format) in str(excinfo.value)
+
+    def test_open_message_writer_streams_json(self, storage, mock_path):
+        """Test streaming messages one at a time produces a valid JSON array."""
+        messages = [
+            {"id": "msg1", "body": {"content": "First"}},
+            {"id": "msg2", "body": {"content": "Second"}},
+        ]
+        chat_dir = mock_path["instance"]
+        mock_file = mock_path["open"].file
+
+        with storage.open_message_writer(chat_dir, StorageFormat.JSON) as writer:
+            for msg in messages:
+                writer.write(msg)
+
+        assert writer.count == 2
+        written = mock_file.getvalue()
+        assert json.loads(written) == messages
+
+    @pytest.mark.parametrize("pretty", [False, True])
+    @pytest.mark.parametrize("use_orjson", [False, True])
+    def test_open_message_writer_json_encoders_agree(
+        self, storage, mock_path, use_orjson, pretty
+    ):
+        """Test the stdlib and orjson paths write the same JSON."""
+        if use_orjson and not storage_module.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        messages = [
+            {"id": "msg1", "body": {"content": "Caf\u00e9", "tags": []}},
+            {"id": "msg2", "reactions": [{"type": "like"}], "meta": {}},
+        ]
+        mock_file = mock_path["open"].file
+
+        with mock.patch.object(storage_module, "ORJSON_AVAILABLE", use_orjson):
+            with storage.open_message_writer(
+                mock_path["instance"], pretty=pretty
+            ) as writer:
+                for msg in messages:
+                    writer.write(msg)
+
+        written = mock_file.getvalue()
+        if pretty:
+            assert written == json.dumps(messages, indent=2, ensure_ascii=False)
+        else:
+            assert written == _compact_json_array(messages)
+
+    def test_open_message_writer_finalizes_on_error(self, storage, mock_path):
+        """Test a failed download still leaves a well-formed JSON file."""
+        chat_dir = mock_path["instance"]
+        mock_file = mock_path["open"].file
+
+        with pytest.raises(RuntimeError):
+            with storage.open_message_writer(chat_dir, StorageFormat.JSON) as writer:
+                writer.write({"id": "msg1"})
+                raise RuntimeError("connection lost")
+
+        written = mock_file.getvalue()
+        assert json.loads(written) == [{"id": "msg1"}]
+
+    def test_cursor_round_trip(self, tmp_path):
+        """Test a saved checkpoint is loaded back and cleared."""
+        storage = TeamsStorage(base_path=str(tmp_path))
+
+        assert storage.load_cursor(tmp_path) is None
+
+        storage.save_cursor(
+            tmp_path,
+            before="2023-01-02T00:00:00Z",
+            count=100,
+            settings={"format": "json", "files": ["messages_1.json"]},
+        )
+        assert storage.load_cursor(tmp_path) == {
+            "before": "2023-01-02T00:00:00Z",
+            "count": 100,
+            "format": "json",
+            "files": ["messages_1.json"],
+        }
+        assert not list(tmp_path.glob("*.tmp"))
+
+        storage.clear_cursor(tmp_path)
+        assert storage.load_cursor(tmp_path) is None
+        storage.clear_cursor(tmp_path)
+
+    def test_load_cursor_ignores_corrupt_file(self, tmp_path):
+        """Test an unreadable checkpoint is treated as no checkpoint."""
+        storage = TeamsStorage(base_path=str(tmp_path))
+        (tmp_path / ".cursor.json").write_text("{not json")
+
+        assert storage.load_cursor(tmp_path) is None
+
+    def test_message_writer_drains_at_threshold(self, storage, mock_path):
+        """Test buffered output reaches the file once FLUSH_BYTES is exceeded."""
+        mock_file = mock_path["open"].file
+
+        with mock.patch.object(storage_module.MessageWriter, "FLUSH_BYTES", 40):
+            with storage.open_message_writer(mock_path["instance"]) as writer:
+                writer.write({"id": "msg1"})
+                assert mock_file.write_count == 0
+                writer.write({"id": "msg2", "body": {"content": "x" * 40}})
+                assert mock_file.write_count == 1
+
+                writer.write({"id": "msg3"})
+                writer.flush()
+                assert mock_file.write_count == 2
+                assert mock_file.flushes == 1
+
+    def test_writer_rejects_unsupported_format(self):
+        """Test a writer cannot be created for an unknown format."""
+        with pytest.raises(StorageError, match="Unsupported output format"):
+            storage_module.MessageWriter(mock.Mock(), "pdf", Path("messages.pdf"))
+
+    def test_message_fields_defaults(self):
+        """Test missing or null message parts fall back to defaults."""
+        assert storage_module._message_fields({}) == ("Unknown", "", "")
+        assert storage_module._message_fields(
+            {"sender": {"user": None}, "body": None, "createdDateTime": "t"}
+        ) == ("Unknown", "t", "")
+        assert storage_module._message_fields(
+            {"sender": {"user": {"displayName": "A"}}, "body": {"content": "c"}}
+        ) == ("A", "", "c")
+
+    def test_html_escapes_sender_names(self, storage, mock_path):
+        """Test sender names are escaped in HTML while bodies stay as HTML."""
+        mock_file = mock_path["open"].file
+        msg = {
+            "sender": {"user": {"displayName": "Tom & <Jerry>"}},
+            "body": {"content": "<p>Hi</p>"},
+        }
+
+        with storage.open_message_writer(
+            mock_path["instance"], StorageFormat.HTML
+        ) as writer:
+            writer.write(msg)
+            writer.write(msg)
+
+        written = mock_file.getvalue()
+        assert written.count("<div class='sender'>Tom &amp; &lt;Jerry&gt;</div>") == 2
+        assert "<div class='content'><p>Hi</p></div>" in written
+        assert writer._html_senders == {"Tom & <Jerry>": "Tom &amp; &lt;Jerry&gt;"}
@@ -5,203 +5,327 @@ MIT License
 """
 
 from unittest import mock
+import contextlib
 import io
+import subprocess
+import sys
 import pytest
 
 from teamschatgrab.ui import TerminalUI, LogLevel, RICH_AVAILABLE
+from teamschatgrab.platform_detection import PlatformType, supports_unicode
+
+# Build the module-scoped rich patches once rather than once per worker
+pytestmark = pytest.mark.xdist_group("rich_patches")
+
+
+# rich classes patched on teamschatgrab.ui, keyed in mock_rich by lowercase name
+_RICH_TARGETS = ("Console", "Prompt", "Confirm", "Table", "Progress")
+
+
+@pytest.fixture(scope="module")
+def _rich_patches():
+    """Patch the rich components once for the whole module.
+
+    create=True lets the patches apply even when rich is not installed.
+    _load_rich is stubbed only after patching, since looking the classes up
+    loads rich, so that creating a rich UI keeps the mocks in place.
+    """
+    with contextlib.ExitStack() as stack:
+        patches = {
+            target.lower(): stack.enter_context(
+                mock.patch(f"teamschatgrab.ui.{target}", create=True)
+            )
+            for target in _RICH_TARGETS
+        }
+        stack.enter_context(mock.patch("teamschatgrab.ui._load_rich"))
+        yield patches
 
 
 @pytest.fixture
-def mock_stdin():
-    """Mock standard input."""
-    with mock.patch("builtins.input") as mock_input:
-        yield mock_input
+def mock_rich(_rich_patches):
+    """Mock rich library components, reset before each test.
+
+    The Console instance and its print mock are kept across tests and only
+    reset, since every rich UI prints through them.
+    """
+    console = _rich_patches["console"]
+    for patched in _rich_patches.values():
+        if patched is not console:
+            patched.reset_mock(return_value=True, side_effect=True)
+    console.reset_mock(side_effect=True)
+    console.return_value.print.reset_mock(return_value=True, side_effect=True)
+
+    # Setup prompt mock
+    _rich_patches["prompt"].ask.return_value = "test input"
+
+    # Setup confirm mock
+    _rich_patches["confirm"].ask.return_value = True
+
+    return _rich_patches
 
 
 @pytest.fixture
-def mock_stdout():
-    """Mock standard output."""
-    buffer = io.StringIO()
-    real_print = print
-    with mock.patch("sys.stdout", buffer), mock.patch(
-        "builtins.print", lambda *args, **kwargs: real_print(*args, file=buffer)
-    ):
-        yield buffer
+def ui_plain():
+    """Plain terminal UI writing to an in-memory stream, read via ui.out."""
+    return TerminalUI(use_rich=False, out=io.StringIO())
 
 
 @pytest.fixture
-def mock_rich():
-    """Mock rich library components if available."""
-    if RICH_AVAILABLE:
-        with mock.patch("teamschatgrab.ui.Console") as mock_console, mock.patch(
-            "teamschatgrab.ui.Prompt"
-        ) as mock_prompt, mock.patch(
-            "teamschatgrab.ui.Confirm"
-        ) as mock_confirm, mock.patch(
-            "teamschatgrab.ui.Table"
-        ) as mock_table, mock.patch(
-            "teamschatgrab.ui.Progress"
-        ) as mock_progress:
-            # Setup console mock
-            console_instance = mock_console.return_value
-            console_instance.print = mock.Mock()
-
-            # Setup prompt mock
-            mock_prompt.ask.return_value = "test input"
-
-            # Setup confirm mock
-            mock_confirm.ask.return_value = True
-
-            yield {
-                "console": mock_console,
-                "prompt": mock_prompt,
-                "confirm": mock_confirm,
-                "table": mock_table,
-                "progress": mock_progress,
-            }
-    else:
-        yield None
+def ui_rich(mock_rich):
+    """Rich terminal UI backed by the mocked rich components."""
+    return TerminalUI(use_rich=True)
 
 
 class TestTerminalUI:
     """Tests for the terminal UI."""
 
-    def test_init_rich_available(self, mock_rich):
-        """Test initialization with rich library available."""
-        if RICH_AVAILABLE:
-            ui = TerminalUI(use_rich=True)
-            assert ui.use_rich is True
-            assert mock_rich["console"].called
-        else:
-            pytest.skip("Rich library not available")
-
     def test_init_rich_disabled(self, mock_rich):
         """Test initialization with rich disabled."""
         ui = TerminalUI(use_rich=False)
         assert ui.use_rich is False
-        if RICH_AVAILABLE:
-            assert not mock_rich["console"].called
+        assert not mock_rich["console"].called
+
+    def test_init_uses_cached_platform(self):
+        """Test terminal capabilities come from the shared platform probe."""
+        supports_unicode.cache_clear()
+        with mock.patch(
+            "teamschatgrab.platform_detection.detect_platform",
+            return_value=PlatformType.WINDOWS,
+        ), mock.patch(
+            "teamschatgrab.ui.detect_platform", return_value=PlatformType.WINDOWS
+        ), mock.patch.dict(
+            "os.environ", clear=True
+        ):
+            ui = TerminalUI(use_rich=False)
+        supports_unicode.cache_clear()
+
+        assert ui.is_windows is True
+        assert ui.supports_unicode is False
+        assert ui.symbols is TerminalUI._SYMBOLS_ASCII
+
+    def test_import_does_not_load_rich(self):
+        """Test rich is only imported once a rich UI is created."""
+        code = (
+            "import sys, teamschatgrab.ui as ui\n"
+            "assert 'rich' not in sys.modules\n"
+            "ui.TerminalUI(use_rich=False)\n"
+            "assert 'rich' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
 
-    def test_log_with_rich(self, mock_rich):
-        """Test logging with rich enabled."""
-        if RICH_AVAILABLE:
-            ui = TerminalUI(use_rich=True)
-            ui.log("Test message", LogLevel.INFO)
-            mock_rich["console"].return_value.print.assert_called_once()
-            args, kwargs = mock_rich["console"].return_value.print.call_args
-            assert "Test message" in args[0]
-            assert "style" in kwargs
-        else:
-            pytest.skip("Rich library not available")
-
-    def test_log_without_rich(self, mock_stdout):
+    def test_log_without_rich(self, ui_plain):
         """Test logging without rich."""
-        ui = TerminalUI(use_rich=False)
-        ui.log("Test message", LogLevel.INFO)
-        output = mock_stdout.getvalue()
+        ui_plain.log("Test message", LogLevel.INFO)
+        output = ui_plain.out.getvalue()
         assert "Test message" in output
 
-    def test_prompt_with_rich(self, mock_rich):
-        """Test prompting with rich enabled."""
-        if RICH_AVAILABLE:
-            ui = TerminalUI(use_rich=True)
-            result = ui.prompt("Enter value:", "default")
-            assert mock_rich["prompt"].ask.called
-            assert result == "test input"
-        else:
-            pytest.skip("Rich library not available")
-
-    def test_prompt_without_rich(self, mock_stdin):
+    def test_log_redirected_is_plain(self, ui_plain):
+        """Test redirected output skips symbols and styling."""
+        assert ui_plain._tty is False
+
+        ui_plain.log("Test message", LogLevel.WARNING)
+
+        assert ui_plain.out.getvalue() == "WARNING: Test message\n"
+
+    def test_prompt_without_rich(self, ui_plain, stdin_value):
         """Test prompting without rich."""
-        mock_stdin.return_value = "test input"
-        ui = TerminalUI(use_rich=False)
-        result = ui.prompt("Enter value:", "default")
-        assert mock_stdin.called
+        stdin_value["value"] = "test input"
+        result = ui_plain.prompt("Enter value:", "default")
         assert result == "test input"
 
-    def test_prompt_empty_input_returns_default(self, mock_stdin):
+    def test_prompt_empty_input_returns_default(self, ui_plain, stdin_value):
         """Test empty input returns default value."""
-        mock_stdin.return_value = ""
-        ui = TerminalUI(use_rich=False)
-        result = ui.prompt("Enter value:", "default")
+        stdin_value["value"] = ""
+        result = ui_plain.prompt("Enter value:", "default")
         assert result == "default"
 
-    def test_confirm_with_rich(self, mock_rich):
-        """Test confirmation with rich enabled."""
-        if RICH_AVAILABLE:
-            ui = TerminalUI(use_rich=True)
-            result = ui.confirm("Confirm?", True)
-            assert mock_rich["confirm"].ask.called
-            assert result is True
-        else:
-            pytest.skip("Rich library not available")
-
-    def test_confirm_without_rich_yes(self, mock_stdin):
-        """Test confirmation without rich (yes)."""
-        mock_stdin.return_value = "y"
-        ui = TerminalUI(use_rich=False)
-        result = ui.confirm("Confirm?", False)
-        assert mock_stdin.called
-        assert result is True
+    @pytest.mark.parametrize(
+        "answer, default, expected",
+        [("y", False, True), ("n", True, False)],
+        ids=["yes", "no"],
+    )
+    def test_confirm_without_rich(
+        self, ui_plain, stdin_value, answer, default, expected
+    ):
+        """Test confirmation without rich overrides the default."""
+        stdin_value["value"] = answer
+        result = ui_plain.confirm("Confirm?", default)
+        assert result is expected
+
+    @pytest.mark.parametrize(
+        "answer, options, descriptions, lines, expected",
+        [
+            (
+                "2",
+                ["Option 1", "Option 2", "Option 3"],
+                None,
+                ["1. Option 1", "2. Option 2", "3. Option 3"],
+                1,
+            ),
+            (
+                "1",
+                ["Option 1", "Option 2"],
+                ["Description 1", "Description 2"],
+                ["1. Option 1 - Description 1", "2. Option 2 - Description 2"],
+                0,
+            ),
+        ],
+        ids=["plain", "descriptions"],
+    )
+    def test_select_option_without_rich(
+        self,
+        ui_plain,
+        stdin_value,
+        answer,
+        options,
+        descriptions,
+        lines,
+        expected,
+    ):
+        """Test option selection without rich, with and without descriptions."""
+        stdin_value["value"] = answer
+        result = ui_plain.select_option("Select an option:", options, descriptions)
+        output = ui_plain.out.getvalue()
+        for line in lines:
+            assert line in output
+        assert result == expected  # 0-indexed
+
+    def test_progress_without_rich(self, ui_plain):
+        """Test progress bar without rich."""
+        progress = ui_plain.progress(100, "Processing")
+
+        assert "total" in progress
+        assert "current" in progress
+        assert "description" in progress
+        assert progress["total"] == 100
+        assert progress["current"] == 0
+
+        ui_plain.update_progress(progress, 10)
+        assert progress["current"] == 10
+
+        # Redirected output only prints once the bar completes
+        assert ui_plain.out.getvalue() == ""
+
+    def test_progress_without_rich_repaints_per_percent(self):
+        """Test the fallback bar only redraws when the percentage changes."""
+        out = mock.Mock()
+        out.isatty.return_value = True
+        ui = TerminalUI(use_rich=False, out=out)
+        progress = ui.progress(1000, "Processing")
+
+        for _ in range(1000):
+            ui.update_progress(progress)
+
+        assert progress["current"] == 1000
+        assert out.flush.call_count == 101  # 0% through 100%
+        # One closing newline after the last repaint
+        assert out.write.call_count == 102
+        assert out.write.call_args == mock.call("\n")
+
+    def test_progress_redirected_prints_once(self, ui_plain):
+        """Test redirected progress prints a single line on completion."""
+        progress = ui_plain.progress(100, "Processing")
+
+        for _ in range(101):
+            ui_plain.update_progress(progress)
+
+        assert ui_plain.out.getvalue() == "Processing: 100/100\n"
+
+    def test_progress_redirected_reports_short_stop(self, ui_plain):
+        """Test redirected progress reports the final count when stopped early."""
+        progress = ui_plain.progress(100, "Processing")
+        ui_plain.start_progress(progress)
+        ui_plain.update_progress(progress, 40)
+        ui_plain.stop_progress(progress)
+        ui_plain.stop_progress(progress)
 
-    def test_confirm_without_rich_no(self, mock_stdin):
-        """Test confirmation without rich (no)."""
-        mock_stdin.return_value = "n"
+        assert ui_plain.out.getvalue() == "Processing: 40/100\n"
+
+    def test_progress_redirected_completed_prints_once(self, ui_plain):
+        """Test stopping a completed redirected bar does not repeat it."""
+        progress = ui_plain.progress(10, "Processing")
+        ui_plain.update_progress(progress, 10)
+        ui_plain.stop_progress(progress)
+
+        assert ui_plain.out.getvalue() == "Processing: 10/10\n"
+
+    def test_init_without_stdout(self, monkeypatch):
+        """Test a windowed build with no sys.stdout falls back to plain output."""
+        monkeypatch.setattr("sys.stdout", None)
         ui = TerminalUI(use_rich=False)
-        result = ui.confirm("Confirm?", True)
-        assert mock_stdin.called
-        assert result is False
 
-    def test_select_option_with_rich(self, mock_rich):
+        assert ui._tty is False
+        ui.info("No console attached")
+
+    def test_display_table_without_rich(self, ui_plain):
+        """Test table display without rich."""
+        headers = ["Name", "Value"]
+        rows = [["Item 1", "100"], ["Item 2", "200"]]
+
+        ui_plain.display_table(headers, rows, "Test Table")
+
+        assert ui_plain.out.getvalue() == (
+            "\nTest Table\n"
+            "Name   | Value\n"
+            "--------------\n"
+            "Item 1 | 100  \n"
+            "Item 2 | 200  \n"
+        )
+
+
+@pytest.mark.skipif(not RICH_AVAILABLE, reason="Rich library not available")
+class TestTerminalUIRich:
+    """Tests for the terminal UI with rich enabled."""
+
+    def test_init_rich_available(self, mock_rich):
+        """Test initialization with rich library available."""
+        ui = TerminalUI(use_rich=True)
+        assert ui.use_rich is True
+        assert mock_rich["console"].called
+
+    def test_init_rich_writes_to_out(self, mock_rich):
+        """Test the rich console writes to the injected stream."""
+        out = io.StringIO()
+        TerminalUI(use_rich=True, out=out)
+        mock_rich["console"].assert_called_once_with(file=out)
+
+    def test_log_with_rich(self, ui_rich, mock_rich):
+        """Test logging with rich enabled."""
+        ui_rich._tty = True
+        ui_rich.log("Test message", LogLevel.INFO)
+        mock_rich["console"].return_value.print.assert_called_once()
+        args, kwargs = mock_rich["console"].return_value.print.call_args
+        assert "Test message" in args[0]
+        assert "style" in kwargs
+
+    def test_prompt_with_rich(self, ui_rich, mock_rich):
+        """Test prompting with rich enabled."""
+        result = ui_rich.prompt("Enter value:", "default")
+        assert mock_rich["prompt"].ask.called
+        assert result == "test input"
+
+    def test_confirm_with_rich(self, ui_rich, mock_rich):
+        """Test confirmation with rich enabled."""
+        result = ui_rich.confirm("Confirm?", True)
+        assert mock_rich["confirm"].ask.called
+        assert result is True
+
+    def test_select_option_with_rich(self, ui_rich, mock_rich):
         """Test option selection with rich enabled."""
-        if RICH_AVAILABLE:
-            mock_rich["prompt"].ask.return_value = "2"
-            ui = TerminalUI(use_rich=True)
-            result = ui.select_option(
-                "Select an option:", ["Option 1", "Option 2", "Option 3"]
-            )
-            assert mock_rich["table"].called
-            assert mock_rich["prompt"].ask.called
-            assert result == 1  # Second option (0-indexed)
-        else:
-            pytest.skip("Rich library not available")
-
-    def test_select_option_without_rich(self, mock_stdin, mock_stdout):
-        """Test option selection without rich."""
-        mock_stdin.return_value = "2"
-        ui = TerminalUI(use_rich=False)
-        result = ui.select_option(
+        mock_rich["prompt"].ask.return_value = "2"
+        result = ui_rich.select_option(
             "Select an option:", ["Option 1", "Option 2", "Option 3"]
         )
-        assert mock_stdin.called
-        output = mock_stdout.getvalue()
-        assert "1. Option 1" in output
-        assert "2. Option 2" in output
-        assert "3. Option 3" in output
+        assert mock_rich["table"].called
+        assert mock_rich["prompt"].ask.called
         assert result == 1  # Second option (0-indexed)
 
-    def test_select_option_with_descriptions(self, mock_stdin, mock_stdout):
-        """Test option selection with descriptions."""
-        mock_stdin.return_value = "1"
-        ui = TerminalUI(use_rich=False)
-        result = ui.select_option(
-            "Select an option:",
-            ["Option 1", "Option 2"],
-            ["Description 1", "Description 2"],
-        )
-        output = mock_stdout.getvalue()
-        assert "1. Option 1 - Description 1" in output
-        assert "2. Option 2 - Description 2" in output
-        assert result == 0  # First option (0-indexed)
-
-    @pytest.mark.skipif(not RICH_AVAILABLE, reason="Rich library not available")
-    def test_progress_with_rich(self, mock_rich):
+    def test_progress_with_rich(self, ui_rich, mock_rich):
         """Test progress bar with rich enabled."""
-        ui = TerminalUI(use_rich=True)
         mock_progress_instance = mock_rich["progress"].return_value
         mock_progress_instance.add_task.return_value = "task_id"
 
-        progress = ui.progress(100, "Processing")
+        progress = ui_rich.progress(100, "Processing")
 
         assert mock_rich["progress"].called
         assert mock_progress_instance.add_task.called
@@ -210,58 +334,24 @@ class TestTerminalUI:
         assert progress["task"] == "task_id"
 
         # Test progress operations
-        ui.start_progress(progress)
+        ui_rich.start_progress(progress)
         assert mock_progress_instance.start.called
 
-        ui.update_progress(progress, 10)
+        ui_rich.update_progress(progress, 10)
         assert mock_progress_instance.update.called
 
-        ui.stop_progress(progress)
+        ui_rich.stop_progress(progress)
         assert mock_progress_instance.stop.called
 
-    def test_progress_without_rich(self, mock_stdout):
-        """Test progress bar without rich."""
-        ui = TerminalUI(use_rich=False)
-        progress = ui.progress(100, "Processing")
-
-        assert "total" in progress
-        assert "current" in progress
-        assert "description" in progress
-        assert progress["total"] == 100
-        assert progress["current"] == 0
-
-        ui.update_progress(progress, 10)
-        assert progress["current"] == 10
-
-        # Skip stdout check as real_print may write to the actual console
-        # Instead just verify that the progress object was updated
-        assert progress["current"] == 10
-
-    def test_display_table_with_rich(self, mock_rich):
+    def test_display_table_with_rich(self, ui_rich, mock_rich):
         """Test table display with rich enabled."""
-        if RICH_AVAILABLE:
-            ui = TerminalUI(use_rich=True)
-            headers = ["Name", "Value"]
-            rows = [["Item 1", "100"], ["Item 2", "200"]]
-
-            ui.display_table(headers, rows, "Test Table")
-
-            assert mock_rich["table"].called
-            table_instance = mock_rich["table"].return_value
-            assert table_instance.add_column.call_count == 2
-            assert table_instance.add_row.call_count == 2
-            assert mock_rich["console"].return_value.print.called
-        else:
-            pytest.skip("Rich library not available")
-
-    def test_display_table_without_rich(self, mock_stdout):
-        """Test table display without rich."""
-        ui = TerminalUI(use_rich=False)
         headers = ["Name", "Value"]
         rows = [["Item 1", "100"], ["Item 2", "200"]]
 
-        ui.display_table(headers, rows, "Test Table")
+        ui_rich.display_table(headers, rows, "Test Table")
 
-        # Skip stdout checks due to mocking difficulty
-        # The function should run without errors
-        assert True
+        assert mock_rich["table"].called
+        table_instance = mock_rich["table"].return_value
+        assert table_instance.add_column.call_count == 2
+        assert table_instance.add_row.call_count == 2
+        assert mock_rich["console"].return_value.print.called